@@ -2,8 +2,8 @@
 #
 # Running:
 #   ./example-async.py --help
-#   ./example-async.py --tty /dev/tty.usbserial-A501SGSZ
-#   ./example-async.py --tty socket:/remote-server:4999/
+#   ./example-async.py --url /dev/tty.usbserial-A501SGSZ
+#   ./example-async.py --url socket://remote-server:4999/
 
 import logging
 import argparse as arg
@@ -12,8 +12,7 @@ from pprint import pprint
 
 import coloredlogs
 
-from pyavcontrol import DeviceClientDeprecate, DeviceModelLibrary
-from pyavcontrol.client import create_device_client
+from pyavcontrol import DeviceClient, DeviceModelLibrary
 
 LOG = logging.getLogger(__name__)
 coloredlogs.install(level="DEBUG")
@@ -40,14 +39,13 @@ if args.debug:
 
 async def main():
     try:
-        library = DeviceModelLibrary.create(event_loop=asyncio.get_event_loop())
-        model_def = library.load_model(args.model)
-
-        client = create_device_client(
-            model_def,
-            args.url,
-            serial_config_overrides={"baudrate": args.baud},
-            event_loop=asyncio.get_event_loop(),
+        event_loop = asyncio.get_running_loop()
+        library = DeviceModelLibrary.create(event_loop=event_loop)
+        model_id = await library.find_model(args.model) or args.model
+        model_def = await library.load_model(model_id)
+
+        client = DeviceClient.create(
+            model_def, args.url, {"baudrate": args.baud}, event_loop=event_loop
         )
 
         await client.send_raw(b"PING?")
@@ -55,7 +53,7 @@ async def main():
         # await client.power.off()
 
     except Exception as e:
-        LOG.error(f"Failed for {args.model}", e)
+        LOG.error(f"Failed for {args.model}: {e}")
         return
 
 
@@ -1,16 +1,15 @@
 #!/usr/bin/env python3
 #
 # Running:
-#   ./example-async.py --help
-#   ./example.py --tty /dev/tty.usbserial-A501SGSZ
+#   ./example-sync.py --help
+#   ./example-sync.py --url /dev/tty.usbserial-A501SGSZ
 
 import logging
 import argparse as arg
 
 import coloredlogs
 
-from pyavcontrol import DeviceClientDeprecate, DeviceModelLibrary
-from pyavcontrol.client import create_device_client
+from pyavcontrol import DeviceClient, DeviceModelLibrary
 
 LOG = logging.getLogger(__name__)
 coloredlogs.install(level="DEBUG")
@@ -39,9 +38,7 @@ if args.debug:
 
 def main():
     model_def = DeviceModelLibrary.create().load_model(args.model)
-    client = create_device_client(
-        model_def, args.url, serial_config_overrides={"baudrate": args.baud}
-    )
+    client = DeviceClient.create(model_def, args.url, {"baudrate": args.baud})
 
     client.send_raw(b"PING?")
     # client.volume.set(volume=20)
@@ -1,4 +1,39 @@
 __version__ = "2024.01.06"
 
-from .client import DeviceClient
-from .library import DeviceModelLibrary
+# the public classes are imported on first use (module __getattr__), so that
+# 'import pyavcontrol' does not load the YAML parser, pyserial or asyncio until
+# something needs them (see tools/check-import-time)
+_LAZY_IMPORTS = {
+    "DeviceClient": ".client",
+    "DeviceModelLibrary": ".library",
+    "DeviceFleet": ".fleet",
+    "PollScheduler": ".scheduler",
+    "Scene": ".scene",
+    "load_scenes": ".scene",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+# checkers treat any TYPE_CHECKING as True (importing typing costs ~10 ms)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .client import DeviceClient
+    from .fleet import DeviceFleet
+    from .library import DeviceModelLibrary
+    from .scene import Scene, load_scenes
+    from .scheduler import PollScheduler
+
+
+def __getattr__(name: str):
+    if not (module := _LAZY_IMPORTS.get(name)):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import importlib
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
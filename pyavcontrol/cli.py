@@ -0,0 +1,308 @@
+"""
+Command line probes for measuring device performance:
+
+    pyavcontrol ping    --model mx160 --url /dev/ttyUSB0 ping.ping --count 20
+    pyavcontrol bench   --model MX88ai --url socket://ip2sl:4999 volume.get --arg zone=11 --rate 5
+    pyavcontrol monitor --model mx160 --url socket://mx160:84 --duration 60
+"""
+import logging
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from .client import DeviceClient
+from .const import DEFAULT_EVENT_LOOP, EVENT_LOOPS
+from .library import DeviceModelLibrary
+from .loop import run
+
+LOG = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 99)
+
+
+def _parse_value(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _parse_args(args: list[str]) -> dict:
+    """
+    :return: action arguments from a list of name=value strings
+    """
+    kwargs = {}
+    for arg in args or []:
+        name, sep, value = arg.partition("=")
+        if not sep:
+            raise SystemExit(f"Invalid argument '{arg}' (expected name=value)")
+        kwargs[name] = _parse_value(value)
+    return kwargs
+
+
+def _parse_action(client: DeviceClient, text: str) -> tuple[str, str]:
+    group, sep, action = text.partition(".")
+    if not sep or action not in client.api.get(group, ()):
+        raise SystemExit(f"Unknown action '{text}' for {client.model_id}")
+    return group, action
+
+
+def _expects_reply(client: DeviceClient, group: str, action: str) -> bool:
+    codec = client.model.codec
+    decoder = codec.frame_decoder if codec.binary else codec.decoder
+    return decoder(group, action) is not None
+
+
+def _create_client(args, loop) -> DeviceClient:
+    library = DeviceModelLibrary.create()
+    model_id = library.find_model(args.model) or args.model
+    if not (model_def := library.load_model(model_id)):
+        raise SystemExit(f"Unknown model '{args.model}'")
+
+    overrides = {"baudrate": args.baud} if args.baud else None
+    return DeviceClient.create(
+        model_def,
+        args.url,
+        overrides,
+        event_loop=loop,
+        negotiate_baudrate=args.negotiate,
+    )
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+def _print_latency(latencies: list[float]) -> None:
+    if not latencies:
+        print("no replies received")
+        return
+
+    values = sorted(latencies)
+    ms = [f"min={values[0] * 1000:.1f}"]
+    ms += [f"p{p}={_percentile(values, p) * 1000:.1f}" for p in PERCENTILES]
+    ms += [
+        f"max={values[-1] * 1000:.1f}",
+        f"mean={statistics.fmean(values) * 1000:.1f}",
+    ]
+    print(f"latency (ms): {' '.join(ms)}")
+
+
+async def ping(args) -> None:
+    """
+    Measure round-trip latency of an action (one request at a time). Pings of an
+    action with a reply fail unless the reply is received and recognized.
+    """
+    client = _create_client(args, asyncio.get_running_loop())
+    group, action = _parse_action(client, args.action)
+    kwargs = _parse_args(args.arg)
+    expects_reply = _expects_reply(client, group, action)
+    await client.connect()
+
+    latencies = []
+    failures = 0
+    for i in range(args.count):
+        start = time.perf_counter()
+        error = None
+        try:
+            result = await client.send_many([(group, action, kwargs)], args.timeout)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        else:
+            if expects_reply and result[0] is None:
+                # timed out, or a reply that is not the action's (e.g. wrong baud rate)
+                error = "no reply" if client.last_rtt is None else "unrecognized reply"
+
+        if error:
+            failures += 1
+            print(f"seq={i} failed: {error}")
+        else:
+            # time from the write until the reply, excluding any throttle wait before
+            # the write (actions without a reply are timed until written)
+            rtt = client.last_rtt
+            if rtt is None:
+                rtt = time.perf_counter() - start
+            latencies.append(rtt)
+            print(f"seq={i} time={rtt * 1000:.1f} ms reply={result[0]}")
+
+        if i + 1 < args.count:
+            await asyncio.sleep(args.interval)
+
+    print(f"--- {client.model_id} {args.action}: {args.count} sent, {failures} failed")
+    _print_latency(latencies)
+
+
+async def bench(args) -> None:
+    """
+    Send commands at a target rate (regardless of how quickly replies arrive)
+    and report throughput, latency, timeouts and throttle stalls.
+    """
+    loop = asyncio.get_running_loop()
+    client = _create_client(args, loop)
+    group, action = _parse_action(client, args.action)
+    kwargs = _parse_args(args.arg)
+    await client.connect()
+    initial_stats = client.stats()
+
+    latencies = []
+    failures = {}
+
+    async def send_one():
+        start = time.perf_counter()
+        try:
+            await client.send_many([(group, action, dict(kwargs))], args.timeout)
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+
+    start = loop.time()
+    tasks = []
+    for i in range(args.count):
+        if args.rate:
+            if (delay := start + i / args.rate - loop.time()) > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send_one()))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+
+    stats = {k: v - initial_stats.get(k, 0) for k, v in client.stats().items()}
+    print(
+        f"--- {client.model_id} {args.action}: {args.count} commands in {elapsed:.2f}s"
+    )
+    print(
+        f"throughput: {len(latencies) / elapsed:.2f} replies/s "
+        f"(target {args.rate or 'max'}/s)"
+    )
+    print(f"failures: {failures or 0}")
+    print(
+        f"throttle stalls: {stats.get('throttle_stalls', 0)} "
+        f"({stats.get('throttle_delay', 0.0):.2f}s), "
+        f"connection timeouts: {stats.get('timeouts', 0)}"
+    )
+    if rtt := client.rtt_stats().get(f"{group}.{action}"):
+        print(
+            f"rtt: srtt {(rtt['srtt'] or 0) * 1000:.1f}ms "
+            f"rttvar {(rtt['rttvar'] or 0) * 1000:.1f}ms, "
+            f"reply timeout {rtt['timeout'] * 1000:.0f}ms ({rtt['samples']} samples)"
+        )
+    _print_latency(latencies)
+
+
+async def monitor(args) -> None:
+    """
+    Print each message received from the device (decoded where the model defines
+    the message) with the message rate for each second.
+    """
+    loop = asyncio.get_running_loop()
+    client = _create_client(args, loop)
+
+    count = 0
+
+    def message_received(line: str) -> None:
+        nonlocal count
+        count += 1
+        if decoded := client.decode_message(line):
+            group, action, values = decoded
+            print(f"{time.strftime('%H:%M:%S')} {group}.{action} {values}")
+        else:
+            print(f"{time.strftime('%H:%M:%S')} {line!r}")
+
+    client.register_callback(message_received)
+    await client.connect()
+
+    start = loop.time()
+    end = start + args.duration if args.duration else None
+    total = 0
+    try:
+        while end is None or loop.time() < end:
+            await asyncio.sleep(1.0)
+            if count:
+                print(f"-- {count} msg/s")
+            total += count
+            count = 0
+    finally:
+        # also summarized when interrupted (e.g. Ctrl-C without --duration)
+        print(f"--- {total + count} messages in {loop.time() - start:.1f}s")
+
+
+COMMANDS = {"ping": ping, "bench": bench, "monitor": monitor}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="pyavcontrol", description="Probe A/V device performance"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--model", required=True, help="model id or name (e.g. mcintosh_mx160 or MX160)"
+    )
+    common.add_argument(
+        "--url",
+        required=True,
+        help="pyserial supported url (e.g. /dev/ttyUSB0 or socket://host:4999/)",
+    )
+    common.add_argument("--baud", type=int, help="override the model's baud rate")
+    common.add_argument(
+        "--negotiate",
+        action="store_true",
+        help="use the fastest baud rate the device responds at (see connection.baudrates)",
+    )
+    common.add_argument(
+        "--loop",
+        choices=EVENT_LOOPS,
+        default=DEFAULT_EVENT_LOOP,
+        help=f"event loop implementation (default={DEFAULT_EVENT_LOOP})",
+    )
+    common.add_argument(
+        "--eager-tasks", action="store_true", help="start tasks eagerly (Python 3.12+)"
+    )
+    common.add_argument("-d", "--debug", action="store_true", help="verbose logging")
+
+    action = argparse.ArgumentParser(add_help=False)
+    action.add_argument("action", help="group.action to send (e.g. volume.get)")
+    action.add_argument(
+        "--arg", action="append", help="action argument as name=value (e.g. zone=1)"
+    )
+    action.add_argument("--count", type=int, default=10, help="commands to send")
+    action.add_argument(
+        "--timeout", type=float, help="overall seconds allowed for each command"
+    )
+
+    p = subparsers.add_parser(
+        "ping", parents=[common, action], help="round-trip latency percentiles"
+    )
+    p.add_argument("--interval", type=float, default=1.0, help="seconds between pings")
+
+    p = subparsers.add_parser(
+        "bench", parents=[common, action], help="throughput at a target rate"
+    )
+    p.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="commands per second (0=as fast as possible)",
+    )
+
+    p = subparsers.add_parser(
+        "monitor", parents=[common], help="stream messages from the device"
+    )
+    p.add_argument(
+        "--duration", type=float, help="seconds to monitor (default=forever)"
+    )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING)
+
+    try:
+        run(COMMANDS[args.command](args), args.loop, args.eager_tasks)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
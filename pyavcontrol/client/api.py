@@ -0,0 +1,42 @@
+"""
+Dynamic group.action API (e.g. client.power.on()) exposed for each group of
+actions defined in a model's api.
+"""
+import functools
+from collections.abc import Callable
+
+
+class ActionGroup:
+    """
+    Group of actions that can be called on a device, where calling an action
+    invokes send(group, action, **kwargs). The send callable determines whether
+    the action is synchronous or asynchronous (e.g. a client's send_command()).
+    """
+
+    __slots__ = ("_send", "_group", "_actions")
+
+    def __init__(self, send: Callable, group: str, actions: tuple[str, ...]):
+        self._send = send
+        self._group = group
+        self._actions = actions
+
+    def __getattr__(self, action: str) -> Callable:
+        if action not in self._actions:
+            raise AttributeError(f"Group '{self._group}' has no action '{action}'")
+        return functools.partial(self._send, self._group, action)
+
+    def __dir__(self) -> list[str]:
+        return list(self._actions)
+
+    def __repr__(self) -> str:
+        return f"<ActionGroup {self._group}: {', '.join(self._actions)}>"
+
+
+def action_group(send: Callable, api: dict, name: str) -> ActionGroup:
+    """
+    :param api: dictionary of group name to the names of its actions
+    :return: the ActionGroup for name, raising AttributeError if not a group
+    """
+    if name.startswith("_") or name not in api:
+        raise AttributeError(name)
+    return ActionGroup(send, name, api[name])
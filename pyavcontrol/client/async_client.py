@@ -1,22 +1,73 @@
 import logging
+import asyncio
+import functools
 from abc import ABC
 from collections.abc import Callable
 
 from ..connection.async_connection import async_get_rs232_connection, locked_coro
 from ..const import *  # noqa: F403
 from .base import DeviceClient
+from .health import Keepalive, LinkHealth
 
 LOG = logging.getLogger(__name__)
 
 
+class Subscription:
+    """
+    Callback for the messages received from a device for a set of groups
+    (see DeviceClientAsync.subscribe).
+    """
+
+    __slots__ = ("callback", "groups")
+
+    def __init__(self, callback: Callable[[str], None], groups: set | None):
+        self.callback = callback
+        self.groups = groups
+
+    def wants(self, group: str | None) -> bool:
+        """
+        :return: True if messages for the group (None if not decoded) are subscribed
+        """
+        return self.groups is None or group in self.groups
+
+
 class DeviceClientAsync(DeviceClient, ABC):
-    def __init__(self, model_def: dict, url: str, serial_config: dict, loop):
-        DeviceClient.__init__(self, model_def, url, serial_config)
+    def __init__(
+        self,
+        model_def: dict,
+        url: str,
+        serial_config: dict,
+        loop,
+        recorder=None,
+        negotiate_baudrate: bool = False,
+    ):
+        DeviceClient.__init__(
+            self, model_def, url, serial_config, recorder, negotiate_baudrate
+        )
         self._loop = loop
         self._connection_ref = None
+
+        # communication with each device is serialized independently of other devices
+        self._lock = asyncio.Lock()
+        self._connect_lock = asyncio.Lock()
         self._callback = None
+
+        # notification level applied for the current subscriptions (see subscribe)
+        self._subscriptions = []
+        self._notify_lock = asyncio.Lock()
+        self._notification_level = None
         self._encoding = serial_config.get("encoding", DEFAULT_ENCODING)
 
+        # idle keepalive probes, if the model defines connection.keepalive (see health.py)
+        self._keepalive = None
+        self._keepalive_task = None
+        self._keepalive_probes = 0
+        if keepalive_def := self._model.get("connection", {}).get(CONF_KEEPALIVE):
+            self._keepalive = Keepalive(keepalive_def)
+        self._link_health = LinkHealth(
+            self._keepalive.misses if self._keepalive else DEFAULT_KEEPALIVE_MISSES
+        )
+
     @property
     def is_async(self):
         """
@@ -24,28 +75,231 @@ class DeviceClientAsync(DeviceClient, ABC):
         """
         return True
 
+    async def connect(self) -> None:
+        """
+        Open the connection to the device now, rather than on the first command
+        (e.g. so unsolicited messages are received by any registered callback).
+        """
+        await self._connection()
+
+    @property
+    def health(self) -> str:
+        """
+        :return: state of the link to the device: HEALTH_OK, HEALTH_DEGRADED (keepalive
+          probes unanswered, only for models with connection.keepalive),
+          HEALTH_DISCONNECTED or HEALTH_UNKNOWN (not connected yet)
+        """
+        if not (connection := self._connection_ref):
+            return HEALTH_UNKNOWN
+        return self._link_health.state(connection.is_connected, connection.last_received)
+
+    def stats(self) -> dict:
+        """
+        :return: counters for the connection (requests, timeouts, throttle stalls/delay,
+          keepalive probes); see rtt_stats() for the round-trip times of each action
+        """
+        if not self._connection_ref:
+            return {}
+        return dict(self._connection_ref.stats, keepalive_probes=self._keepalive_probes)
+
     @locked_coro
     async def send_raw(self, data: bytes) -> None:
         if LOG.isEnabledFor(logging.DEBUG):
             LOG.debug(f"Sending {self._url}: {data}")
 
-        # send the data and flush all the bytes to the connection
+        # any response is passed to the registered callback
         connection = await self._connection()
-        await connection.write(data)
-        await connection.flush()
+        if await connection.send_batch(data, 0) is None:
+            raise asyncio.TimeoutError(f"Timeout connecting to {self._url}")
 
-    @locked_coro
-    async def send_command(self, group: str, action: str, **kwargs) -> None:
-        # await self.send_raw(data.bytes())
-        # FIXME: implement, if necessary?
-        LOG.error(f"Not implemented send_command!")
+    async def send_command(self, group: str, action: str, **kwargs) -> dict | None:
+        results = await self.send_many([(group, action, kwargs)])
+        return results[0]
+
+    async def send_many(self, commands: list, timeout: float = None) -> list:
+        """
+        :param timeout: overall seconds allowed for sending all the commands and
+          receiving their replies, including waiting behind other commands to the
+          device (raises TimeoutError as soon as it cannot be met)
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+
+        try:
+            await asyncio.wait_for(self._lock.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(
+                f"Timeout waiting for earlier commands to {self._url}"
+            ) from None
+
+        try:
+            connection = await self._connection()
+            eol = self._format_setting("message", "eol", DEFAULT_EOL)
+
+            self._last_rtt = None
+            results = []
+            for data, actions in self._prepare_batch(commands):
+                if deadline is not None and loop.time() >= deadline:
+                    raise asyncio.TimeoutError(
+                        f"Timeout sending commands to {self._url}"
+                    )
+
+                expected = sum(1 for g, a in actions if self._expects_reply(g, a))
+                lines = await connection.send_batch(
+                    data,
+                    expected,
+                    self._reply_timeout(actions),
+                    deadline,
+                    on_reply=functools.partial(self._replied, actions),
+                )
+                if lines is None:
+                    # the connection gave up waiting to be connected (ensure_connected)
+                    raise asyncio.TimeoutError(f"Timeout connecting to {self._url}")
+                if self._codec.binary:
+                    results.extend(self._decode_frames(actions, lines))
+                else:
+                    results.extend(self._decode_replies(actions, eol.join(lines)))
+            return results
+        finally:
+            self._lock.release()
+
+    async def stream(self, group: str, action: str, **kwargs):
+        """
+        Send a command that returns a multi-line list response (see msg.lines)
+        and yield each decoded item as it is received. E.g.
+
+        async for mode in client.stream("audio_mode", "modes"):
+            print(mode["name"])
+
+        NOTE: the client is locked until the stream completes (or is closed),
+        so other commands must not be sent while iterating.
+        """
+        decoder, data = self._list_request(group, action, kwargs)
+        connection = await self._connection()
+
+        async with self._lock:
+            lines = connection.send_stream(data, idle_timeout=decoder.idle)
+            try:
+                reader = decoder.reader()
+                async for line in lines:
+                    if (item := reader.feed(line)) is not None:
+                        yield item
+                    if reader.done:
+                        break
+            finally:
+                await lines.aclose()
+
+    async def collect(self, group: str, action: str, **kwargs) -> list[dict]:
+        """
+        :return: all the decoded items of a multi-line list response
+        """
+        return [item async for item in self.stream(group, action, **kwargs)]
 
-    @locked_coro
     def register_callback(self, callback: Callable[[str], None]) -> None:
+        """
+        Register a callback that is called with each line received from the
+        device, including unsolicited messages (e.g. front panel changes).
+        """
         if not callable(callback):
             raise ValueError("Callback is not Callable")
         self._callback = callback
 
+    async def subscribe(
+        self, callback: Callable[[str], None], groups: list[str] | None = None
+    ) -> Subscription:
+        """
+        Call the callback with each message received for the groups (e.g. volume),
+        or every line received if groups is None.
+
+        For models that define notifications levels (e.g. the MX160 verbosity),
+        the device is switched to the lowest level that sends the messages of
+        every subscribed group (but not below the level connection_init sets), and
+        returned to that baseline as subscriptions are removed.
+        """
+        if not callable(callback):
+            raise ValueError("Callback is not Callable")
+        subscription = Subscription(
+            callback, set(groups) if groups is not None else None
+        )
+        self._subscriptions.append(subscription)
+        await self._update_notifications()
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+            await self._update_notifications()
+
+    async def _update_notifications(self) -> None:
+        """
+        Change the device's notifications level to match the subscribed groups.
+        """
+        async with self._notify_lock:
+            level = self._notification_action(self._subscribed_groups())
+            if level and level != self._notification_level:
+                LOG.debug(f"Setting {self.model_id} notifications to {'.'.join(level)}")
+                try:
+                    await self.send_command(*level)
+                except Exception as e:
+                    # messages are still delivered at the device's current level
+                    LOG.warning(f"Failed setting {self.model_id} notifications: {e}")
+                    return
+                self._notification_level = level
+
+    def _subscribed_groups(self) -> set | None:
+        """
+        :return: groups of all the subscriptions (None if any wants every message)
+        """
+        groups = set()
+        for subscription in self._subscriptions:
+            if subscription.groups is None:
+                return None
+            groups |= subscription.groups
+        return groups
+
+    async def _restore_notifications(self, connection) -> None:
+        """
+        Set the notifications level for the current subscriptions on a new connection,
+        as the device may have been reset (or connection_init may set a level, e.g.
+        the MX160's !VERB(2)). Sent directly on the connection, as the client's lock
+        may be held by the command that is opening the connection.
+        """
+        self._notification_level = None
+
+        # without subscriptions the device is left at connection_init's level
+        if not self._subscriptions:
+            return
+        if not (level := self._notification_action(self._subscribed_groups())):
+            return
+
+        LOG.debug(f"Setting {self.model_id} notifications to {'.'.join(level)}")
+        for data, actions in self._prepare_batch([level]):
+            expected = sum(1 for g, a in actions if self._expects_reply(g, a))
+            try:
+                await connection.send_batch(data, expected, self._reply_timeout(actions))
+            except Exception as e:
+                LOG.warning(f"Failed setting {self.model_id} notifications: {e}")
+                return
+        self._notification_level = level
+
+    def _message_received(self, line: str) -> None:
+        """
+        Pass a line received from the device to the registered callback and the
+        subscriptions for its group.
+        """
+        if self._callback:
+            self._callback(line)
+
+        if self._subscriptions:
+            decoded = self.decode_message(line)
+            group = decoded[0] if decoded else None
+            for subscription in list(self._subscriptions):
+                if subscription.wants(group):
+                    try:
+                        subscription.callback(line)
+                    except Exception:
+                        LOG.exception(f"Subscription callback for {self._url} failed")
+
     @locked_coro
     async def received_message(self):
         for cb in self._callbacks:
@@ -55,18 +309,115 @@ class DeviceClientAsync(DeviceClient, ABC):
         """
         :return the connection to the RS232 device (lazy connect if none)
         """
-        if not self._connection_ref:
-            LOG.debug(
-                f"Connecting to {self._model}/{self._protocol_name} @ {self._url}: %s %s",
-                self._connection_config,
-                self._protocol_def,
-            )
-
-            self._connection_ref = await async_get_rs232_connection(
-                self._url,
-                self._model_def,
-                self._connection_config,
-                self._protocol_def,
-                self._loop,
-            )
+        async with self._connect_lock:
+            # reconnect if the transport was closed (e.g. the remote end disconnected)
+            if not self._connection_ref or self._connection_ref.lost:
+                self._connection_ref = await self._open_connection()
+
+                if self._keepalive:
+                    self._cancel_keepalive()
+                    self._keepalive_task = self._loop.create_task(
+                        self._keep_alive(self._connection_ref)
+                    )
         return self._connection_ref
+
+    async def close(self) -> None:
+        """
+        Stop the keepalive probes and close the connection to the device (a later
+        command opens a new connection).
+        """
+        async with self._connect_lock:
+            if task := self._cancel_keepalive():
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+            if connection := self._connection_ref:
+                self._connection_ref = None
+                connection.close()
+
+    def _cancel_keepalive(self) -> asyncio.Task | None:
+        """
+        Cancel the keepalive probes of the previous connection.
+
+        :return: the cancelled task (if any)
+        """
+        task, self._keepalive_task = self._keepalive_task, None
+        # a probe that reconnected exits by itself, as its connection was replaced
+        if not task or task.done() or task is asyncio.current_task():
+            return None
+        task.cancel()
+        return task
+
+    async def _keep_alive(self, connection) -> None:
+        """
+        Send the model's keepalive action whenever nothing was received from the
+        device for the idle time, until the connection is lost or replaced.
+        """
+        keepalive = self._keepalive
+        while not connection.lost and connection is self._connection_ref:
+            quiet = self._loop.time() - connection.last_received
+            if quiet < keepalive.idle:
+                await asyncio.sleep(keepalive.idle - quiet)
+                continue
+
+            sent = self._loop.time()
+            self._keepalive_probes += 1
+            try:
+                await self.send_command(keepalive.group, keepalive.action)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOG.debug(f"Keepalive to {self._url} failed: {e}")
+
+            # unanswered probes are recorded as misses (see _replied)
+            if connection.last_received < sent:
+                await asyncio.sleep(keepalive.idle)
+
+    def _replied(self, actions: list[tuple[str, str]], rtt: float | None) -> None:
+        super()._replied(actions, rtt)
+        # replies to commands count the same as replies to keepalive probes; misses are
+        # only tracked with keepalive probes, which clear the state once the device
+        # replies again (otherwise a degraded device would never be polled again)
+        if rtt is None and self._keepalive and (connection := self._connection_ref):
+            if self._link_health.missed(connection.last_sent, connection.last_received):
+                LOG.warning(
+                    f"{self.model_id} @ {self._url} did not reply to "
+                    f"{self._link_health.misses} requests, marked {HEALTH_DEGRADED}"
+                )
+
+    async def _open_connection(self):
+        """
+        Connect to the device, send the model's settings.connection_init (if any) and
+        restore the notifications level of the subscriptions
+        """
+        model_id = self._model.get("id")
+        if self._negotiate_baudrate:
+            await self._loop.run_in_executor(None, self._negotiated_config)
+        LOG.debug(
+            f"Connecting to {model_id} @ {self._url}: %s", self._connection_config
+        )
+
+        settings = self._model.get("settings", {})
+        throttle = settings.get(CONF_THROTTLE_RATE, DEFAULT_THROTTLE_RATE)
+        config = {CONF_THROTTLE_RATE: throttle, CONF_RECORDER: self._recorder}
+        protocol_config = {
+            CONF_RESPONSE_EOL: self._format_setting("message", "eol", DEFAULT_EOL)
+        }
+        if self._codec.binary:
+            protocol_config[CONF_FRAMER] = self._codec.framer()
+
+        connection = await async_get_rs232_connection(
+            self._url,
+            config,
+            self._connection_config,
+            protocol_config,
+            self._loop,
+        )
+        connection.register_callback(self._message_received)
+
+        if data := self._connection_init():
+            LOG.debug(f"Initializing {model_id} @ {self._url}: {data}")
+            await connection.send_batch(data, 0)
+        await self._restore_notifications(connection)
+        return connection
@@ -6,7 +6,11 @@ import logging
 from abc import ABC, abstractmethod
 from collections.abc import Callable
 
+from ..connection.negotiate import negotiate_baudrate
 from ..const import *  # noqa: F403
+from .api import action_group
+from .model import RuntimeModel, runtime_model
+from .rtt import ReplyTimeouts
 
 LOG = logging.getLogger(__name__)
 
@@ -19,13 +23,41 @@ class DeviceClient(ABC):
     to control a device.
     """
 
-    def __init__(self, model_def: dict, url: str, connection_config: dict):
+    def __init__(
+        self,
+        model_def: dict,
+        url: str,
+        connection_config: dict,
+        recorder=None,
+        negotiate_baudrate: bool = False,
+    ):
         super().__init__()
-        self._protocol_def = model_def
+        # only the slim runtime model (shared per model) is kept, not the definition
+        self._model = runtime_model(model_def)
         self._url = url
         self._connection_config = connection_config
+        self._recorder = recorder
+        self._negotiate_baudrate = negotiate_baudrate
         self._callback = None
         self._encoding = DEFAULT_ENCODING
+        self._codec = self._model.codec
+
+        # reply timeouts adapted to the observed round-trip times, if the model
+        # defines connection.rtt (otherwise the fixed timeouts are used)
+        self._rtt = None
+        if (rtt_def := self._model.get("connection", {}).get(CONF_RTT)) is not None:
+            self._rtt = ReplyTimeouts(
+                self._codec,
+                rtt_def or {},
+                connection_config.get("timeout", DEFAULT_TIMEOUT),
+            )
+        self._last_rtt = None
+
+    def __getattr__(self, name: str):
+        # expose each group of actions in the model's api (e.g. client.power.on())
+        if codec := self.__dict__.get("_codec"):
+            return action_group(self.send_command, codec.api, name)
+        raise AttributeError(name)
 
     def encoding(self) -> str:
         """
@@ -33,6 +65,52 @@ class DeviceClient(ABC):
         """
         return self._encoding
 
+    @property
+    def model_id(self) -> str:
+        """
+        :return: id of the model this client controls (e.g. mcintosh_mx160)
+        """
+        return self._model.id
+
+    @property
+    def model(self) -> RuntimeModel:
+        """
+        :return: the runtime model (compiled codec and settings) shared by all
+          clients of this model
+        """
+        return self._model
+
+    @property
+    def api(self) -> dict[str, tuple[str, ...]]:
+        """
+        :return: dictionary of each group in the model's api to its actions
+        """
+        return self._codec.api
+
+    @property
+    def health(self) -> str:
+        """
+        :return: state of the link to the device (only checked by asynchronous clients)
+        """
+        return HEALTH_UNKNOWN
+
+    def rtt_stats(self) -> dict[str, dict]:
+        """
+        :return: round-trip time estimate (srtt/rttvar), current reply timeout and
+          sample/timeout counts for each action sent (empty if the model does not
+          use adaptive timeouts)
+        """
+        return self._rtt.stats() if self._rtt else {}
+
+    @property
+    def last_rtt(self) -> float | None:
+        """
+        :return: seconds from writing the last command of the most recent send_many()
+          until its replies were received, excluding any throttle wait before the write
+          (None if no reply was expected or received)
+        """
+        return self._last_rtt
+
     @property
     def is_async(self):
         """
@@ -67,16 +145,286 @@ class DeviceClient(ABC):
         """
         raise NotImplementedError()
 
+    @abstractmethod
+    def send_many(self, commands: list, timeout: float = None) -> list:
+        """
+        Send several commands to the device, packing as many commands into
+        each write as the model's format.command.separator and max_batch allow.
+        Each command is a tuple of (group, action) or (group, action, kwargs).
+
+        Replies are waited for up to the action's timeout in the model (if defined),
+        otherwise the connection timeout.
+
+        :param timeout: overall seconds allowed for the entire call (optional)
+        :return: list of parsed responses (or None) in the same order as the commands
+        """
+        raise NotImplementedError()
+
+    def batch(self) -> CommandBatch:
+        """
+        Collect commands and send them together when the batch exits. E.g.
+
+        with client.batch() as batch:
+            for zone in range(1, 9):
+                batch.add("volume", "set", zone=zone, volume=20)
+        print(batch.results)
+
+        Asynchronous clients use 'async with client.batch() as batch:' instead.
+        """
+        return CommandBatch(self)
+
+    def _format_setting(self, section: str, key: str, default=None):
+        """
+        :return: value from the model's format.<section> (e.g. command or message)
+        """
+        fmt = self._model.get("format", {}).get(section, {})
+        return fmt.get(key, default)
+
+    def _encode_command(self, group: str, action: str, **kwargs) -> str:
+        """
+        :return: the command (without separator or eol) for the group/action and args
+        """
+        return self._codec.encode(group, action, **kwargs)
+
+    def _prepare_batch(self, commands: list) -> list[tuple[bytes, list]]:
+        """
+        Encode and pack commands into as few writes as the device allows.
+
+        :return: list of (data, [(group, action), ...]) for each write to the device
+        """
+        # binary frames are sent one per write
+        if self._codec.binary:
+            writes = []
+            for command in commands:
+                group, action, kwargs = _split_command(command)
+                frame = self._codec.encode_frame(group, action, **kwargs)
+                writes.append((frame, [(group, action)]))
+            return writes
+
+        eol = self._format_setting("command", "eol", DEFAULT_EOL)
+        separator = self._format_setting("command", "separator")
+
+        # devices without a separator only accept a single command per write
+        max_batch = 1
+        if separator:
+            max_batch = self._format_setting(
+                "command", CONF_BATCH_MAX_COMMANDS, DEFAULT_BATCH_MAX_COMMANDS
+            )
+        max_length = self._format_setting("command", CONF_BATCH_MAX_LENGTH)
+
+        writes = []
+        pending = []
+        pending_actions = []
+        length = len(eol)
+
+        def flush():
+            data = separator.join(pending) if separator else pending[0]
+            writes.append(((data + eol).encode(self._encoding), list(pending_actions)))
+            pending.clear()
+            pending_actions.clear()
+
+        for command in commands:
+            group, action, kwargs = _split_command(command)
+            cmd = self._encode_command(group, action, **kwargs)
+
+            added = len(cmd) + (len(separator) if pending else 0)
+            if pending and (
+                len(pending) >= max_batch
+                or (max_length and length + added > max_length)
+            ):
+                flush()
+                length = len(eol)
+                added = len(cmd)
+
+            pending.append(cmd)
+            pending_actions.append((group, action))
+            length += added
+
+        if pending:
+            flush()
+        return writes
+
+    def _connection_init(self) -> bytes | None:
+        """
+        :return: data to send after connecting, from the model's settings.connection_init
+        """
+        init = self._model.get("settings", {}).get("connection_init")
+        if not init:
+            return None
+        eol = self._format_setting("command", "eol", DEFAULT_EOL)
+        return f"{init}{eol}".encode(self._encoding)
+
+    def _negotiated_config(self) -> dict:
+        """
+        Probe for the fastest baud rate the device responds at (blocking), if
+        negotiation was requested and the model defines connection.baudrates. Called
+        for each connect, so a device reconfigured since the rate was cached (which
+        no longer replies at it) is negotiated again.
+
+        :return: the connection config to use
+        """
+        if self._negotiate_baudrate:
+            # the runtime model has no api, so its codec builds the identify query
+            if baudrate := negotiate_baudrate(
+                self._model, self._url, self._connection_config, codec=self._codec
+            ):
+                self._connection_config = dict(
+                    self._connection_config, baudrate=baudrate
+                )
+        return self._connection_config
+
+    def _notification_action(self, groups: set | None) -> tuple[str, str] | None:
+        """
+        :param groups: groups that messages are wanted for (None for all messages)
+        :return: (group, action) selecting the model's lowest notifications level that
+          sends messages for all the groups, but not below the baseline level set by
+          connection_init (None if the model has no levels)
+        """
+        if not (levels := self._model.get(CONF_NOTIFICATIONS)):
+            return None
+
+        # each level sends the messages of its groups in addition to those of lower levels
+        baseline = self._baseline_notifications()
+        sent = set()
+        for index, level in enumerate(levels):
+            level_groups = level.get("groups") or []
+            if level_groups == "all":
+                return _split_action(level["action"])
+            sent.update(level_groups)
+            if index >= baseline and groups is not None and groups <= sent:
+                return _split_action(level["action"])
+        return _split_action(levels[-1]["action"])
+
+    def _baseline_notifications(self) -> int:
+        """
+        :return: index of the notifications level the model's connection_init selects
+          (e.g. the MX160's !VERB(2)), or 0 (the lowest) if it does not select one
+        """
+        init = self._model.get("settings", {}).get("connection_init")
+        if not init:
+            return 0
+        for index, level in enumerate(self._model.get(CONF_NOTIFICATIONS) or []):
+            try:
+                if self._encode_command(*_split_action(level["action"])) in init:
+                    return index
+            except ValueError:  # levels selected by an argument are not matched
+                continue
+        return 0
+
+    def _expects_reply(self, group: str, action: str) -> bool:
+        """
+        :return: True if the device responds with a message for the group/action
+        """
+        if self._codec.binary:
+            return self._codec.frame_decoder(group, action) is not None
+        return self._codec.decoder(group, action) is not None
+
+    def _reply_timeout(self, actions: list[tuple[str, str]]) -> float | None:
+        """
+        :return: seconds to wait for the replies to the actions: the adaptive timeout
+          (see rtt.py), otherwise the longest timeout defined by the model for the
+          actions (None if the connection timeout applies to all of them)
+        """
+        if self._rtt:
+            return self._rtt.timeout(
+                [(g, a) for g, a in actions if self._expects_reply(g, a)]
+            )
+        timeouts = [t for g, a in actions if (t := self._codec.timeout(g, a))]
+        return max(timeouts, default=None)
+
+    def _replied(self, actions: list[tuple[str, str]], rtt: float | None) -> None:
+        """
+        Update the adaptive timeouts with the seconds until all replies to the actions
+        in a write were received (None if they timed out).
+        """
+        self._last_rtt = rtt
+        if self._rtt:
+            self._rtt.replied(
+                [(g, a) for g, a in actions if self._expects_reply(g, a)], rtt
+            )
+
+    def _decode_replies(self, actions: list[tuple[str, str]], text: str) -> list:
+        """
+        Parse the response text for a batch back into per-command results. Each
+        action's message decoder is searched for in order, so responses for actions
+        without any message definition are skipped.
+
+        :return: list of typed response values (or None) for each action
+        """
+        results = []
+        pos = 0
+        for group, action in actions:
+            if not (decoder := self._codec.decoder(group, action)):
+                results.append(None)
+                continue
+
+            result, pos = decoder.search(text, pos)
+            if result is None:
+                LOG.warning(f"No response found for {group}.{action} in: {text}")
+            results.append(result)
+        return results
+
+    def _decode_frames(self, actions: list[tuple[str, str]], frames: list[bytes]) -> list:
+        """
+        Decode the frame payloads received for a binary command back into results,
+        matching each action's message decoder against the frames in order.
+
+        :return: list of typed response values (or None) for each action
+        """
+        results = []
+        pos = 0
+        for group, action in actions:
+            if not (decoder := self._codec.frame_decoder(group, action)):
+                results.append(None)
+                continue
+
+            result = None
+            while result is None and pos < len(frames):
+                result = decoder.match(frames[pos])
+                pos += 1
+            if result is None:
+                LOG.warning(f"No response found for {group}.{action} in: {frames}")
+            results.append(result)
+        return results
+
+    def _list_request(self, group: str, action: str, kwargs: dict):
+        """
+        :return: (list decoder, request data) for a multi-line list action
+        """
+        if not (decoder := self._codec.list_decoder(group, action)):
+            raise ValueError(f"{group}.{action} does not return a multi-line response")
+        data, _ = self._prepare_batch([(group, action, kwargs)])[0]
+        return decoder, data
+
+    def label(self, var: str, value) -> str | None:
+        """
+        :return: the label for an enumerated value defined in the model's vars
+        (e.g. label("input", 0) returns "HDMI 1")
+        """
+        return self._codec.label(var, value)
+
+    def decode_message(self, line: str | bytes) -> tuple[str, str, dict | list] | None:
+        """
+        Decode a message received from the device that was not a reply to a
+        command (e.g. a front panel change).
+
+        :param line: line received (or frame payload, for binary models)
+        :return: (group, action, values) of the matching message (or None)
+        """
+        if self._codec.binary:
+            return self._codec.decode_frame(line)
+        return self._codec.decode_message(line)
+
     def _command(self, model_id: str, format_code: str, args=None):
         """
         Convert group/action/args into the full command string that should be sent
 
         FIXME: is this still even used/referenced?
         """
-        cmd_eol = self._protocol_def.get(CONF_COMMAND_EOL)
-        cmd_separator = self._protocol_def.get(CONF_COMMAND_SEPARATOR)
+        cmd_eol = self._model.get(CONF_COMMAND_EOL)
+        cmd_separator = self._model.get(CONF_COMMAND_SEPARATOR)
 
-        rs232_commands = self._protocol_def.get("commands")
+        rs232_commands = self._model.get("commands")
         command = rs232_commands.get(format_code) + cmd_separator + cmd_eol
 
         return command.format(**args).encode(
@@ -85,7 +433,10 @@ class DeviceClient(ABC):
 
     # @abstractmethod
     def describe(self) -> dict:
-        return self._protocol_def
+        """
+        :return: the complete model definition (loaded from the library on first use)
+        """
+        return self._model.describe()
 
     @classmethod
     def create(
@@ -94,6 +445,8 @@ class DeviceClient(ABC):
         url: str,
         connection_config_overrides=None,
         event_loop=None,
+        recorder=None,
+        negotiate_baudrate=False,
     ) -> DeviceClient:
         """
         Creates a DeviceClient instance using the standard pyserial connection
@@ -114,6 +467,9 @@ class DeviceClient(ABC):
         :param url: pyserial supported url for communication (e.g. '/dev/ttyUSB0' or 'socket://remote-host:4999/')
         :param connection_config_overrides: dictionary of serial port configuration overrides (e.g. baudrate)
         :param event_loop: optionally to get an interface that can be used asynchronously, pass in an event loop
+        :param recorder: optional TrafficRecorder to capture all bytes sent/received
+        :param negotiate_baudrate: use the fastest of the model's connection.baudrates
+          that the device responds at (ignored if the baudrate is overridden)
 
         :return an instance of DeviceControllerBase
         """
@@ -123,21 +479,93 @@ class DeviceClient(ABC):
         # caller can override the default serial port config for a given type
         # of device since the user could have changed settings on their
         # physical device (e.g. increasing the baud rate)
-        connection_config = model_def.get("communication", {}).get(
-            CONF_SERIAL_CONFIG, {}
+        connection_config = dict(
+            model_def.get("connection", {}).get(CONF_SERIAL_CONFIG, {})
         )
         if connection_config_overrides:
             LOG.info(
                 f"Overriding {model_id} serial config: {connection_config_overrides}; url={url}"
             )
             connection_config.update(connection_config_overrides)
+            if "baudrate" in connection_config_overrides:
+                negotiate_baudrate = False
 
         if event_loop:
             # lazy import the async client to avoid loading both sync/async
             from .async_client import DeviceClientAsync
 
-            return DeviceClientAsync(model_def, url, connection_config, event_loop)
+            return DeviceClientAsync(
+                model_def,
+                url,
+                connection_config,
+                event_loop,
+                recorder,
+                negotiate_baudrate,
+            )
         else:
             from .sync_client import DeviceClientSync
 
-            return DeviceClientSync(model_def, url, connection_config)
+            return DeviceClientSync(
+                model_def, url, connection_config, recorder, negotiate_baudrate
+            )
+
+
+def _split_action(text: str) -> tuple[str, str]:
+    """
+    :return: (group, action) for a group.action string
+    """
+    group, _, action = text.partition(".")
+    return group, action
+
+
+def _split_command(command) -> tuple[str, str, dict]:
+    """
+    :return: (group, action, kwargs) for a command tuple passed to send_many()
+    """
+    if len(command) == 2:
+        return command[0], command[1], {}
+    return command[0], command[1], command[2]
+
+
+class CommandBatch:
+    """
+    Commands collected by DeviceClient.batch() which are sent together using
+    send_many() on exit. Supports both 'with' and 'async with'.
+    """
+
+    def __init__(self, client: DeviceClient):
+        self._client = client
+        self._commands = []
+        self.results = None
+
+    def add(self, group: str, action: str, **kwargs) -> int:
+        """
+        Add a command to the batch.
+
+        :return: index of this command's response in results
+        """
+        self._commands.append((group, action, kwargs))
+        return len(self._commands) - 1
+
+    def __getattr__(self, name: str):
+        # allow adding commands using the group.action API (e.g. batch.power.on())
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return action_group(self.add, self._client._codec.api, name)
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def __enter__(self) -> CommandBatch:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None and self._commands:
+            self.results = self._client.send_many(self._commands)
+
+    async def __aenter__(self) -> CommandBatch:
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None and self._commands:
+            self.results = await self._client.send_many(self._commands)
@@ -0,0 +1,82 @@
+"""
+Health of the link to a device, checked with idle keepalive probes. Once nothing has
+been received from a device for the model's connection.keepalive idle time, its
+cheapest query (the keepalive action) is sent. Any data received proves the link is
+alive, including replies to other commands and unsolicited messages, so busy links
+are never probed. After the configured number of consecutive requests (probes or
+other commands) go unanswered, the device is degraded until anything is received
+from it again.
+
+connection:
+  keepalive:
+    action: ping.ping
+    idle: 30
+    misses: 3
+"""
+from ..const import (
+    CONF_KEEPALIVE_ACTION,
+    CONF_KEEPALIVE_IDLE,
+    CONF_KEEPALIVE_MISSES,
+    DEFAULT_KEEPALIVE_IDLE,
+    DEFAULT_KEEPALIVE_MISSES,
+    HEALTH_DEGRADED,
+    HEALTH_DISCONNECTED,
+    HEALTH_OK,
+)
+
+
+class Keepalive:
+    """
+    Keepalive settings of a model (connection.keepalive).
+    """
+
+    __slots__ = ("group", "action", "idle", "misses")
+
+    def __init__(self, keepalive_def: dict):
+        if not (action := keepalive_def.get(CONF_KEEPALIVE_ACTION)):
+            raise ValueError("connection.keepalive requires an action (e.g. ping.ping)")
+        self.group, _, self.action = action.partition(".")
+        self.idle = float(keepalive_def.get(CONF_KEEPALIVE_IDLE, DEFAULT_KEEPALIVE_IDLE))
+        self.misses = int(
+            keepalive_def.get(CONF_KEEPALIVE_MISSES, DEFAULT_KEEPALIVE_MISSES)
+        )
+        if self.idle <= 0 or self.misses < 1:
+            raise ValueError(f"Invalid connection.keepalive: {keepalive_def}")
+
+
+class LinkHealth:
+    """
+    Consecutive requests (keepalive probes or commands) that a device did not answer.
+    """
+
+    __slots__ = ("misses", "_max_misses", "_last_miss")
+
+    def __init__(self, max_misses: int):
+        self.misses = 0
+        self._max_misses = max_misses
+        self._last_miss = None
+
+    def missed(self, sent: float, last_received: float) -> bool:
+        """
+        Record a request sent at loop time sent that was not answered.
+
+        :param last_received: loop time that data was last received from the device
+        :return: True if the device just became degraded
+        """
+        # anything received since the previous miss proves the link was alive
+        if self._last_miss is None or last_received >= self._last_miss:
+            self.misses = 0
+        self.misses += 1
+        self._last_miss = sent
+        return self.misses == self._max_misses
+
+    def state(self, connected: bool, last_received: float) -> str:
+        """
+        :param last_received: loop time that data was last received from the device
+        :return: HEALTH_OK, HEALTH_DEGRADED or HEALTH_DISCONNECTED
+        """
+        if not connected:
+            return HEALTH_DISCONNECTED
+        if self.misses >= self._max_misses and last_received < self._last_miss:
+            return HEALTH_DEGRADED
+        return HEALTH_OK
@@ -0,0 +1,143 @@
+"""
+Slim runtime representation of a model, shared by every client of the model.
+
+Model definitions include descriptions, urls, docs and msg.tests examples that are
+only needed for documentation and validation (mcintosh_mx160.yaml is 1000+ lines,
+about 170 KiB once loaded). Clients only keep the compiled codec and the few
+sections used when connecting, sending commands and decoding replies; the full
+definition of a model loaded from the library is reloaded from its file when
+describe() is first called.
+"""
+import logging
+import sys
+import threading
+
+from ..codec import ModelCodec, codec_fingerprint, model_codec
+from ..const import CONF_NOTIFICATIONS
+
+LOG = logging.getLogger(__name__)
+
+# sections of a model definition used at runtime (the rest is documentation)
+RUNTIME_SECTIONS = ("id", "format", "settings", "connection", CONF_NOTIFICATIONS)
+
+_lock = threading.Lock()
+
+# model id -> RuntimeModels (more than one only if definitions were modified in memory)
+_RUNTIME_MODELS = {}
+
+# model id -> (path, runtime sections, codec fingerprint) of definitions loaded by the
+# library
+_MODEL_SOURCES = {}
+
+
+def _intern(value):
+    """
+    :return: copy of a value from a model definition with all strings interned
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {_intern(k): _intern(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern(v) for v in value]
+    return value
+
+
+def runtime_sections(model_def: dict) -> dict:
+    """
+    :return: copy of the sections of a model definition used at runtime
+    """
+    return {
+        key: _intern(model_def[key]) for key in RUNTIME_SECTIONS if key in model_def
+    }
+
+
+def register_model_source(model_def: dict, path: str) -> None:
+    """
+    Record the file a model definition was loaded from, so clients created from the
+    (unmodified) definition need not keep it and can reload it on describe().
+    """
+    if model_id := model_def.get("id"):
+        sections = runtime_sections(model_def)
+        fingerprint = codec_fingerprint(model_def)
+        with _lock:
+            _MODEL_SOURCES[model_id] = (path, sections, fingerprint)
+
+
+class RuntimeModel:
+    """
+    The compiled codec and runtime sections of a model definition. Supports get()
+    for the runtime sections, so it can stand in for the definition when connecting.
+    """
+
+    __slots__ = ("id", "codec", "_sections", "_fingerprint", "_source", "_definition")
+
+    def __init__(
+        self,
+        model_def: dict,
+        sections: dict,
+        fingerprint: tuple[int, int],
+        source: str | None = None,
+    ):
+        """
+        :param sections: the definition's runtime_sections()
+        :param fingerprint: the definition's codec_fingerprint() (api, vars and format)
+        :param source: file the definition can be reloaded from (otherwise it is kept)
+        """
+        self.id = sections.get("id")
+        self.codec: ModelCodec = model_codec(model_def, fingerprint)
+        self._sections = sections
+        self._fingerprint = fingerprint
+        self._source = source
+        self._definition = None if source else model_def
+
+    def __repr__(self) -> str:
+        return f"RuntimeModel({self.id})"
+
+    def get(self, section: str, default=None):
+        """
+        :return: a runtime section of the definition (e.g. format or settings)
+        """
+        return self._sections.get(section, default)
+
+    @property
+    def settings(self) -> dict:
+        return self._sections.get("settings") or {}
+
+    def describe(self) -> dict:
+        """
+        :return: the complete model definition (loaded from the library file on first use)
+        """
+        if self._definition is None:
+            import yaml  # only needed for describe(), so not imported by clients
+
+            LOG.debug(f"Loading {self.id} definition from {self._source}")
+            with open(self._source, "r") as f:
+                self._definition = yaml.safe_load(f)
+        return self._definition
+
+
+def runtime_model(model_def: dict) -> RuntimeModel:
+    """
+    :return: the RuntimeModel for a model definition (shared by all clients of
+      definitions with the same id, runtime sections and api)
+    """
+    model_id = model_def.get("id")
+    sections = runtime_sections(model_def)
+    fingerprint = codec_fingerprint(model_def)
+
+    with _lock:
+        models = _RUNTIME_MODELS.setdefault(model_id, [])
+        for model in models:
+            if model._fingerprint == fingerprint and model._sections == sections:
+                return model
+
+        # only definitions loaded unmodified from the library can be reloaded
+        source = None
+        loaded = _MODEL_SOURCES.get(model_id)
+        if loaded and loaded[1] == sections and loaded[2] == fingerprint:
+            source = loaded[0]
+
+        model = RuntimeModel(model_def, sections, fingerprint, source)
+        models.append(model)
+        return model
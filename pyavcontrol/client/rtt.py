@@ -0,0 +1,138 @@
+"""
+Adaptive reply timeouts, set from the round-trip times observed for each action of
+a device in the same way as TCP's retransmission timer (RFC 6298). A smoothed
+round-trip time (SRTT) and its mean deviation (RTTVAR) are updated with each reply,
+and the timeout is SRTT + 4 * RTTVAR, clamped to the model's connection.rtt
+min_timeout/max_timeout. Each timeout doubles the action's timeout (up to the
+ceiling) until a reply is received again.
+
+Fast links detect a dead device within a few round trips rather than the fixed
+connection timeout, while slow actions (e.g. power on) learn a longer timeout.
+"""
+import logging
+
+from ..const import (
+    CONF_RTT_MAX_TIMEOUT,
+    CONF_RTT_MIN_TIMEOUT,
+    DEFAULT_RTT_MAX_TIMEOUT,
+    DEFAULT_RTT_MIN_TIMEOUT,
+)
+
+LOG = logging.getLogger(__name__)
+
+# gains of the smoothed round-trip time and its deviation, and the number of
+# deviations allowed above the smoothed time (RFC 6298)
+RTT_ALPHA = 1 / 8
+RTT_BETA = 1 / 4
+RTT_K = 4
+
+
+class RttEstimator:
+    """
+    Round-trip time estimate and reply timeout for one action of a device.
+    """
+
+    __slots__ = ("srtt", "rttvar", "timeout", "samples", "timeouts", "_min", "_max")
+
+    def __init__(self, initial: float, min_timeout: float, max_timeout: float):
+        """
+        :param initial: timeout until the first reply is received
+        """
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+        self.timeouts = 0
+        self._min = min_timeout
+        self._max = max_timeout
+        self.timeout = self._clamp(initial)
+
+    def _clamp(self, timeout: float) -> float:
+        return min(max(timeout, self._min), self._max)
+
+    def sample(self, rtt: float) -> None:
+        """
+        Update the estimate with the seconds between sending a request and receiving
+        the complete reply.
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += RTT_BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += RTT_ALPHA * (rtt - self.srtt)
+        self.samples += 1
+        self.timeout = self._clamp(self.srtt + RTT_K * self.rttvar)
+
+    def timed_out(self) -> None:
+        """
+        Back off after a reply was not received within the timeout.
+        """
+        self.timeouts += 1
+        self.timeout = self._clamp(self.timeout * 2)
+
+    def stats(self) -> dict:
+        return {
+            "srtt": self.srtt,
+            "rttvar": self.rttvar,
+            "timeout": self.timeout,
+            "samples": self.samples,
+            "timeouts": self.timeouts,
+        }
+
+
+class ReplyTimeouts:
+    """
+    RttEstimators for each action of a device (created on first use).
+    """
+
+    def __init__(self, codec, rtt_def: dict, default_timeout: float):
+        """
+        :param codec: the model's ModelCodec (for the timeout defined on each action)
+        :param rtt_def: the model's connection.rtt settings
+        :param default_timeout: initial timeout of actions without their own timeout
+        """
+        self._codec = codec
+        self._default = default_timeout
+        self._min = float(rtt_def.get(CONF_RTT_MIN_TIMEOUT, DEFAULT_RTT_MIN_TIMEOUT))
+        self._max = float(rtt_def.get(CONF_RTT_MAX_TIMEOUT, DEFAULT_RTT_MAX_TIMEOUT))
+        self._estimators = {}
+
+    def estimator(self, group: str, action: str) -> RttEstimator:
+        key = (group, action)
+        if not (estimator := self._estimators.get(key)):
+            initial = self._codec.timeout(group, action) or self._default
+
+            # an action's own timeout may exceed max_timeout (e.g. slow power on)
+            estimator = RttEstimator(initial, self._min, max(self._max, initial))
+            self._estimators[key] = estimator
+        return estimator
+
+    def timeout(self, actions: list[tuple[str, str]]) -> float:
+        """
+        :param actions: actions with replies in a single write
+        :return: seconds to wait for all their replies (sent one after another)
+        """
+        return sum(self.estimator(group, action).timeout for group, action in actions)
+
+    def replied(self, actions: list[tuple[str, str]], rtt: float | None) -> None:
+        """
+        Record the seconds until all replies to a write were received (None if they
+        were not received within the timeout).
+        """
+        if rtt is None:
+            for group, action in actions:
+                self.estimator(group, action).timed_out()
+
+        # the time for a batch depends on all its commands, so only single replies
+        # are sampled
+        elif len(actions) == 1:
+            self.estimator(*actions[0]).sample(rtt)
+
+    def stats(self) -> dict[str, dict]:
+        """
+        :return: estimator state of each action (keyed by group.action)
+        """
+        return {
+            f"{group}.{action}": estimator.stats()
+            for (group, action), estimator in list(self._estimators.items())
+        }
@@ -1,4 +1,6 @@
 import logging
+import threading
+import time
 from abc import ABC
 from collections.abc import Callable
 
@@ -12,12 +14,30 @@ LOG = logging.getLogger(__name__)
 
 
 class DeviceClientSync(DeviceClient, ABC):
-    def __init__(self, model_def: dict, url: str, serial_config: dict):
-        DeviceClient.__init__(self, model_def, url, serial_config)
-        self._connection = serial.serial_for_url(url, **serial_config)
+    def __init__(
+        self,
+        model_def: dict,
+        url: str,
+        serial_config: dict,
+        recorder=None,
+        negotiate_baudrate: bool = False,
+    ):
+        DeviceClient.__init__(
+            self, model_def, url, serial_config, recorder, negotiate_baudrate
+        )
+        # communication with each device is serialized independently of other devices,
+        # so a thread pool can talk to many devices in parallel
+        self._lock = threading.RLock()
+        self._connection = serial.serial_for_url(url, **self._negotiated_config())
         self._callback = None
         self._encoding = serial_config.get("encoding", DEFAULT_ENCODING)
 
+        # set when a reply was not completely read, so it is discarded before the next send
+        self._stale_input = False
+
+        # splits the bytes received from binary models into frames (see codec/binary.py)
+        self._framer = self._codec.framer() if self._codec.binary else None
+
     @synchronized
     def send_raw(self, data: bytes) -> None:
         if LOG.isEnabledFor(logging.DEBUG):
@@ -26,11 +46,193 @@ class DeviceClientSync(DeviceClient, ABC):
         # send the data and flush all the bytes to the connection
         self._connection.write(data)
         self._connection.flush()
+        if self._recorder:
+            self._recorder.tx(data)
 
-    @synchronized
-    def send_command(self, group: str, action: str, **kwargs) -> None:
-        # self.send_raw(data.bytes())
-        LOG.error(f"Not implemented!")  # FIXME
+    def send_command(self, group: str, action: str, **kwargs) -> dict | None:
+        return self.send_many([(group, action, kwargs)])[0]
+
+    def send_many(self, commands: list, timeout: float = None) -> list:
+        deadline = time.monotonic() + timeout if timeout else None
+        if not self._lock.acquire(timeout=timeout or -1):
+            raise serial.SerialTimeoutException(
+                f"Timeout waiting for earlier commands to {self._url}"
+            )
+
+        try:
+            self._last_rtt = None
+            results = []
+            for data, actions in self._prepare_batch(commands):
+                reply_timeout = self._reply_timeout(actions) or self._connection.timeout
+                limited = False  # the deadline rather than the reply timeout applies
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise serial.SerialTimeoutException(
+                            f"Timeout sending commands to {self._url}"
+                        )
+                    limited = not reply_timeout or remaining < reply_timeout
+                    reply_timeout = min(reply_timeout or remaining, remaining)
+
+                self._discard_stale_input()
+                self.send_raw(data)
+                sent = time.monotonic()
+
+                # wait for a response line for each action that expects a reply
+                expected = sum(1 for g, a in actions if self._expects_reply(g, a))
+                if not expected:
+                    replies = [] if self._framer else ""
+                elif self._framer:
+                    replies = self._read_frames(expected, reply_timeout)
+                else:
+                    replies = self._read_lines(expected, reply_timeout)
+                if expected and not self._stale_input:
+                    self._replied(actions, time.monotonic() - sent)
+                elif expected and not limited:
+                    self._replied(actions, None)
+                if self._framer:
+                    results.extend(self._decode_frames(actions, replies))
+                else:
+                    results.extend(self._decode_replies(actions, replies))
+            return results
+        finally:
+            self._lock.release()
+
+    def _discard_stale_input(self) -> None:
+        """
+        Discard the rest of any reply that was not completely read (e.g. after a
+        timeout), so it is not mistaken for the reply to the next command.
+        """
+        # unsolicited frames from binary devices are never read, so they are always
+        # discarded (as by the async connection) rather than mistaken for replies
+        if self._stale_input or self._framer:
+            self._connection.reset_input_buffer()
+            if self._framer:
+                self._framer.clear()
+            self._stale_input = False
+
+    def stream(self, group: str, action: str, **kwargs):
+        """
+        Send a command that returns a multi-line list response (see msg.lines)
+        and yield each decoded item as it is received. E.g.
+
+        for mode in client.stream("audio_mode", "modes"):
+            print(mode["name"])
+        """
+        decoder, data = self._list_request(group, action, kwargs)
+
+        with self._lock:
+            self._discard_stale_input()
+            self.send_raw(data)
+
+            # the caller may stop iterating before the entire response was read
+            self._stale_input = True
+
+            reader = decoder.reader()
+            while not reader.done:
+                line = self._read_line(decoder.idle)
+                if line is None:
+                    if decoder.idle:
+                        return
+                    raise serial.SerialTimeoutException(
+                        f"Timeout waiting for {group}.{action} response lines"
+                    )
+                if (item := reader.feed(line)) is not None:
+                    yield item
+            self._stale_input = False
+
+    def collect(self, group: str, action: str, **kwargs) -> list[dict]:
+        """
+        :return: all the decoded items of a multi-line list response
+        """
+        return list(self.stream(group, action, **kwargs))
+
+    def _read_line(self, timeout=None) -> str | None:
+        """
+        Read a single non-blank response line (without eol).
+
+        :param timeout: override the connection timeout for this read
+        :return: the line, or None if the timeout was reached
+        """
+        eol = self._format_setting("message", "eol", DEFAULT_EOL).encode(self._encoding)
+
+        original_timeout = self._connection.timeout
+        if timeout:
+            self._connection.timeout = timeout
+        try:
+            while True:
+                line = self._connection.read_until(eol)
+                if line and self._recorder:
+                    self._recorder.rx(line)
+                if not line.endswith(eol):
+                    return None
+                if line := line[: -len(eol)]:
+                    return line.decode(self._encoding, errors="ignore")
+        finally:
+            if timeout:
+                self._connection.timeout = original_timeout
+
+    def _read_lines(self, count: int, timeout: float = None) -> str:
+        """
+        Read up to count response lines from the device, stopping early if
+        the timeout is reached.
+
+        :param timeout: seconds allowed for the entire response (not each line)
+        :return: all response text received
+        """
+        eol = self._format_setting("message", "eol", DEFAULT_EOL).encode(self._encoding)
+        deadline = time.monotonic() + timeout if timeout else None
+
+        original_timeout = self._connection.timeout
+        result = bytearray()
+        try:
+            for _ in range(count):
+                if deadline is not None:
+                    self._connection.timeout = max(0, deadline - time.monotonic())
+
+                line = self._connection.read_until(eol)
+                if line and self._recorder:
+                    self._recorder.rx(line)
+                result += line
+                if not line.endswith(eol):
+                    LOG.warning(
+                        f"Timeout waiting for response from {self._url}: {result}"
+                    )
+                    self._stale_input = True
+                    break
+        finally:
+            self._connection.timeout = original_timeout
+        return result.decode(self._encoding, errors="ignore")
+
+    def _read_frames(self, count: int, timeout: float = None) -> list[bytes]:
+        """
+        Read up to count frames from a binary device, stopping early if the timeout
+        is reached.
+
+        :param timeout: seconds allowed for the entire response (not each frame)
+        :return: payloads of the frames received
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+
+        original_timeout = self._connection.timeout
+        frames = []
+        try:
+            while len(frames) < count:
+                if deadline is not None:
+                    self._connection.timeout = max(0, deadline - time.monotonic())
+
+                # read whatever has arrived (at least a byte, waiting up to the timeout)
+                data = self._connection.read(max(1, self._connection.in_waiting))
+                if not data:
+                    LOG.warning(f"Timeout waiting for response from {self._url}")
+                    self._stale_input = True
+                    break
+                if self._recorder:
+                    self._recorder.rx(data)
+                frames.extend(bytes(payload) for payload in self._framer.feed(data))
+        finally:
+            self._connection.timeout = original_timeout
+        return frames
 
     @synchronized
     def register_callback(self, callback: Callable[[str], None]) -> None:
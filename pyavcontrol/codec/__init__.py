@@ -0,0 +1,6 @@
+# expose decoders/encoders through just importing the package itself
+from .binary import BinaryDecoder, BinaryEncoder, BinaryFormat, BinaryFramer
+from .fixed_width import FixedWidthDecoder
+from .message import RegexDecoder
+from .model import ModelCodec, codec_fingerprint, model_codec
+from .vars import VarCodec
@@ -0,0 +1,505 @@
+"""
+Binary (hex) protocols, where commands and messages are frames of bytes rather
+than text lines (e.g. Russound RNET, Parasound, Knox). The frame layout is defined
+once for the model in format.binary:
+
+    format:
+      binary:
+        byteorder: big        # of multi-byte values (default=big)
+        header: [0xF0]        # bytes starting each frame
+        length: B             # struct code of the payload length following the header
+        checksum:
+          type: sum8          # sum8, xor8, crc8 (poly 0x07) or crc16 (Modbus)
+          range: frame        # frame (header through payload, default) or payload
+          mask: 0x7F          # applied to the computed checksum (optional)
+        footer: [0xF7]        # bytes ending each frame
+        escape:               # bytes that must not appear within a frame (optional)
+          byte: 0xF1
+          bytes: [0xF0, 0xF1, 0xF7]
+          xor: 0xFF           # sent as the escape byte followed by byte ^ xor
+
+Each action's payload is a list of constant bytes (ints or hex strings) and named
+fields with their struct format code:
+
+    cmd:
+      binary: [0x05, {zone: B}, 0x02, {volume: B}]
+    msg:
+      binary: [0x06, {zone: B}, {volume: B}, {name: 12s}]
+
+Payloads are compiled into struct layouts once, so encoding is a single pack (plus
+the checksum from a precomputed table) and decoding a single unpack_from a
+memoryview of the received frame. Frames need a length or a footer
+(escaped frames a footer) so they can be split from the received stream.
+"""
+import logging
+import functools
+import operator
+import re
+import struct
+
+from .vars import VarCodec
+
+LOG = logging.getLogger(__name__)
+
+
+def _crc8_table(poly: int) -> bytes:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+def _crc16_table(poly: int) -> tuple[int, ...]:
+    # reflected (least significant bit first), as used by Modbus
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC8_TABLE = _crc8_table(0x07)
+CRC16_TABLE = _crc16_table(0xA001)
+
+
+def sum8(data) -> int:
+    return sum(data) & 0xFF
+
+
+def xor8(data) -> int:
+    return functools.reduce(operator.xor, data, 0)
+
+
+def crc8(data) -> int:
+    crc = 0
+    table = CRC8_TABLE
+    for byte in data:
+        crc = table[crc ^ byte]
+    return crc
+
+
+def crc16(data) -> int:
+    crc = 0xFFFF
+    table = CRC16_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+# checksum type -> (function, size in bytes)
+CHECKSUMS = {
+    "sum8": (sum8, 1),
+    "xor8": (xor8, 1),
+    "crc8": (crc8, 1),
+    "crc16": (crc16, 2),
+}
+
+
+def _const_bytes(value) -> bytes:
+    """
+    :return: bytes for a constant from the model (int, hex string or list of either)
+    """
+    if isinstance(value, int):
+        return bytes([value])
+    if isinstance(value, str):
+        return bytes.fromhex(value)
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    return b"".join(_const_bytes(v) for v in value or ())
+
+
+def _compile_payload(payload_def: list) -> tuple[list[str], list, list[tuple]]:
+    """
+    :return: (struct code of each item, template values with None for fields,
+      [(index, name, code)] of the fields)
+    """
+    codes = []
+    values = []
+    fields = []
+    for item in payload_def:
+        if isinstance(item, dict):
+            if len(item) != 1:
+                raise ValueError(f"Binary field must be a single name: code: {item}")
+            name, code = next(iter(item.items()))
+            struct.calcsize(code)  # raises struct.error for invalid codes
+            fields.append((len(values), name, code))
+            codes.append(code)
+            values.append(None)
+        else:
+            const = _const_bytes(item)
+            codes.append(f"{len(const)}s")
+            values.append(const)
+    return codes, values, fields
+
+
+class BinaryFormat:
+    """
+    The frame layout shared by all of a model's binary commands and messages.
+    """
+
+    __slots__ = (
+        "order",
+        "header",
+        "footer",
+        "length",
+        "checksum",
+        "checksum_struct",
+        "checksum_size",
+        "checksum_payload_only",
+        "checksum_mask",
+        "escape_pattern",
+        "_escape_byte",
+        "_escaped",
+        "_unescape_pattern",
+        "_unescape_xor",
+    )
+
+    def __init__(self, binary_def: dict):
+        self.order = ">" if binary_def.get("byteorder", "big") == "big" else "<"
+        self.header = _const_bytes(binary_def.get("header"))
+        self.footer = _const_bytes(binary_def.get("footer"))
+
+        length = binary_def.get("length")
+        self.length = struct.Struct(self.order + length) if length else None
+
+        self.checksum = None
+        self.checksum_struct = None
+        self.checksum_size = 0
+        self.checksum_payload_only = False
+        self.checksum_mask = None
+        if checksum_def := binary_def.get("checksum"):
+            if isinstance(checksum_def, str):
+                checksum_def = {"type": checksum_def}
+            try:
+                self.checksum, size = CHECKSUMS[checksum_def["type"]]
+            except KeyError:
+                raise ValueError(
+                    f"Unknown checksum {checksum_def.get('type')} (expected one of "
+                    f"{list(CHECKSUMS)})"
+                ) from None
+            order = self.order
+            if byteorder := checksum_def.get("byteorder"):
+                order = ">" if byteorder == "big" else "<"
+            self.checksum_struct = struct.Struct(order + ("B" if size == 1 else "H"))
+            self.checksum_size = size
+            self.checksum_payload_only = checksum_def.get("range") == "payload"
+            self.checksum_mask = checksum_def.get("mask")
+
+        self.escape_pattern = None
+        if escape_def := binary_def.get("escape"):
+            escape = escape_def["byte"]
+            xor = escape_def.get("xor", 0xFF)
+            escaped = _const_bytes(escape_def.get("bytes"))
+            self.escape_pattern = re.compile(b"[" + re.escape(escaped) + b"]")
+            self._escape_byte = bytes([escape])
+            self._escaped = {bytes([b]): bytes([escape, b ^ xor]) for b in escaped}
+            self._unescape_pattern = re.compile(
+                re.escape(bytes([escape])) + b"(.)", re.S
+            )
+            self._unescape_xor = xor
+            if not self.footer:
+                raise ValueError("Binary format with escape bytes requires a footer")
+
+        if not self.length and not self.footer:
+            raise ValueError(
+                "Binary format requires a length or footer to split frames"
+            )
+
+    def compute_checksum(self, data) -> int:
+        value = self.checksum(data)
+        if self.checksum_mask is not None:
+            value &= self.checksum_mask
+        return value
+
+    def escape(self, data) -> bytes:
+        return self.escape_pattern.sub(lambda m: self._escaped[m.group()], data)
+
+    def unescape(self, data) -> bytes:
+        xor = self._unescape_xor
+        return self._unescape_pattern.sub(lambda m: bytes([m.group(1)[0] ^ xor]), data)
+
+    def unescape_frame(self, frame: bytes) -> bytes:
+        """
+        :return: the frame with escape sequences between header and footer removed
+        """
+        header = len(self.header)
+        if frame.find(self._escape_byte, header) < 0:
+            return frame
+        body = self.unescape(frame[header : len(frame) - len(self.footer)])
+        return self.header + body + self.footer
+
+
+class BinaryEncoder:
+    """
+    Encodes the arguments for an action into a complete frame.
+    """
+
+    __slots__ = (
+        "args",
+        "size",
+        "_format",
+        "_struct",
+        "_template",
+        "_fields",
+        "_checksum_start",
+    )
+
+    def __init__(
+        self, payload_def: list, fmt: BinaryFormat, var_codecs: dict[str, VarCodec]
+    ):
+        codes, values, fields = _compile_payload(payload_def)
+        self._format = fmt
+
+        # header, length and payload are packed together by a single struct
+        layout = [f"{len(fmt.header)}s"]
+        template = [fmt.header]
+        if fmt.length:
+            layout.append(fmt.length.format.lstrip("<>!=@"))
+            template.append(struct.calcsize(fmt.order + "".join(codes)))
+        offset = len(template)
+
+        payload_offset = struct.calcsize(fmt.order + "".join(layout))
+        self._checksum_start = payload_offset if fmt.checksum_payload_only else 0
+
+        self._struct = struct.Struct(fmt.order + "".join(layout + codes))
+        self._template = template + values
+        self._fields = tuple(
+            (offset + index, name, var_codecs.get(name)) for index, name, _ in fields
+        )
+        self.args = tuple(name for _, name, _ in fields)
+
+        self.size = self._struct.size + fmt.checksum_size + len(fmt.footer)
+
+    def _values(self, kwargs: dict) -> list:
+        values = self._template.copy()
+        try:
+            for index, name, codec in self._fields:
+                value = kwargs[name]
+                values[index] = codec.encode(value) if codec else value
+        except KeyError:
+            missing = [arg for arg in self.args if arg not in kwargs]
+            raise ValueError(f"Missing required keys {missing}") from None
+        return values
+
+    def encode(self, **kwargs) -> bytes:
+        fmt = self._format
+        try:
+            frame = self._struct.pack(*self._values(kwargs))
+        except struct.error as e:
+            raise ValueError(f"Invalid value for binary frame: {e}") from None
+
+        if fmt.checksum:
+            checksum = fmt.compute_checksum(frame[self._checksum_start :])
+            frame += fmt.checksum_struct.pack(checksum)
+        if fmt.escape_pattern and fmt.escape_pattern.search(frame, len(fmt.header)):
+            frame = fmt.header + fmt.escape(frame[len(fmt.header) :])
+        return frame + fmt.footer
+
+
+class BinaryDecoder:
+    """
+    Decodes the payload of a frame into a dictionary of typed values.
+    """
+
+    __slots__ = ("prefix", "size", "_struct", "_names", "_converters", "_types")
+
+    def __init__(
+        self, payload_def: list, fmt: BinaryFormat, var_codecs: dict[str, VarCodec]
+    ):
+        codes, values, fields = _compile_payload(payload_def)
+
+        # constants are skipped as padding, so only the fields are unpacked
+        layout = [
+            code if value is None else f"{len(value)}x"
+            for code, value in zip(codes, values)
+        ]
+        self._struct = struct.Struct(fmt.order + "".join(layout))
+        self.size = self._struct.size
+
+        # leading constants identify the message (e.g. a message type byte)
+        prefix = []
+        for value in values:
+            if value is None:
+                break
+            prefix.append(value)
+        self.prefix = b"".join(prefix)
+
+        self._names = tuple(name for _, name, _ in fields)
+        converters = []
+        types = {}
+        for _, name, code in fields:
+            if code.endswith("s"):
+                converters.append((name, _decode_string))
+                types[name] = "string"
+            elif code.endswith(("e", "f", "d")):
+                types[name] = "float"
+            else:
+                codec = var_codecs.get(name)
+                if codec and codec.type == "int":
+                    converters.append((name, codec.decode))  # checks ranges
+                types[name] = "int"
+        self._converters = tuple(converters)
+        self._types = types
+
+    def field_types(self) -> dict[str, str]:
+        """
+        :return: dictionary of each field to its decoded type
+        """
+        return dict(self._types)
+
+    def match(self, payload) -> dict | None:
+        """
+        :param payload: frame payload (bytes or memoryview, e.g. from BinaryFramer)
+        :return: typed values if the payload is this message, otherwise None
+        """
+        if len(payload) != self.size or payload[: len(self.prefix)] != self.prefix:
+            return None
+        values = dict(zip(self._names, self._struct.unpack_from(payload)))
+        for name, convert in self._converters:
+            values[name] = convert(values[name])
+        return values
+
+
+def _decode_string(value: bytes) -> str:
+    return value.rstrip(b"\0 ").decode("ascii", errors="ignore")
+
+
+class BinaryFramer:
+    """
+    Splits the bytes received from a device into frame payloads, removing escapes
+    and dropping frames with an invalid length, checksum or footer.
+    """
+
+    def __init__(self, fmt: BinaryFormat, max_payload: int | None = None):
+        """
+        :param max_payload: longest valid payload, so that a header byte within
+          unframed data (e.g. after connecting mid-frame) is skipped rather than
+          waiting for a frame that never completes
+        """
+        self._format = fmt
+        self._buffer = bytearray()
+        self.errors = 0
+
+        self._payload_start = len(fmt.header) + (fmt.length.size if fmt.length else 0)
+        self._trailer_size = fmt.checksum_size + len(fmt.footer)
+        # frames split on the footer need not check it again
+        self._check_footer = fmt.footer and fmt.length and not fmt.escape_pattern
+
+        self.max_frame = None
+        if max_payload is not None:
+            body = (fmt.length.size if fmt.length else 0) + max_payload
+            body += fmt.checksum_size
+            if fmt.escape_pattern:
+                body *= 2
+            self.max_frame = len(fmt.header) + body + len(fmt.footer)
+
+    def feed(self, data: bytes):
+        """
+        Yield the payload of each complete frame received. Each payload is a
+        memoryview that is only valid until the next payload is requested.
+        """
+        fmt = self._format
+        buffer = self._buffer
+        buffer += data
+
+        header = fmt.header
+        footer = fmt.footer
+        pos = 0
+        try:
+            while pos < len(buffer):
+                start = buffer.find(header, pos) if header else pos
+                if start < 0:
+                    # keep what could be the start of a header split across reads
+                    pos = max(pos, len(buffer) - len(header) + 1)
+                    break
+
+                end = self._frame_end(buffer, start)
+                size = (len(buffer) if end is None else end) - start
+                if self.max_frame and size > self.max_frame:
+                    self._drop(buffer[start : start + size])
+                    pos = start + 1
+                    continue
+                if end is None or end > len(buffer):
+                    pos = start
+                    break
+
+                if fmt.escape_pattern:
+                    frame = memoryview(fmt.unescape_frame(buffer[start:end]))
+                else:
+                    frame = memoryview(buffer)[start:end]
+
+                if (payload := self._payload(frame)) is None:
+                    self._drop(frame)
+                    frame.release()
+                    pos = start + 1
+                    continue
+
+                pos = end
+                try:
+                    yield payload
+                finally:
+                    payload.release()
+                    frame.release()
+        finally:
+            try:
+                del buffer[:pos]
+            except BufferError:
+                # a payload is still referenced by the caller
+                self._buffer = bytearray(buffer[pos:])
+
+    def clear(self) -> None:
+        """
+        Discard any partially received frame (e.g. after a reply timed out).
+        """
+        self._buffer = bytearray()
+
+    def _drop(self, frame) -> None:
+        self.errors += 1
+        LOG.debug(f"Dropping invalid frame: {bytes(frame).hex(' ')}")
+
+    def _frame_end(self, buffer: bytearray, start: int) -> int | None:
+        """
+        :return: end of the frame starting at start (which may be beyond the data
+          received so far), or None if not yet known
+        """
+        fmt = self._format
+        if fmt.footer and (fmt.escape_pattern or not fmt.length):
+            end = buffer.find(fmt.footer, start + len(fmt.header))
+            return end + len(fmt.footer) if end >= 0 else None
+
+        length_at = start + len(fmt.header)
+        if len(buffer) < length_at + fmt.length.size:
+            return None
+        length = fmt.length.unpack_from(buffer, length_at)[0]
+        return (
+            length_at + fmt.length.size + length + fmt.checksum_size + len(fmt.footer)
+        )
+
+    def _payload(self, frame: memoryview) -> memoryview | None:
+        """
+        :return: the payload of a complete frame (or None if the frame is invalid)
+        """
+        fmt = self._format
+        payload_start = self._payload_start
+        payload_end = len(frame) - self._trailer_size
+
+        if payload_end < payload_start:
+            return None
+        if self._check_footer and frame[len(frame) - len(fmt.footer) :] != fmt.footer:
+            return None
+        if fmt.length:
+            length = fmt.length.unpack_from(frame, len(fmt.header))[0]
+            if length != payload_end - payload_start:
+                return None
+
+        if fmt.checksum:
+            start = payload_start if fmt.checksum_payload_only else 0
+            expected = fmt.compute_checksum(frame[start:payload_end])
+            if fmt.checksum_struct.unpack_from(frame, payload_end)[0] != expected:
+                return None
+        return frame[payload_start:payload_end]
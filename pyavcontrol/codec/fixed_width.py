@@ -0,0 +1,170 @@
+"""
+Fixed-width (positional) decoding of block status responses, such as the
+Xantech all_status response which returns a prefix followed by a fixed-width
+record for each zone:
+
+    msg:
+      fixed:
+        prefix: '#>'
+        type: int      # default type for fields not typed by vars
+        fields:        # field name and width (in order)
+          zone: 2
+          power: 2
+          volume:
+            width: 2
+            type: int
+"""
+import logging
+import struct
+from collections import namedtuple
+
+from ..core import camel_case
+from .vars import VarCodec
+
+LOG = logging.getLogger(__name__)
+
+CONVERTERS = {
+    "int": int,
+    "string": lambda value: value.decode("ascii"),
+    "bytes": bytes,
+}
+
+
+def _from_ascii(convert):
+    return lambda value: convert(value.decode("ascii"))
+
+
+class FixedWidthDecoder:
+    """
+    Decodes a fixed-width block response using a precompiled struct layout
+    so that all the records in a block are decoded in a single pass.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fixed_def: dict,
+        var_codecs: dict[str, VarCodec] = None,
+        eol="\r",
+    ):
+        """
+        :param name: name for the decoded record type (e.g. zone all_status)
+        :param fixed_def: the msg.fixed definition from the model
+        :param var_codecs: the model's compiled vars (fields named after a var are
+          converted by it, with the same range checks as regex messages)
+        :param eol: end of line that terminates a block within a response
+        """
+        var_codecs = var_codecs or {}
+        default_type = fixed_def.get("type", "string")
+
+        self._prefix_text = fixed_def.get("prefix", "")
+        self._prefix = self._prefix_text.encode("ascii")
+        self._eol = eol
+
+        names = []
+        widths = []
+        converters = []
+        types = []
+        for field, spec in fixed_def["fields"].items():
+            if isinstance(spec, dict):
+                width = spec["width"]
+                var_type = spec.get("type")
+            else:
+                width = spec
+                var_type = None
+
+            codec = var_codecs.get(field)
+            if codec and var_type in (None, codec.type):
+                var_type = codec.type
+                convert = codec.decode
+                if var_type != "int":  # int() accepts the field bytes directly
+                    convert = _from_ascii(convert)
+            else:
+                var_type = var_type or default_type
+                convert = CONVERTERS[var_type]
+
+            names.append(field)
+            widths.append(width)
+            converters.append(convert)
+            types.append("int" if var_type == "int" else "string")
+
+        self._struct = struct.Struct("".join(f"{w}s" for w in widths))
+        self._converters = tuple(converters)
+        self._types = tuple(types)
+        self._all_int = all(c is int for c in converters)
+        self.record_type = namedtuple(camel_case(name), names)
+
+    @property
+    def prefix(self) -> str:
+        return self._prefix_text
+
+    def match(self, text: str) -> list[tuple] | None:
+        """
+        :return: decoded records if the text is a block response, otherwise None
+        """
+        if not text.startswith(self._prefix_text):
+            return None
+        return self.decode(text)
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return self.record_type._fields
+
+    def field_types(self) -> dict[str, str]:
+        """
+        :return: dictionary of each field to its type (int or string)
+        """
+        return dict(zip(self.fields, self._types))
+
+    @property
+    def record_size(self) -> int:
+        return self._struct.size
+
+    def decode(self, data: bytes | bytearray | memoryview | str) -> list[tuple] | None:
+        """
+        Decode all the records in a block response (excluding eol).
+
+        :return: list of records (as named tuples) in the order received (None if
+          a field could not be converted, e.g. a garbled block)
+        """
+        if isinstance(data, str):
+            data = data.encode("ascii")
+        view = memoryview(data)
+
+        prefix_len = len(self._prefix)
+        if prefix_len:
+            if view[:prefix_len] != self._prefix:
+                raise ValueError(f"Response missing prefix {self._prefix}: {data}")
+            view = view[prefix_len:]
+
+        size = self._struct.size
+        if remainder := len(view) % size:
+            LOG.debug(f"Ignoring {remainder} trailing bytes in block response: {data}")
+            view = view[: len(view) - remainder]
+
+        make = self.record_type._make
+        converters = self._converters
+        try:
+            if self._all_int:
+                return [make(map(int, f)) for f in self._struct.iter_unpack(view)]
+            return [
+                make([convert(value) for convert, value in zip(converters, fields)])
+                for fields in self._struct.iter_unpack(view)
+            ]
+        except (ValueError, UnicodeDecodeError) as e:
+            LOG.warning(f"Dropping block response with an invalid field ({e}): {data}")
+            return None
+
+    def search(self, text: str, pos: int = 0) -> tuple[list[tuple] | None, int]:
+        """
+        Find and decode the next block in the response text starting at pos.
+
+        :return: (list of records or None, position after the block)
+        """
+        start = text.find(self._prefix_text, pos)
+        if start < 0:
+            return None, pos
+
+        if (end := text.find(self._eol, start)) < 0:
+            end = len(text)
+        return self.decode(text[start:end]), end
@@ -0,0 +1,235 @@
+"""
+Precompiled decoders for response messages defined by msg.regex in a model.
+"""
+from __future__ import annotations
+
+import logging
+import re
+
+from .vars import VarCodec
+
+LOG = logging.getLogger(__name__)
+
+NAMED_GROUP_START = re.compile(r"\(\?P<(?P<name>\w+)>")
+
+# named groups which only ever match digits are decoded as ints (e.g. \d+ or [01])
+DIGITS_PATTERN = re.compile(r"(\\d|\[[0-9-]+\])(\{\d+(,\d+)?\}|[+*])?")
+
+REGEX_SPECIAL_CHARS = set(".^$*+?{}[]|()")
+REGEX_QUANTIFIERS = set("*+?{")
+
+
+def named_group_patterns(regex: str) -> dict[str, str]:
+    """
+    :return: dictionary of each named group in the regex to its sub-pattern
+    """
+    patterns = {}
+    for m in NAMED_GROUP_START.finditer(regex):
+        depth = 1
+        pos = m.end()
+        while pos < len(regex) and depth:
+            c = regex[pos]
+            if c == "\\":
+                pos += 1
+            elif c == "(":
+                depth += 1
+            elif c == ")":
+                depth -= 1
+            pos += 1
+        patterns[m.group("name")] = regex[m.end() : pos - 1]
+    return patterns
+
+
+def _has_top_level_alternation(regex: str) -> bool:
+    depth = 0
+    pos = 0
+    while pos < len(regex):
+        c = regex[pos]
+        if c == "\\":
+            pos += 1
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            return True
+        pos += 1
+    return False
+
+
+def literal_prefix(regex: str) -> str:
+    """
+    :return: the literal text that every match of the regex must start with
+    """
+    if _has_top_level_alternation(regex):
+        return ""
+
+    prefix = []
+    pos = 0
+    while pos < len(regex):
+        c = regex[pos]
+        step = 1
+        if c == "\\":
+            if pos + 1 >= len(regex) or regex[pos + 1].isalnum():
+                break  # character class such as \d or \s
+            c = regex[pos + 1]
+            step = 2
+        elif c in REGEX_SPECIAL_CHARS:
+            break
+
+        # a quantifier makes the character optional/repeated
+        pos += step
+        if pos < len(regex) and regex[pos] in REGEX_QUANTIFIERS:
+            break
+        prefix.append(c)
+    return "".join(prefix)
+
+
+class RegexDecoder:
+    """
+    Decodes a response message into a dictionary of typed values. The regex
+    and the converter for each named group are resolved once when compiled.
+    """
+
+    __slots__ = ("pattern", "prefix", "_converters", "_types")
+
+    def __init__(self, regex: str, var_codecs: dict[str, VarCodec]):
+        self.pattern = re.compile(regex)
+        self.prefix = literal_prefix(regex)
+
+        converters = []
+        types = {}
+        for name, sub_pattern in named_group_patterns(regex).items():
+            types[name] = "string"
+            if codec := var_codecs.get(name):
+                converters.append((name, codec.decode))
+                types[name] = codec.type
+            elif DIGITS_PATTERN.fullmatch(sub_pattern):
+                converters.append((name, int))
+                types[name] = "int"
+        self._converters = tuple(converters)
+        self._types = types
+
+    def field_types(self) -> dict[str, str]:
+        """
+        :return: dictionary of each named group to its decoded type (int or string)
+        """
+        return dict(self._types)
+
+    def decode_match(self, m: re.Match) -> dict:
+        values = m.groupdict()
+        for name, convert in self._converters:
+            if (value := values[name]) is not None:
+                try:
+                    values[name] = convert(value)
+                except ValueError:
+                    LOG.warning(f"Could not convert {name}={value}, leaving as string")
+        return values
+
+    def decode(self, text: str) -> dict | None:
+        """
+        :return: typed values if the entire text matches, otherwise None
+        """
+        if m := self.pattern.fullmatch(text):
+            return self.decode_match(m)
+        return None
+
+    def match(self, text: str) -> dict | None:
+        """
+        :return: typed values if the start of the text matches, otherwise None
+        """
+        if m := self.pattern.match(text):
+            return self.decode_match(m)
+        return None
+
+    def search(self, text: str, pos: int = 0) -> tuple[dict | None, int]:
+        """
+        :return: (typed values or None, position after the match)
+        """
+        if m := self.pattern.search(text, pos):
+            return self.decode_match(m), m.end()
+        return None, pos
+
+
+class ListDecoder:
+    """
+    Decodes a multi-line list response, such as a count header followed by a
+    line for each item:
+
+        msg:
+          regex: '!AUDMODECOUNT\\((?P<count>\\d+)\\)'   # header (optional)
+          lines:
+            regex: '!AUDMODE\\((?P<mode>\\d+)\\)\\s*"(?P<name>.+)"'
+            count: count       # header value with the number of item lines
+            terminator: 'END'  # regex for the line that ends the list
+            idle: 0.5          # list ends when no line received for N seconds
+
+    One (or more) of count, terminator or idle must be defined to know when
+    the list is complete.
+    """
+
+    __slots__ = ("header", "item", "count", "terminator", "idle")
+
+    def __init__(self, header: RegexDecoder | None, lines_def: dict, var_codecs: dict):
+        self.header = header
+        self.item = RegexDecoder(lines_def["regex"], var_codecs)
+        self.count = lines_def.get("count")
+        self.idle = lines_def.get("idle")
+
+        self.terminator = None
+        if terminator := lines_def.get("terminator"):
+            self.terminator = re.compile(terminator)
+
+        if not (self.count or self.terminator or self.idle):
+            raise ValueError("Multi-line msg requires count, terminator or idle")
+        if self.count and not header:
+            raise ValueError("Multi-line msg count requires a header regex")
+
+    def reader(self) -> ListReader:
+        """
+        :return: a new reader to decode the lines of a single list response
+        """
+        return ListReader(self)
+
+
+class ListReader:
+    """
+    Incrementally decodes the lines of a list response as they are received.
+    """
+
+    __slots__ = ("_decoder", "_header_seen", "_remaining", "done")
+
+    def __init__(self, decoder: ListDecoder):
+        self._decoder = decoder
+        self._header_seen = decoder.header is None
+        self._remaining = None
+        self.done = False
+
+    def feed(self, line: str) -> dict | None:
+        """
+        :return: the decoded item for the line (None for header/unrelated lines)
+        """
+        decoder = self._decoder
+        if not self._header_seen:
+            header, _ = decoder.header.search(line)
+            if header is None:
+                LOG.debug(f"Ignoring line before list header: {line}")
+                return None
+
+            self._header_seen = True
+            if decoder.count:
+                self._remaining = int(header[decoder.count])
+                self.done = self._remaining <= 0
+            return None
+
+        if decoder.terminator and decoder.terminator.search(line):
+            self.done = True
+            return None
+
+        item, _ = decoder.item.search(line)
+        if item is None:
+            LOG.debug(f"Ignoring unexpected line in list response: {line}")
+        elif self._remaining is not None:
+            self._remaining -= 1
+            self.done = self._remaining <= 0
+        return item
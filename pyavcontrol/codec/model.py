@@ -0,0 +1,310 @@
+"""
+Encoders and decoders for every action of a model, compiled once per model so
+that sending commands and parsing responses never needs to walk the model
+definition dictionary.
+"""
+import logging
+import re
+import struct
+import threading
+
+from ..const import DEFAULT_EOL
+from ..core import get_fstring_vars
+from .binary import BinaryDecoder, BinaryEncoder, BinaryFormat, BinaryFramer
+from .fixed_width import FixedWidthDecoder
+from .message import ListDecoder, RegexDecoder
+from .vars import VarCodec, compile_vars
+
+LOG = logging.getLogger(__name__)
+
+# sections of a model definition a codec is compiled from
+CODEC_SECTIONS = ("vars", "format", "api")
+
+# compiled codecs shared by all clients of the same definition (keyed by model id and
+# codec_fingerprint); codecs are never modified once compiled, so threads can encode
+# and decode with them in parallel
+_MODEL_CODECS = {}
+_MODEL_CODECS_LOCK = threading.Lock()
+
+
+class CommandEncoder:
+    """
+    Encodes the arguments for an action into the command string.
+    """
+
+    __slots__ = ("fstring", "args", "_var_codecs")
+
+    def __init__(self, fstring: str, var_codecs: dict[str, VarCodec]):
+        self.fstring = fstring
+        self.args = tuple(dict.fromkeys(get_fstring_vars(fstring)))
+        self._var_codecs = tuple(
+            (arg, codec) for arg in self.args if (codec := var_codecs.get(arg))
+        )
+
+    def encode(self, **kwargs) -> str:
+        if missing_keys := [arg for arg in self.args if arg not in kwargs]:
+            raise ValueError(f"Missing required keys {missing_keys}")
+
+        for arg, codec in self._var_codecs:
+            kwargs[arg] = codec.encode(kwargs[arg])
+        return self.fstring.format(**kwargs)
+
+
+class ModelCodec:
+    """
+    All the compiled encoders/decoders for a model.
+    """
+
+    def __init__(self, model_def: dict):
+        self.model_id = model_def.get("id")
+        self.vars = compile_vars(model_def.get("vars"))
+
+        format_def = model_def.get("format") or {}
+        eol = format_def.get("message", {}).get("eol", DEFAULT_EOL)
+
+        # frame layout for models with binary commands/messages (see binary.py)
+        self.binary = None
+        if binary_def := format_def.get("binary"):
+            self.binary = BinaryFormat(binary_def)
+
+        self.api = {}
+        self._encoders = {}
+        self._decoders = {}
+        self._list_decoders = {}
+        self._frame_encoders = {}
+        self._frame_decoders = {}
+        self._timeouts = {}
+        for group, group_def in (model_def.get("api") or {}).items():
+            actions = []
+            for action, action_def in (group_def.get("actions") or {}).items():
+                if not isinstance(action_def, dict):
+                    continue
+
+                # handle yamlfmt/yamlfix rewriting of "on" and "off" as YAML keys into bools
+                if type(action) is bool:
+                    action = "on" if action else "off"
+                key = (group, action)
+                actions.append(action)
+
+                # cmd/msg may be shorthand for just the fstring/regex (e.g. mcintosh_legacy)
+                cmd_def = action_def.get("cmd") or {}
+                if isinstance(cmd_def, str):
+                    cmd_def = {"fstring": cmd_def}
+                msg_def = action_def.get("msg") or {}
+                if isinstance(msg_def, str):
+                    msg_def = {"regex": msg_def}
+
+                if fstring := cmd_def.get("fstring"):
+                    self._encoders[key] = CommandEncoder(fstring, self.vars)
+
+                cmd_payload = cmd_def.get("binary")
+                msg_payload = msg_def.get("binary")
+                try:
+                    if (cmd_payload or msg_payload) and not self.binary:
+                        raise ValueError("binary payload requires format.binary")
+                    if cmd_payload:
+                        self._frame_encoders[key] = BinaryEncoder(
+                            cmd_payload, self.binary, self.vars
+                        )
+                    if msg_payload:
+                        self._frame_decoders[key] = BinaryDecoder(
+                            msg_payload, self.binary, self.vars
+                        )
+                except (struct.error, ValueError) as e:
+                    LOG.error(
+                        f"Invalid binary for {self.model_id} {group}.{action}: {e}"
+                    )
+
+                # seconds to wait for the reply (overrides the connection timeout)
+                if timeout := action_def.get("timeout"):
+                    self._timeouts[key] = float(timeout)
+
+                try:
+                    if fixed_def := msg_def.get("fixed"):
+                        self._decoders[key] = FixedWidthDecoder(
+                            f"{group} {action}",
+                            fixed_def,
+                            self.vars,
+                            eol=eol,
+                        )
+                    elif regex := msg_def.get("regex"):
+                        self._decoders[key] = RegexDecoder(regex, self.vars)
+
+                    if lines_def := msg_def.get("lines"):
+                        self._list_decoders[key] = ListDecoder(
+                            self._decoders.get(key), lines_def, self.vars
+                        )
+                except (re.error, KeyError, ValueError) as e:
+                    LOG.error(f"Invalid msg for {self.model_id} {group}.{action}: {e}")
+
+            self.api[group] = tuple(actions)
+
+        # for decoding unsolicited messages, try decoders with the longest literal
+        # prefix first as those are the most specific
+        self._message_decoders = sorted(
+            ((decoder.prefix, key, decoder) for key, decoder in self._decoders.items()),
+            key=lambda item: -len(item[0]),
+        )
+        # binary messages usually start with a type byte, so dispatch on it
+        binary_decoders = sorted(
+            self._frame_decoders.items(), key=lambda item: -len(item[1].prefix)
+        )
+        self._binary_any = tuple(item for item in binary_decoders if not item[1].prefix)
+        self._binary_dispatch = {}
+        for key, decoder in binary_decoders:
+            if decoder.prefix:
+                self._binary_dispatch.setdefault(decoder.prefix[0], []).append(
+                    (key, decoder)
+                )
+        for first, candidates in self._binary_dispatch.items():
+            self._binary_dispatch[first] = tuple(candidates) + self._binary_any
+
+    def has_action(self, group: str, action: str) -> bool:
+        key = (group, action)
+        return (
+            key in self._encoders
+            or key in self._decoders
+            or key in self._frame_encoders
+            or key in self._frame_decoders
+        )
+
+    def encode(self, group: str, action: str, **kwargs) -> str:
+        """
+        :return: the command (without separator or eol) for the group/action and args
+        """
+        if not (encoder := self._encoders.get((group, action))):
+            if (group, action) in self._frame_encoders:
+                raise ValueError(
+                    f"{group}.{action} is a binary command ({self.model_id}), "
+                    f"see encode_frame()"
+                )
+            raise ValueError(
+                f"No command defined for {group}.{action} ({self.model_id})"
+            )
+
+        try:
+            return encoder.encode(**kwargs)
+        except ValueError as e:
+            raise ValueError(f"Call to {group}.{action} failed: {e}") from e
+
+    def frame_encoder(self, group: str, action: str) -> BinaryEncoder:
+        if not (encoder := self._frame_encoders.get((group, action))):
+            raise ValueError(
+                f"No binary command defined for {group}.{action} ({self.model_id})"
+            )
+        return encoder
+
+    def encode_frame(self, group: str, action: str, **kwargs) -> bytes:
+        """
+        :return: the complete frame for a binary command of the group/action and args
+        """
+        try:
+            return self.frame_encoder(group, action).encode(**kwargs)
+        except ValueError as e:
+            raise ValueError(f"Call to {group}.{action} failed: {e}") from e
+
+    def framer(self) -> BinaryFramer:
+        """
+        :return: a new framer for splitting the bytes received into frame payloads
+        """
+        if not self.binary:
+            raise ValueError(f"No binary format defined for {self.model_id}")
+
+        # frames longer than any message the model defines could not be decoded
+        sizes = [decoder.size for decoder in self._frame_decoders.values()]
+        return BinaryFramer(self.binary, max(sizes) if sizes else None)
+
+    def decode_frame(self, payload) -> tuple[str, str, dict] | None:
+        """
+        Decode the payload of a frame received from the device (see framer()).
+
+        :return: (group, action, values) for the first matching message, or None
+        """
+        candidates = self._binary_any
+        if payload:
+            candidates = self._binary_dispatch.get(payload[0], candidates)
+        for key, decoder in candidates:
+            if (values := decoder.match(payload)) is not None:
+                return key[0], key[1], values
+        return None
+
+    def decoder(
+        self, group: str, action: str
+    ) -> RegexDecoder | FixedWidthDecoder | None:
+        """
+        :return: the decoder for response messages of the group/action (if any)
+        """
+        return self._decoders.get((group, action))
+
+    def frame_decoder(self, group: str, action: str) -> BinaryDecoder | None:
+        """
+        :return: the decoder for binary response messages of the group/action (if any)
+        """
+        return self._frame_decoders.get((group, action))
+
+    def timeout(self, group: str, action: str) -> float | None:
+        """
+        :return: seconds to wait for the group/action's reply, if defined by the model
+        """
+        return self._timeouts.get((group, action))
+
+    def decode_message(self, line: str) -> tuple[str, str, dict | list] | None:
+        """
+        Decode a message received from the device that was not necessarily in
+        response to a request (e.g. status updates).
+
+        :return: (group, action, values) for the first matching message, or None
+        """
+        for prefix, key, decoder in self._message_decoders:
+            if line.startswith(prefix) and (values := decoder.match(line)) is not None:
+                return key[0], key[1], values
+        return None
+
+    def fields(self) -> dict[str, str]:
+        """
+        :return: every value the model's messages and vars define, and its type
+          (int, float or string), e.g. for laying out a table of device state
+        """
+        fields = {name: codec.type for name, codec in self.vars.items()}
+        decoders = [decoder for _, _, decoder in self._message_decoders]
+        for decoder in decoders + list(self._frame_decoders.values()):
+            for name, field_type in decoder.field_types().items():
+                fields.setdefault(name, field_type)
+        return fields
+
+    def list_decoder(self, group: str, action: str) -> ListDecoder | None:
+        """
+        :return: the decoder for multi-line list responses of the group/action (if any)
+        """
+        return self._list_decoders.get((group, action))
+
+    def label(self, var: str, value) -> str | None:
+        """
+        :return: the label for an enumerated var value (e.g. input 0 -> HDMI 1)
+        """
+        if codec := self.vars.get(var):
+            return codec.label(value)
+        return None
+
+
+def codec_fingerprint(model_def: dict) -> tuple[int, int]:
+    """
+    :return: key identifying the content of the sections a codec is compiled from, so
+      definitions modified in memory (e.g. an overridden command) get their own codec
+    """
+    text = repr(tuple(model_def.get(section) for section in CODEC_SECTIONS))
+    return len(text), hash(text)
+
+
+def model_codec(model_def: dict, fingerprint: tuple[int, int] = None) -> ModelCodec:
+    """
+    :param fingerprint: the definition's codec_fingerprint (if already computed)
+    :return: the compiled codec for the definition (shared across all clients of
+      definitions with the same id and codec sections)
+    """
+    key = (model_def.get("id"), fingerprint or codec_fingerprint(model_def))
+    with _MODEL_CODECS_LOCK:
+        if not (codec := _MODEL_CODECS.get(key)):
+            codec = ModelCodec(model_def)
+            _MODEL_CODECS[key] = codec
+    return codec
@@ -0,0 +1,131 @@
+"""
+Typed conversion of values as defined in the vars section of a model. Each var
+is compiled once into a VarCodec which converts to/from the wire format, checks
+ranges and maps enumerated values using precomputed lookup tables:
+
+    vars:
+      dim_level:
+        type: int
+        min: 0
+        max: 3
+        values:
+          0: Full (100%)
+          1: Bright (75%)
+
+Vars that are only a mapping of values to labels (without a type) are also
+supported, with the type inferred from the values.
+"""
+import logging
+
+LOG = logging.getLogger(__name__)
+
+VAR_DEFINITION_KEYS = {"type", "pattern", "min", "max", "values", "description"}
+
+
+class VarCodec:
+    """
+    Converts a single var between the wire format and typed values.
+    """
+
+    __slots__ = (
+        "name",
+        "type",
+        "min",
+        "max",
+        "_convert",
+        "_keys",
+        "_labels",
+        "_reverse",
+    )
+
+    def __init__(self, name: str, var_def: dict):
+        # vars that are simply a mapping of values to labels (e.g. Trinnov/HDFury)
+        if not VAR_DEFINITION_KEYS.issuperset(var_def):
+            var_def = {"values": var_def}
+
+        values = var_def.get("values") or {}
+        var_type = var_def.get("type")
+        if not var_type:
+            is_int = values and all(isinstance(v, int) for v in values)
+            var_type = "int" if is_int else "string"
+
+        self.name = name
+        self.type = var_type
+        self.min = var_def.get("min")
+        self.max = var_def.get("max")
+        self._convert = int if var_type == "int" else str
+
+        # dense integer values (0..n) use a tuple for lookups, otherwise a dict
+        keys = [self._convert(v) for v in values]
+        self._keys = frozenset(keys)
+        labels = [str(label) for label in values.values()]
+        if keys and keys == list(range(len(keys))):
+            self._labels = tuple(labels)
+        else:
+            self._labels = dict(zip(keys, labels))
+
+        # reverse mapping allows passing labels as arguments (e.g. "HDMI 1")
+        self._reverse = {}
+        for key, label in zip(keys, labels):
+            self._reverse[label] = key
+            self._reverse[label.lower()] = key
+
+    def _in_range(self, value) -> bool:
+        if value in self._keys:
+            return True
+        if self.min is not None and value < self.min:
+            return False
+        if self.max is not None and value > self.max:
+            return False
+        return True
+
+    def decode(self, text: str):
+        """
+        :return: the typed value for the wire text (out of range values are logged)
+        """
+        value = self._convert(text)
+        if not self._in_range(value):
+            LOG.warning(f"Received {self.name}={value} outside {self.min}-{self.max}")
+        return value
+
+    def encode(self, value):
+        """
+        :param value: typed value or label (e.g. 0 or "HDMI 1")
+        :return: the value to substitute into the command
+        """
+        if isinstance(value, str):
+            mapped = self._reverse.get(value, self._reverse.get(value.lower()))
+            if mapped is not None:
+                return mapped
+
+        try:
+            value = self._convert(value)
+        except ValueError:
+            raise ValueError(f"Invalid {self.type} value for {self.name}: {value}")
+
+        if not self._in_range(value):
+            raise ValueError(f"{self.name}={value} outside range {self.min}-{self.max}")
+        return value
+
+    def label(self, value) -> str | None:
+        """
+        :return: the label for an enumerated value (or None if no label)
+        """
+        if isinstance(self._labels, tuple):
+            if isinstance(value, int) and 0 <= value < len(self._labels):
+                return self._labels[value]
+            return None
+        return self._labels.get(value)
+
+
+def compile_vars(vars_def: dict) -> dict[str, VarCodec]:
+    """
+    :return: dictionary of var name to VarCodec for all vars in a model
+    """
+    codecs = {}
+    for name, var_def in (vars_def or {}).items():
+        if isinstance(var_def, dict):
+            codecs[name] = VarCodec(name, var_def)
+        else:
+            LOG.warning(f"Ignoring var {name} with invalid definition: {var_def}")
+    return codecs
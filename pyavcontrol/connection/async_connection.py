@@ -5,9 +5,6 @@ import time
 from abc import ABC
 from functools import wraps
 
-from ratelimit import limits
-from serial_asyncio import create_serial_connection
-
 from pyavcontrol.connection import DeviceConnection
 
 from ..const import *  # noqa: F403
@@ -16,16 +13,17 @@ LOG = logging.getLogger(__name__)
 
 FIVE_MINUTES = 5 * 60
 
-# FIXME: for a specific instance we do not want communication to happen
-# simultaneously...for now just lock ALL accesses to ANY device.
-async_lock = asyncio.Lock()
-
 
 def locked_coro(coro):
+    """
+    Serialize calls to a coroutine method for each instance (using self._lock), so
+    communication with one device never blocks communication with other devices.
+    """
+
     @wraps(coro)
-    async def wrapper(*args, **kwargs):
-        async with async_lock:
-            return await coro(*args, **kwargs)
+    async def wrapper(self, *args, **kwargs):
+        async with self._lock:
+            return await coro(self, *args, **kwargs)
 
     return wrapper
 
@@ -110,6 +108,7 @@ async def async_get_rs232_connection(
                 self._encoding
             )
             self._response_callback = None
+            self._recorder = config.get(CONF_RECORDER)
 
             self._last_send = time.time() - 1
             self._timeout = self._connection_config.get("timeout", DEFAULT_TIMEOUT)
@@ -117,119 +116,351 @@ async def async_get_rs232_connection(
 
             self._transport = None
             self._connected = asyncio.Event()
+
+            # set once the transport is closed (the connection is not reopened)
+            self.lost = False
+
+            # loop time that data was last sent/received (any data proves the link is alive)
+            self.last_sent = None
+            self.last_received = loop.time()
+
+            # received data is framed into complete lines as it arrives (or into frame
+            # payloads by the framer of binary models, see codec/binary.py)
+            self._rx_buffer = bytearray()
+            self._framer = protocol_config.get(CONF_FRAMER)
             self._q = asyncio.Queue()
 
+            # lines received while no request is waiting for a reply are unsolicited
+            # (e.g. front panel changes) and are only passed to the callback
+            self._pending = False
+
             # ensure only a single, ordered command is sent to RS232 at a time (non-reentrant lock)
             self._lock = asyncio.Lock()
 
+            # counters for diagnosing performance (e.g. pyavcontrol bench)
+            self.stats = {
+                "requests": 0,
+                "timeouts": 0,
+                "throttle_stalls": 0,
+                "throttle_delay": 0.0,
+            }
+
         def register_callback(self, callback) -> None:
             """Register a callback that is called for each response line"""
             self._response_callback = callback
 
+        @property
+        def is_connected(self) -> bool:
+            return not self.lost
+
         def connection_made(self, transport):
             self._transport = transport
             LOG.debug(f"Port {self._serial_port} opened {self._transport}")
+            self.last_received = self._loop.time()
             self._connected.set()
 
         def data_received(self, data):
             #            LOG.debug(f"Received from {self._serial_port}: {data}")
-            asyncio.ensure_future(self._q.put(data))  # , loop=self._loop)
+            self.last_received = self._loop.time()
+            if self._recorder:
+                self._recorder.rx(data)
+
+            if self._framer:
+                for payload in self._framer.feed(data):
+                    frame = bytes(payload)
+                    if self._pending:
+                        self._q.put_nowait(frame)
+                    else:
+                        self._received_line(frame)
+                return
 
-        def connection_lost(self, exc):
-            LOG.debug(f"Port {self._serial_port} closed")
+            buffer = self._rx_buffer
+            buffer += data
+
+            # queue each complete line, stripping out any blank lines
+            eol = self._response_eol
+            start = 0
+            while (end := buffer.find(eol, start)) >= 0:
+                if end > start:
+                    line = bytes(buffer[start:end])
+                    if self._pending:
+                        self._q.put_nowait(line)
+                    else:
+                        self._received_line(line)
+                start = end + len(eol)
+            if start:
+                del buffer[:start]
 
-        async def _throttle_requests(self):
-            """Throttle the number of RS232 sends per second to avoid causing timeouts"""
+        def connection_lost(self, exc):
+            LOG.info(f"Port {self._serial_port} closed" + (f": {exc}" if exc else ""))
+            self.lost = True
+            self._connected.clear()
+
+        def close(self) -> None:
+            """
+            Close the transport (the connection is then lost and is not reopened)
+            """
+            if self._transport:
+                self._transport.close()
+
+        def _throttle_delay(self) -> float:
+            """
+            :return: seconds to wait before the next request may be sent
+            """
             min_time_between_commands = self._config[CONF_THROTTLE_RATE]
             delta_since_last_send = time.time() - self._last_send
 
             if delta_since_last_send < 0:
-                delay = -1 * delta_since_last_send
-                LOG.debug(f"Sleeping {delay} seconds until sending next RS232 request")
-                await asyncio.sleep(delay)
+                return -1 * delta_since_last_send
+            return max(0, min_time_between_commands - delta_since_last_send)
 
-            elif delta_since_last_send < min_time_between_commands:
-                delay = min(
-                    max(0, min_time_between_commands - delta_since_last_send),
-                    min_time_between_commands,
+        async def _throttle_requests(self, deadline=None):
+            """Throttle the number of RS232 sends per second to avoid causing timeouts"""
+            delay = self._throttle_delay()
+
+            # fail fast rather than sending a request whose reply cannot arrive in time
+            if (
+                deadline is not None
+                and asyncio.get_running_loop().time() + delay >= deadline
+            ):
+                self.stats["timeouts"] += 1
+                raise asyncio.TimeoutError(
+                    f"Deadline for {self._serial_port} request expires before throttle ({delay:.3f} sec)"
                 )
+
+            if delay > 0:
+                LOG.debug(f"Sleeping {delay} seconds until sending next RS232 request")
+                self.stats["throttle_stalls"] += 1
+                self.stats["throttle_delay"] += delay
                 await asyncio.sleep(delay)
 
-        @locked_method
-        @ensure_connected
-        async def send(self, request: bytes, wait_for_reply=True, skip_initial_bytes=0):
-            await self._throttle_requests()
+        def _resync(self) -> None:
+            """
+            Discard any partially received reply (e.g. after a timeout or cancellation),
+            so it is not returned as the reply to the next request. Lines that arrive
+            late are passed to the callback as unsolicited messages.
+            """
+            self._rx_buffer.clear()
+            if self._framer:
+                self._framer.clear()
+            while not self._q.empty():
+                self._q.get_nowait()
+            self._pending = False
+
+        async def _write(self, request: bytes, deadline=None) -> None:
+            await self._throttle_requests(deadline)
 
             # clear all buffers of any data waiting to be read before sending the request
-            self._transport.serial.reset_output_buffer()
-            self._transport.serial.reset_input_buffer()
+            self._reset_port_buffers()
+            self._rx_buffer.clear()
+            if self._framer:
+                self._framer.clear()
             while not self._q.empty():
                 self._q.get_nowait()
 
             # send the request
             LOG.debug("Sending RS232 data %s", request)
+            self._pending = True
+            self.stats["requests"] += 1
             self._last_send = time.time()
-            self._transport.serial.write(request)
-
-            if not wait_for_reply:
-                return
-
-            # read the response
-            data = bytearray()
+            self.last_sent = self._loop.time()
+            self._transport.write(request)
+            if self._recorder:
+                self._recorder.tx(request)
+
+        def _reset_port_buffers(self) -> None:
+            """
+            Discard data buffered by the serial port driver. Only serial transports
+            expose their port; other transports (e.g. when the event loop provides its
+            own) are written to and read from through the transport interface alone.
+            """
+            if port := getattr(self._transport, "serial", None):
+                port.reset_output_buffer()
+                port.reset_input_buffer()
+
+        def _received_line(self, line: bytes) -> str | bytes:
+            """
+            Decode a response line and pass it to any registered callback (frame
+            payloads of binary models are passed as bytes)
+            """
+            if self._framer:
+                if self._response_callback:
+                    self._response_callback(line)
+                return line
+
+            # NOTE: May want to catch decode failures to figure out when
+            # characters are returned that do not match the encoding type
+            # e.g. DAX88 can return non-ASCII chars
+            result = line.decode(self._encoding, errors="ignore")
+            if self._response_callback:
+                self._response_callback(result)
+            return result
+
+        async def _read_lines(
+            self, request: bytes, count: int, skip_initial_bytes=0, deadline=None
+        ) -> list[str]:
+            """
+            Read the response until count lines are received, passing each line
+            to any registered callback. If the timeout is hit after at least one
+            complete line was received, the complete lines are returned.
+
+            :param deadline: loop time by which all lines must be received (default
+              is the connection timeout for the entire response, not each line)
+            """
+            loop = asyncio.get_running_loop()
+            if deadline is None:
+                deadline = loop.time() + self._timeout
+
+            async def next_line():
+                return await asyncio.wait_for(self._q.get(), deadline - loop.time())
+
+            results = []
             try:
-                while True:
-                    data += await asyncio.wait_for(self._q.get(), self._timeout)
+                while len(results) < count:
+                    line = await next_line()
 
                     # FIXME: investigate more robust reading data with prefixes (vs just skipping some bytes)
-                    if self._response_eol in data[skip_initial_bytes:]:
-                        # only return the first line
-                        LOG.debug(
-                            f"Received: %s (len=%d, eol={self._response_eol})",
-                            bytes(data).decode(self._encoding, errors="ignore"),
-                            len(data),
+                    while len(line) < skip_initial_bytes:
+                        line += self._response_eol
+                        line += await next_line()
+                    skip_initial_bytes = 0
+
+                    results.append(self._received_line(line))
+
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                if not results:
+                    from ratelimit import limits  # only needed once a request times out
+
+                    # log up to two times within a time period to avoid saturating the logs
+                    @limits(calls=2, period=FIVE_MINUTES)
+                    def log_timeout():
+                        LOG.info(
+                            f"Timeout for request '%s': received='%s'",
+                            request,
+                            self._rx_buffer,
                         )
-                        result_lines = data.split(self._response_eol)
 
-                        # strip out any blank lines
-                        result_lines = [value for value in result_lines if value != b""]
+                    log_timeout()
+                    raise
 
-                        if len(result_lines) > 1:
-                            LOG.debug(
-                                "Multiple response lines passed to callbacks, but only returning first: %s",
-                                result_lines,
-                            )
+                LOG.debug(f"Timeout waiting for {count} lines, received: %s", results)
 
-                        # pass all lines to any registered callback
-                        first_result = None
-                        for line in result_lines:
-                            # NOTE: May want to catch decode failures to figure out when
-                            # characters are returned that do not match the encoding type
-                            # e.g. DAX88 can return non-ASCII chars
-                            result = line.decode(self._encoding, errors="ignore")
-                            self._response_callback(result)
+            LOG.debug(f"Received: %s (eol={self._response_eol})", results)
+            return results
 
-                            if not first_result:
-                                first_result = result
+        @locked_method
+        @ensure_connected
+        async def send(self, request: bytes, wait_for_reply=True, skip_initial_bytes=0):
+            await self._write(request)
 
-                        return first_result
+            if not wait_for_reply:
+                self._pending = False
+                return
 
-            except asyncio.TimeoutError:
-                # log up to two times within a time period to avoid saturating the logs
-                @limits(calls=2, period=FIVE_MINUTES)
-                def log_timeout():
-                    LOG.info(
-                        f"Timeout for request '%s': received='%s' ({self._timeout} sec)",
-                        request,
-                        data,
-                    )
-
-                log_timeout()
+            # only return the first line
+            try:
+                result_lines = await self._read_lines(request, 1, skip_initial_bytes)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                self._resync()
                 raise
+            finally:
+                self._pending = False
+            if len(result_lines) > 1:
+                LOG.debug(
+                    "Multiple response lines passed to callbacks, but only returning first: %s",
+                    result_lines,
+                )
+            return result_lines[0] if result_lines else None
+
+        @locked_method
+        @ensure_connected
+        async def send_batch(
+            self,
+            request: bytes,
+            expected_lines: int,
+            timeout=None,
+            deadline=None,
+            on_reply=None,
+        ) -> list[str]:
+            """
+            Send a request that packs several commands into a single write and
+            read up to expected_lines response lines (or frame payloads, for binary
+            models).
+
+            :param timeout: seconds to wait for the response after sending (default=connection timeout)
+            :param deadline: loop time by which the entire request must complete; fails
+              fast with TimeoutError if the throttle delay alone would exceed it
+            :param on_reply: called with the seconds from sending until all the lines
+              were received, or None if they were not received within the timeout (not
+              called if the deadline ended the wait first)
+            """
+            await self._write(request, deadline)
+            if expected_lines < 1:
+                self._pending = False
+                return []
+
+            loop = asyncio.get_running_loop()
+            sent = loop.time()
+            reply_deadline = sent + (timeout or self._timeout)
+            read_deadline = reply_deadline
+            if deadline is not None:
+                read_deadline = min(reply_deadline, deadline)
+
+            try:
+                lines = await self._read_lines(
+                    request, expected_lines, deadline=read_deadline
+                )
+            except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+                self._resync()
+                if on_reply and isinstance(e, asyncio.TimeoutError):
+                    if read_deadline == reply_deadline:
+                        on_reply(None)
+                raise
+            finally:
+                self._pending = False
+
+            if len(lines) < expected_lines:
+                self._resync()
+                if on_reply and read_deadline == reply_deadline:
+                    on_reply(None)
+            elif on_reply:
+                on_reply(loop.time() - sent)
+            return lines
+
+        async def send_stream(self, request: bytes, idle_timeout=None):
+            """
+            Send a request and yield each response line as it is received, until
+            the caller stops iterating. If idle_timeout is set, the stream ends
+            once no line is received within that time.
+
+            NOTE: the connection is locked until the stream is closed.
+            """
+            async with self._lock:
+                await asyncio.wait_for(self._connected.wait(), self._timeout)
+                await self._write(request)
+
+                timeout = idle_timeout or self._timeout
+                try:
+                    while True:
+                        try:
+                            line = await asyncio.wait_for(self._q.get(), timeout)
+                        except asyncio.TimeoutError:
+                            if idle_timeout:
+                                return
+                            raise
+                        yield self._received_line(line)
+                finally:
+                    # the stream may be closed before the entire response was received
+                    self._resync()
 
     factory = functools.partial(
         RS232ControlProtocol, serial_port, config, connection_config, protocol_def, loop
     )
 
+    # imported when connecting, so creating clients does not load pyserial-asyncio
+    from serial_asyncio import create_serial_connection
+
     LOG.info(f"Connecting to {serial_port}: {connection_config}")
     _, protocol = await create_serial_connection(
         loop, factory, serial_port, **connection_config
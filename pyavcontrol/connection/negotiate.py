@@ -0,0 +1,234 @@
+"""
+Opt-in negotiation of the fastest baud rate a serial device responds at.
+
+Models list the baud rates the device can be configured for and a cheap
+identification query (an action whose reply is always recognizable):
+
+    connection:
+      rs232:
+        baudrate: 115200
+      baudrates: [115200, 57600, 38400, 19200, 9600]
+      identify: ping.ping
+
+Each candidate is tried fastest first until the device replies to the query.
+The winning rate is cached per url, so reconnecting only confirms it with the
+identification query (negotiating again if the device was reconfigured).
+"""
+import logging
+import json
+import os
+import threading
+
+from ..codec import ModelCodec, model_codec
+from ..const import (
+    CONF_BAUDRATES,
+    CONF_IDENTIFY,
+    DEFAULT_BAUDRATE_CACHE_PATH,
+    DEFAULT_BAUDRATE_PROBE_TIMEOUT,
+    DEFAULT_ENCODING,
+    DEFAULT_EOL,
+)
+
+LOG = logging.getLogger(__name__)
+
+# transports where the baud rate is not used (e.g. IP2SL sets the rate on its serial port)
+NETWORK_URL_SCHEMES = ("socket://", "loop://")
+
+
+class BaudrateCache:
+    """
+    Baud rate negotiated for each url, persisted as JSON.
+    """
+
+    def __init__(self, path: str = DEFAULT_BAUDRATE_CACHE_PATH):
+        """
+        :param path: file the negotiated rates are persisted to (None to keep in memory only)
+        """
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            self._entries = {}
+            if self._path and os.path.isfile(self._path):
+                try:
+                    with open(self._path, "r") as f:
+                        self._entries = dict(json.load(f))
+                except (OSError, ValueError) as e:
+                    LOG.warning(f"Ignoring invalid baud rate cache {self._path}: {e}")
+        return self._entries
+
+    def _save(self) -> None:
+        if not self._path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            # unique per process, as other processes may share the cache file
+            tmp_path = f"{self._path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            LOG.debug(f"Could not save baud rate cache {self._path}: {e}")
+
+    def get(self, url: str, model_id: str) -> int | None:
+        """
+        :return: baud rate previously negotiated for the model at the url (or None)
+        """
+        with self._lock:
+            entry = self._load().get(url)
+        if entry and entry.get("model") == model_id:
+            return entry.get("baudrate")
+        return None
+
+    def set(self, url: str, model_id: str, baudrate: int) -> None:
+        with self._lock:
+            self._load()[url] = {"model": model_id, "baudrate": baudrate}
+            self._save()
+
+    def forget(self, url: str) -> None:
+        """
+        Forget the rate negotiated for a url (e.g. after the device was reconfigured)
+        """
+        with self._lock:
+            if self._load().pop(url, None):
+                self._save()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache() -> BaudrateCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = BaudrateCache()
+    return _default_cache
+
+
+def baudrate_candidates(model_def: dict) -> list[int]:
+    """
+    :return: baud rates defined for the model, fastest first
+    """
+    rates = (model_def.get("connection") or {}).get(CONF_BAUDRATES) or []
+    return sorted({int(rate) for rate in rates}, reverse=True)
+
+
+def _identify_request(model_def, codec: ModelCodec) -> tuple | None:
+    """
+    :param model_def: model definition (or RuntimeModel) with the connection/format
+    :param codec: codec compiled from the model's api
+    :return: (request, reply decoder, reply eol, encoding) for the model's identify action
+      (None if the model has no identify action, ValueError if the action has no reply)
+    """
+    connection = model_def.get("connection") or {}
+    identify = connection.get(CONF_IDENTIFY)
+    if not identify:
+        return None
+
+    group, _, action = identify.partition(".")
+    if not (decoder := codec.decoder(group, action)):
+        # negotiation would silently never find a rate, so the model must be fixed
+        raise ValueError(
+            f"Identify action {identify} for {model_def.get('id')} has no reply (msg)"
+        )
+
+    encoding = connection.get("encoding", DEFAULT_ENCODING)
+    fmt = model_def.get("format") or {}
+    cmd_eol = (fmt.get("command") or {}).get("eol", DEFAULT_EOL)
+    msg_eol = (fmt.get("message") or {}).get("eol", DEFAULT_EOL)
+
+    # leading eol terminates any garbage the device received at a wrong rate
+    request = f"{cmd_eol}{codec.encode(group, action)}{cmd_eol}".encode(encoding)
+    return request, decoder, msg_eol.encode(encoding), encoding
+
+
+def probe_baudrate(
+    url: str,
+    serial_config: dict,
+    baudrate: int,
+    identify,
+    timeout: float = DEFAULT_BAUDRATE_PROBE_TIMEOUT,
+) -> bool:
+    """
+    :return: True if the device replies to the identify query at the baud rate
+    """
+    import serial  # only loaded when negotiating
+
+    request, decoder, eol, encoding = identify
+    config = dict(serial_config, baudrate=baudrate, timeout=timeout)
+    try:
+        with serial.serial_for_url(url, **config) as port:
+            port.reset_input_buffer()
+            port.write(request)
+            port.flush()
+
+            # skip any lines that are not the reply (e.g. errors for the leading eol)
+            while (line := port.read_until(eol)).endswith(eol):
+                text = line.decode(encoding, errors="ignore")
+                if decoder.search(text)[0] is not None:
+                    return True
+    except serial.SerialException as e:
+        LOG.debug(f"Probing {url} at {baudrate} baud failed: {e}")
+    return False
+
+
+def negotiate_baudrate(
+    model_def: dict,
+    url: str,
+    serial_config: dict,
+    cache: BaudrateCache | None = None,
+    refresh: bool = False,
+    codec: ModelCodec | None = None,
+) -> int | None:
+    """
+    Find the fastest baud rate the device at the url replies at, trying each of
+    the model's connection.baudrates fastest first.
+
+    :param serial_config: serial port configuration (other than the baud rate) to probe with
+    :param cache: where negotiated rates are saved (default=CACHE_DIR/baudrates.json)
+    :param refresh: probe all rates even if one was previously negotiated for the url
+      (otherwise a cached rate is used if the device still replies at it)
+    :param codec: codec for the model's api (default=compiled from model_def, which
+      must then be the full definition rather than a RuntimeModel)
+    :return: the negotiated baud rate (or None if not negotiable or no rate responded)
+    """
+    if url.startswith(NETWORK_URL_SCHEMES):
+        return None
+
+    model_id = model_def.get("id")
+    candidates = baudrate_candidates(model_def)
+    if candidates:
+        codec = codec or model_codec(model_def)
+    if not candidates or not (identify := _identify_request(model_def, codec)):
+        LOG.debug(f"{model_id} does not define baudrates/identify for negotiation")
+        return None
+
+    timeout = min(
+        serial_config.get("timeout") or DEFAULT_BAUDRATE_PROBE_TIMEOUT,
+        DEFAULT_BAUDRATE_PROBE_TIMEOUT,
+    )
+
+    cache = cache or default_cache()
+    if not refresh and (baudrate := cache.get(url, model_id)):
+        if probe_baudrate(url, serial_config, baudrate, identify, timeout):
+            LOG.debug(f"Using {baudrate} baud previously negotiated for {url}")
+            return baudrate
+
+        # the device was reconfigured (or replaced) since the rate was cached
+        LOG.info(f"{model_id} at {url} no longer replies at {baudrate} baud")
+        cache.forget(url)
+        return negotiate_baudrate(
+            model_def, url, serial_config, cache, refresh=True, codec=codec
+        )
+
+    for baudrate in candidates:
+        if probe_baudrate(url, serial_config, baudrate, identify, timeout):
+            LOG.info(f"Negotiated {baudrate} baud for {model_id} at {url}")
+            cache.set(url, model_id, baudrate)
+            return baudrate
+
+    LOG.warning(f"{model_id} at {url} did not respond at any of {candidates} baud")
+    return None
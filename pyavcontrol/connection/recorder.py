@@ -0,0 +1,115 @@
+"""
+Records the exact bytes sent to and received from a device to a compact,
+append-only binary file for reproducing issues offline (see replay.py).
+
+The file starts with an 8 byte magic header, followed by a frame for each
+write to or read from the device:
+
+    uint64  timestamp (ns since epoch)
+    uint8   direction (0=TX to device, 1=RX from device)
+    uint32  length of data
+    bytes   data
+"""
+import logging
+import os
+import struct
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+
+RECORDING_MAGIC = b"PYAVREC\x01"
+
+FRAME_HEADER = struct.Struct("<QBI")
+
+DIRECTION_TX = 0
+DIRECTION_RX = 1
+
+
+class TrafficRecorder:
+    """
+    Appends timestamped TX/RX frames to a recording file. A single recorder
+    may be shared by multiple connections and threads.
+    """
+
+    def __init__(
+        self, path: str, buffer_size: int = 64 * 1024, flush_interval: float = 1.0
+    ):
+        """
+        :param path: recording file (appended to if it already exists)
+        :param buffer_size: bytes buffered before writing to disk
+        :param flush_interval: most seconds a frame stays buffered, so a crash (the
+          case a recording is for) loses at most this much of the latest traffic
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._flush_interval_ns = int(flush_interval * 1e9)
+        self._flushed = 0
+        self._flush_timer = None
+
+        existing = os.path.exists(path) and os.path.getsize(path) > 0
+        if existing:
+            with open(path, "rb") as f:
+                if f.read(len(RECORDING_MAGIC)) != RECORDING_MAGIC:
+                    raise ValueError(f"{path} is not a pyavcontrol traffic recording")
+
+        self._file = open(path, "ab", buffering=buffer_size)
+        if not existing:
+            self._file.write(RECORDING_MAGIC)
+        LOG.info(f"Recording device traffic to {path}")
+
+    def record(self, direction: int, data: bytes) -> None:
+        now = time.time_ns()
+        frame = FRAME_HEADER.pack(now, direction, len(data))
+        with self._lock:
+            if not self._file:
+                return
+            self._file.write(frame)
+            self._file.write(data)
+
+            # frames at a low rate are written to disk at once, while busier traffic is
+            # flushed once per interval (by a timer, in case no further frame comes)
+            if now - self._flushed >= self._flush_interval_ns:
+                self._flush_locked(now)
+            elif not self._flush_timer:
+                delay = (self._flushed + self._flush_interval_ns - now) / 1e9
+                self._flush_timer = threading.Timer(delay, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _flush_locked(self, now: int) -> None:
+        self._file.flush()
+        self._flushed = now
+        if timer := self._flush_timer:
+            self._flush_timer = None
+            timer.cancel()
+
+    def tx(self, data: bytes) -> None:
+        """
+        Record data sent to the device
+        """
+        self.record(DIRECTION_TX, data)
+
+    def rx(self, data: bytes) -> None:
+        """
+        Record data received from the device
+        """
+        self.record(DIRECTION_RX, data)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file:
+                self._flush_locked(time.time_ns())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._flush_locked(time.time_ns())
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
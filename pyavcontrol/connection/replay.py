@@ -0,0 +1,165 @@
+"""
+Replays traffic captured by TrafficRecorder. Recordings are read through a
+memory map, so even very large captures are not loaded into memory.
+
+ReplayDevice serves a recording as a fake device over TCP (connect using the
+url socket://host:port) at the recorded speed or N times faster.
+"""
+import logging
+import asyncio
+import mmap
+from collections import namedtuple
+
+from .recorder import DIRECTION_RX, DIRECTION_TX, FRAME_HEADER, RECORDING_MAGIC
+
+LOG = logging.getLogger(__name__)
+
+Frame = namedtuple("Frame", ["timestamp", "direction", "data"])
+
+
+class TrafficRecording:
+    """
+    Read-only view of a recording file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(RECORDING_MAGIC)] != RECORDING_MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a pyavcontrol traffic recording")
+
+    def frames(self):
+        """
+        :return: generator of every Frame in the recording, in order recorded
+        """
+        mm = self._mmap
+        size = len(mm)
+        header_size = FRAME_HEADER.size
+
+        pos = len(RECORDING_MAGIC)
+        while pos + header_size <= size:
+            timestamp, direction, length = FRAME_HEADER.unpack_from(mm, pos)
+            start = pos + header_size
+            pos = start + length
+            if pos > size:
+                LOG.warning(f"Ignoring truncated frame at end of {self.path}")
+                return
+            yield Frame(timestamp, direction, mm[start:pos])
+
+        if pos != size:
+            LOG.warning(f"Ignoring truncated frame at end of {self.path}")
+
+    def __iter__(self):
+        return self.frames()
+
+    def summary(self) -> dict:
+        """
+        :return: frame/byte counts for each direction and the recording duration
+        """
+        counts = {DIRECTION_TX: [0, 0], DIRECTION_RX: [0, 0]}
+        first = last = None
+        for frame in self.frames():
+            counts[frame.direction][0] += 1
+            counts[frame.direction][1] += len(frame.data)
+            first = first or frame.timestamp
+            last = frame.timestamp
+        return {
+            "tx_frames": counts[DIRECTION_TX][0],
+            "tx_bytes": counts[DIRECTION_TX][1],
+            "rx_frames": counts[DIRECTION_RX][0],
+            "rx_bytes": counts[DIRECTION_RX][1],
+            "duration": (last - first) / 1e9 if first else 0.0,
+        }
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class ReplayDevice:
+    """
+    Fake device endpoint that plays back the RX frames of a recording to each
+    connected client.
+
+    By default each recorded request (TX frame) is waited for before the
+    replies that followed it are sent, so the client drives the replay. With
+    wait_for_requests=False all RX frames are pushed on their recorded
+    schedule (e.g. for load testing framing and demux of unsolicited messages).
+    """
+
+    def __init__(
+        self,
+        recording: TrafficRecording,
+        speed: float = 1.0,
+        wait_for_requests: bool = True,
+    ):
+        """
+        :param recording: recording to replay
+        :param speed: replay speed multiplier (0 to send as fast as possible)
+        :param wait_for_requests: wait to receive each recorded request from the client
+        """
+        self._recording = recording
+        self._speed = speed
+        self._wait_for_requests = wait_for_requests
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """
+        :return: the port the replay device is listening on
+        """
+        self._server = await asyncio.start_server(self._replay, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        LOG.info(f"Replaying {self._recording.path} on socket://{host}:{port}")
+        return port
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _delay(self, previous: int | None, timestamp: int) -> None:
+        if previous is None or not self._speed:
+            return
+        if (delay := (timestamp - previous) / 1e9 / self._speed) > 0:
+            await asyncio.sleep(delay)
+
+    async def _replay(self, reader, writer) -> None:
+        previous = None
+        frames = 0
+        try:
+            for frame in self._recording.frames():
+                if frame.direction == DIRECTION_TX:
+                    if not self._wait_for_requests:
+                        continue
+
+                    request = await reader.readexactly(len(frame.data))
+                    if request != frame.data:
+                        LOG.debug(f"Expected request {frame.data}, received {request}")
+
+                    # replies are timed relative to when the request was received
+                    previous = frame.timestamp
+                    continue
+
+                await self._delay(previous, frame.timestamp)
+                previous = frame.timestamp
+
+                writer.write(frame.data)
+                await writer.drain()
+                frames += 1
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            LOG.debug("Client disconnected during replay")
+        finally:
+            LOG.info(f"Replayed {frames} frames from {self._recording.path}")
+            writer.close()
@@ -4,22 +4,23 @@ from functools import wraps
 from threading import RLock
 
 import serial
-from syncer import sync
 
 from pyavcontrol.connection import DeviceConnection
-from pyavcontrol.connection.async_connection import async_get_rs232_connection
 from pyavcontrol.const import CONF_RESPONSE_EOL, DEFAULT_ENCODING, DEFAULT_EOL
 
 LOG = logging.getLogger(__name__)
 
-sync_lock = RLock()
-
 
 def synchronized(func):
+    """
+    Serialize calls to a method for each instance (using self._lock, a threading.RLock),
+    so threads communicating with different devices never block each other.
+    """
+
     @wraps(func)
-    def wrapper(*args, **kwargs):
-        with sync_lock:
-            return func(*args, **kwargs)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return func(self, *args, **kwargs)
 
     return wrapper
 
@@ -39,6 +40,9 @@ class SyncDeviceConnection(DeviceConnection, ABC):
         self._config = config
         self._connection_config = connection_config
 
+        # held across a send and handle_receive for the reply (see synchronized)
+        self._lock = RLock()
+
         self._encoding = connection_config.get("encoding", DEFAULT_ENCODING)
         self._eol = connection_config.get(CONF_RESPONSE_EOL, DEFAULT_EOL).encode(
             self._encoding
@@ -55,6 +59,7 @@ class SyncDeviceConnection(DeviceConnection, ABC):
     def encoding(self) -> str:
         return self._encoding
 
+    @synchronized
     def send(self, data: bytes) -> None:
         """
         :param data: request that is sent to the device
@@ -73,6 +78,7 @@ class SyncDeviceConnection(DeviceConnection, ABC):
         self._port.write(data)
         self._port.flush()
 
+    @synchronized
     def handle_receive(self) -> str:
         skip = 0
 
@@ -1,5 +1,4 @@
 """Python client library for controlling A/V processors and receivers"""
-
 import os
 
 DEFAULT_TCP_IP_PORT = 4999  # IP2SL / Virtual IP2SL uses this port
@@ -12,6 +11,30 @@ DEFAULT_MODEL_LIBRARIES = [
     f"{PACKAGE_PATH}/data/src",
 ]  # FIXME: remove this later
 
+# local cache for data derived at runtime (e.g. the model library index)
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "pyavcontrol"
+)
+DEFAULT_MODEL_INDEX_PATH = os.path.join(CACHE_DIR, "model_index.json")
+DEFAULT_MODEL_CACHE_DIR = os.path.join(CACHE_DIR, "models")
+
+# opt-in probing for the fastest baud rate a device responds at (see connection.baudrates)
+CONF_BAUDRATES = "baudrates"
+CONF_IDENTIFY = "identify"
+DEFAULT_BAUDRATE_CACHE_PATH = os.path.join(CACHE_DIR, "baudrates.json")
+DEFAULT_BAUDRATE_PROBE_TIMEOUT = 0.5
+
+# connecting many devices at once (see DeviceFleet)
+DEFAULT_FLEET_CONCURRENCY = 16
+DEFAULT_FLEET_CONNECT_TIMEOUT = 10.0
+DEFAULT_FLEET_RETRY_DELAY = 5.0
+MAX_FLEET_RETRY_DELAY = 300.0
+
+# local daemon that shares device connections across processes (unix:// or tcp://)
+DEFAULT_DAEMON_URL = "unix://" + os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR", CACHE_DIR), "pyavcontrol.sock"
+)
+
 DEFAULT_ENCODING = "ascii"
 DEFAULT_EOL = "\r\n"
 
@@ -19,5 +42,48 @@ CONF_COMMAND_EOL = "command_eol"
 CONF_RESPONSE_EOL = "response_eol"
 CONF_COMMAND_SEPARATOR = "command_separator"
 CONF_SERIAL_CONFIG = "rs232"
+CONF_IP_CONFIG = "ip"
 
 CONF_THROTTLE_RATE = "min_time_between_commands"
+DEFAULT_THROTTLE_RATE = 0.4
+
+# levels of unsolicited messages a device sends, selected by subscribed groups
+CONF_NOTIFICATIONS = "notifications"
+
+# optional TrafficRecorder that captures all bytes sent/received by a connection
+CONF_RECORDER = "recorder"
+
+# BinaryFramer that splits received bytes into frames rather than lines (binary models)
+CONF_FRAMER = "framer"
+
+# batching multiple commands into a single write (see format.command in model yaml)
+CONF_BATCH_MAX_COMMANDS = "max_batch"
+CONF_BATCH_MAX_LENGTH = "max_length"
+DEFAULT_BATCH_MAX_COMMANDS = 8
+
+# reply timeouts adapted to observed round-trip times (see connection.rtt in model yaml)
+CONF_RTT = "rtt"
+CONF_RTT_MIN_TIMEOUT = "min_timeout"
+CONF_RTT_MAX_TIMEOUT = "max_timeout"
+DEFAULT_RTT_MIN_TIMEOUT = 0.1
+DEFAULT_RTT_MAX_TIMEOUT = 5.0
+
+# idle keepalive probes and link health (see connection.keepalive in model yaml)
+CONF_KEEPALIVE = "keepalive"
+CONF_KEEPALIVE_ACTION = "action"
+CONF_KEEPALIVE_IDLE = "idle"
+CONF_KEEPALIVE_MISSES = "misses"
+DEFAULT_KEEPALIVE_IDLE = 30.0
+DEFAULT_KEEPALIVE_MISSES = 3
+
+HEALTH_UNKNOWN = "unknown"  # not connected yet
+HEALTH_OK = "ok"
+HEALTH_DEGRADED = "degraded"  # keepalive probes unanswered
+HEALTH_DISCONNECTED = "disconnected"
+
+# event loop implementations for the asynchronous clients (see pyavcontrol.loop)
+EVENT_LOOP_ASYNCIO = "asyncio"
+EVENT_LOOP_UVLOOP = "uvloop"
+EVENT_LOOP_AUTO = "auto"  # uvloop if installed, otherwise asyncio
+EVENT_LOOPS = [EVENT_LOOP_ASYNCIO, EVENT_LOOP_UVLOOP, EVENT_LOOP_AUTO]
+DEFAULT_EVENT_LOOP = EVENT_LOOP_ASYNCIO
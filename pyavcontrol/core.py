@@ -5,7 +5,7 @@ from typing import List
 LOG = logging.getLogger(__name__)
 
 NAMED_REGEX_PATTERN = re.compile(r"\(\?P\<(?P<name>.+)\>(?P<regex>.+)\)")
-FSTRING_ARG_PATTERN = re.compile(r"{(?P<arg_name>.+)}")
+FSTRING_ARG_PATTERN = re.compile(r"{(?P<arg_name>[^{}]+)}")
 
 
 def extract_named_regex(text: str) -> dict:
@@ -27,7 +27,7 @@ def missing_keys_in_dict(required_keys: List[str], d: dict) -> List[str]:
     missing_keys = []
     for key in required_keys:
         if key not in d:
-            missing_keys += key
+            missing_keys.append(key)
     return missing_keys
 
 
@@ -0,0 +1,3 @@
+# expose the daemon and its client through just importing the package itself
+from .client import RemoteClient, RemoteDevice, RemoteError
+from .server import DeviceServer
@@ -0,0 +1,134 @@
+"""
+Run the pyavcontrol daemon:
+
+    python -m pyavcontrol.daemon --device mx160 mcintosh_mx160 /dev/ttyUSB0
+    python -m pyavcontrol.daemon --config pyavcontrol.yaml
+
+The config file lists the devices to serve:
+
+    listen: unix:///run/pyavcontrol.sock
+    devices:
+      mx160:
+        model: mcintosh_mx160
+        url: /dev/ttyUSB0
+        config:
+          baudrate: 115200
+        record: /var/log/pyavcontrol/mx160.avrec   # optional traffic capture
+    event_loop: auto      # asyncio, uvloop or auto (uvloop if installed)
+    eager_tasks: true     # Python 3.12+
+"""
+import logging
+import argparse
+import asyncio
+import signal
+
+import yaml
+
+from ..client import DeviceClient
+from ..connection.recorder import TrafficRecorder
+from ..const import DEFAULT_DAEMON_URL, DEFAULT_EVENT_LOOP, EVENT_LOOPS
+from ..library import DeviceModelLibrary
+from ..loop import run
+from .server import DeviceServer
+
+LOG = logging.getLogger(__name__)
+
+
+def _load_config(args) -> dict:
+    config = {}
+    if args.config:
+        with open(args.config, "r") as f:
+            config = yaml.safe_load(f) or {}
+
+    devices = dict(config.get("devices") or {})
+    for name, model, url in args.device or []:
+        devices[name] = {"model": model, "url": url}
+
+    return {
+        "listen": args.listen or config.get("listen") or DEFAULT_DAEMON_URL,
+        "devices": devices,
+        "event_loop": args.loop or config.get("event_loop") or DEFAULT_EVENT_LOOP,
+        "eager_tasks": args.eager_tasks or bool(config.get("eager_tasks")),
+    }
+
+
+def _create_clients(devices: dict, loop, recorders: list) -> dict[str, DeviceClient]:
+    library = DeviceModelLibrary.create()
+
+    clients = {}
+    for name, device in devices.items():
+        model_id = library.find_model(device["model"]) or device["model"]
+        if not (model_def := library.load_model(model_id)):
+            raise SystemExit(f"Unknown model '{device['model']}' for device {name}")
+        recorder = None
+        if device.get("record"):
+            recorder = TrafficRecorder(device["record"])
+            recorders.append(recorder)
+        clients[name] = DeviceClient.create(
+            model_def,
+            device["url"],
+            device.get("config"),
+            event_loop=loop,
+            recorder=recorder,
+        )
+    return clients
+
+
+async def _serve(config: dict) -> None:
+    loop = asyncio.get_running_loop()
+    recorders = []
+    server = DeviceServer(_create_clients(config["devices"], loop, recorders))
+    await server.start(config["listen"])
+
+    stop = loop.create_future()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.cancel)
+    try:
+        await stop
+    except asyncio.CancelledError:
+        LOG.info("Stopping")
+    finally:
+        await server.close()
+        for recorder in recorders:
+            recorder.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m pyavcontrol.daemon",
+        description="Share device connections with local processes",
+    )
+    parser.add_argument("--config", help="YAML file listing the devices to serve")
+    parser.add_argument(
+        "--listen",
+        help=f"unix:// or tcp:// url to serve on (default={DEFAULT_DAEMON_URL})",
+    )
+    parser.add_argument(
+        "--device",
+        nargs=3,
+        action="append",
+        metavar=("NAME", "MODEL", "URL"),
+        help="device to serve (may be repeated)",
+    )
+    parser.add_argument(
+        "--loop",
+        choices=EVENT_LOOPS,
+        help=f"event loop implementation (default={DEFAULT_EVENT_LOOP})",
+    )
+    parser.add_argument(
+        "--eager-tasks", action="store_true", help="start tasks eagerly (Python 3.12+)"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    config = _load_config(args)
+    if not config["devices"]:
+        parser.error("no devices configured (use --config or --device)")
+
+    run(_serve(config), config["event_loop"], config["eager_tasks"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Thin client for devices served by the pyavcontrol daemon, exposing the same
+group.action api as DeviceClient:
+
+    remote = RemoteClient.create("unix:///run/user/1000/pyavcontrol.sock")
+    mx160 = remote.device("mx160")
+    mx160.volume.set(volume=40)
+    print(mx160.volume.get())
+"""
+from __future__ import annotations
+
+import logging
+import asyncio
+import itertools
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable
+
+from ..client.api import action_group
+from ..const import DEFAULT_DAEMON_URL
+from .protocol import (
+    MAX_LINE_LENGTH,
+    OP_CALL,
+    OP_CALL_MANY,
+    OP_DEVICES,
+    OP_SUBSCRIBE,
+    OP_UNSUBSCRIBE,
+    decode_message,
+    encode_message,
+    parse_daemon_url,
+)
+
+LOG = logging.getLogger(__name__)
+
+
+class RemoteError(Exception):
+    """
+    A request failed within the daemon (e.g. invalid arguments or device timeout).
+    """
+
+
+class RemoteDevice:
+    """
+    A device served by the daemon. For the asynchronous client, each action
+    returns a coroutine.
+    """
+
+    def __init__(self, remote: RemoteClient, name: str, model_id: str, api: dict):
+        self._remote = remote
+        self._name = name
+        self._model_id = model_id
+        self._api = api
+
+    def __getattr__(self, name: str):
+        if api := self.__dict__.get("_api"):
+            return action_group(self.send_command, api, name)
+        raise AttributeError(name)
+
+    def __repr__(self) -> str:
+        return f"RemoteDevice({self._name}, {self._model_id})"
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def model_id(self) -> str:
+        return self._model_id
+
+    def send_command(self, group: str, action: str, **kwargs):
+        return self._remote.call(self._name, group, action, **kwargs)
+
+    def send_many(self, commands: list):
+        return self._remote.call_many(self._name, commands)
+
+
+class RemoteClient(ABC):
+    def __init__(self, url: str):
+        self._url = url
+        self._ids = itertools.count(1)
+
+    def _remote_device(self, name: str, info: dict) -> RemoteDevice:
+        api = {group: tuple(actions) for group, actions in info["api"].items()}
+        return RemoteDevice(self, name, info["model"], api)
+
+    @staticmethod
+    def _result(response: dict):
+        if "error" in response:
+            raise RemoteError(response["error"])
+        return response.get("result")
+
+    @staticmethod
+    def _commands(commands: list) -> list:
+        return [[c[0], c[1], c[2] if len(c) > 2 else {}] for c in commands]
+
+    @abstractmethod
+    def call(self, device: str, group: str, action: str, **kwargs):
+        """
+        Send a command to a device and return the decoded reply.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def call_many(self, device: str, commands: list):
+        """
+        Send several (group, action[, kwargs]) commands to a device in order.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def devices(self):
+        """
+        :return: dictionary of name to RemoteDevice for every device served
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def close(self):
+        raise NotImplementedError()
+
+    @classmethod
+    def create(cls, url: str = DEFAULT_DAEMON_URL, event_loop=None) -> RemoteClient:
+        """
+        If an event_loop argument is passed in this will return the
+        asynchronous implementation. By default, the synchronous interface
+        is returned.
+
+        :param url: daemon url (e.g. 'unix:///run/pyavcontrol.sock' or 'tcp://127.0.0.1:8760')
+        :param event_loop: optionally to get an interface that can be used asynchronously, pass in an event loop
+        """
+        if event_loop:
+            return RemoteClientAsync(url, event_loop)
+        return RemoteClientSync(url)
+
+
+class RemoteClientSync(RemoteClient):
+    def __init__(self, url: str):
+        super().__init__(url)
+        self._lock = threading.RLock()
+        self._events = deque()
+        self._sock = None
+        self._reader = None
+
+    def _connect(self) -> None:
+        if self._sock:
+            return
+        kind, address = parse_daemon_url(self._url)
+        if kind == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(address)
+        else:
+            sock = socket.create_connection(address)
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+
+    def _read_message(self) -> dict:
+        line = self._reader.readline(MAX_LINE_LENGTH)
+        if not line:
+            self.close()
+            raise ConnectionError(f"Daemon {self._url} closed the connection")
+        return decode_message(line)
+
+    def _request(self, op: str, **fields):
+        with self._lock:
+            self._connect()
+            request_id = next(self._ids)
+            self._sock.sendall(encode_message({"id": request_id, "op": op, **fields}))
+
+            # events received before the response are kept for events()
+            while (message := self._read_message()).get("id") != request_id:
+                if "event" in message:
+                    self._events.append(message)
+            return self._result(message)
+
+    def call(self, device: str, group: str, action: str, **kwargs):
+        return self._request(
+            OP_CALL, device=device, group=group, action=action, args=kwargs
+        )
+
+    def call_many(self, device: str, commands: list) -> list:
+        return self._request(
+            OP_CALL_MANY, device=device, commands=self._commands(commands)
+        )
+
+    def devices(self) -> dict[str, RemoteDevice]:
+        devices = self._request(OP_DEVICES)
+        return {name: self._remote_device(name, info) for name, info in devices.items()}
+
+    def device(self, name: str) -> RemoteDevice:
+        if not (device := self.devices().get(name)):
+            raise KeyError(f"Daemon {self._url} has no device '{name}'")
+        return device
+
+    def subscribe(self, device: str = None) -> None:
+        """
+        Receive every message from the device (or all devices) through events()
+        """
+        self._request(OP_SUBSCRIBE, device=device)
+
+    def unsubscribe(self, device: str = None) -> None:
+        self._request(OP_UNSUBSCRIBE, device=device)
+
+    def events(self):
+        """
+        Blocking generator of the events for subscribed devices (use a separate
+        RemoteClient for sending commands while iterating).
+        """
+        while True:
+            with self._lock:
+                while self._events:
+                    yield self._events.popleft()
+                self._connect()
+                message = self._read_message()
+            if "event" in message:
+                yield message
+
+    def close(self) -> None:
+        with self._lock:
+            if self._sock:
+                self._reader.close()
+                self._sock.close()
+                self._sock = None
+                self._reader = None
+
+
+class RemoteClientAsync(RemoteClient):
+    def __init__(self, url: str, loop):
+        super().__init__(url)
+        self._loop = loop
+        self._connect_lock = asyncio.Lock()
+        self._writer = None
+        self._read_task = None
+        self._pending = {}
+        self._callbacks = []
+
+    async def _connect(self) -> None:
+        async with self._connect_lock:
+            if self._writer:
+                return
+            kind, address = parse_daemon_url(self._url)
+            if kind == "unix":
+                reader, writer = await asyncio.open_unix_connection(
+                    address, limit=MAX_LINE_LENGTH
+                )
+            else:
+                reader, writer = await asyncio.open_connection(
+                    *address, limit=MAX_LINE_LENGTH
+                )
+            self._writer = writer
+            self._read_task = self._loop.create_task(self._read_messages(reader))
+
+    async def _read_messages(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                message = decode_message(line)
+                if "event" in message:
+                    for callback in self._callbacks:
+                        callback(message)
+                elif future := self._pending.pop(message.get("id"), None):
+                    if not future.done():
+                        future.set_result(message)
+        finally:
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(
+                        ConnectionError(f"Daemon {self._url} closed the connection")
+                    )
+            self._pending.clear()
+
+    async def _request(self, op: str, **fields):
+        await self._connect()
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        try:
+            self._writer.write(encode_message({"id": request_id, "op": op, **fields}))
+            await self._writer.drain()
+            return self._result(await future)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def call(self, device: str, group: str, action: str, **kwargs):
+        return await self._request(
+            OP_CALL, device=device, group=group, action=action, args=kwargs
+        )
+
+    async def call_many(self, device: str, commands: list) -> list:
+        return await self._request(
+            OP_CALL_MANY, device=device, commands=self._commands(commands)
+        )
+
+    async def devices(self) -> dict[str, RemoteDevice]:
+        devices = await self._request(OP_DEVICES)
+        return {name: self._remote_device(name, info) for name, info in devices.items()}
+
+    async def device(self, name: str) -> RemoteDevice:
+        if not (device := (await self.devices()).get(name)):
+            raise KeyError(f"Daemon {self._url} has no device '{name}'")
+        return device
+
+    def register_callback(self, callback: Callable[[dict], None]) -> None:
+        """
+        Register a callback that is called with each event for subscribed devices.
+        """
+        if not callable(callback):
+            raise ValueError("Callback is not Callable")
+        self._callbacks.append(callback)
+
+    async def subscribe(self, device: str = None) -> None:
+        await self._request(OP_SUBSCRIBE, device=device)
+
+    async def unsubscribe(self, device: str = None) -> None:
+        await self._request(OP_UNSUBSCRIBE, device=device)
+
+    async def close(self) -> None:
+        if self._writer:
+            self._writer.close()
+        if self._read_task:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+            self._read_task = None
@@ -0,0 +1,65 @@
+"""
+Wire protocol between the pyavcontrol daemon and its clients: one JSON object
+per line in each direction.
+
+Requests carry an id which is echoed back in the matching response:
+
+    {"id": 1, "op": "call", "device": "mx160", "group": "volume", "action": "set", "args": {"volume": 40}}
+    {"id": 1, "result": null}
+
+    {"id": 2, "op": "call", "device": "mx160", "group": "volume", "action": "nope"}
+    {"id": 2, "error": "ValueError: Action mx160.volume.nope not supported"}
+
+Events for subscribed devices are sent without an id:
+
+    {"event": "message", "device": "mx160", "line": "!VOL(40)", "group": "volume", "action": "get", "values": {"volume": 40}}
+"""
+import logging
+import json
+from urllib.parse import urlparse
+
+LOG = logging.getLogger(__name__)
+
+OP_DEVICES = "devices"
+OP_CALL = "call"
+OP_CALL_MANY = "call_many"
+OP_SUBSCRIBE = "subscribe"
+OP_UNSUBSCRIBE = "unsubscribe"
+
+EVENT_MESSAGE = "message"
+
+# maximum length of a single request/response line
+MAX_LINE_LENGTH = 1024 * 1024
+
+
+def parse_daemon_url(url: str) -> tuple[str, str | tuple[str, int]]:
+    """
+    :param url: daemon address, e.g. 'unix:///run/pyavcontrol.sock' or 'tcp://127.0.0.1:8760'
+    :return: ('unix', path) or ('tcp', (host, port))
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return "unix", parsed.netloc + parsed.path
+    if parsed.scheme == "tcp":
+        if not parsed.hostname or not parsed.port:
+            raise ValueError(f"Daemon url requires a host and port: {url}")
+        return "tcp", (parsed.hostname, parsed.port)
+    raise ValueError(f"Unsupported daemon url {url} (expected unix:// or tcp://)")
+
+
+def encode_message(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode_message(line: bytes) -> dict:
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError(f"Expected a JSON object: {line}")
+    return message
+
+
+def error_text(e: BaseException) -> str:
+    """
+    :return: description of an exception to return to the client
+    """
+    return f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
@@ -0,0 +1,303 @@
+"""
+Daemon that owns the connections to devices and shares them with any number
+of local processes over a Unix socket or TCP (see protocol.py).
+
+Commands for each device are sent strictly in the order they were received,
+while commands for different devices proceed independently. Every message
+received from a device (replies and unsolicited messages such as front panel
+changes) is fanned out to the clients subscribed to that device.
+"""
+import logging
+import asyncio
+import functools
+import os
+from collections import defaultdict
+
+from ..client import DeviceClient
+from .protocol import (
+    EVENT_MESSAGE,
+    MAX_LINE_LENGTH,
+    OP_CALL,
+    OP_CALL_MANY,
+    OP_DEVICES,
+    OP_SUBSCRIBE,
+    OP_UNSUBSCRIBE,
+    decode_message,
+    encode_message,
+    error_text,
+    parse_daemon_url,
+)
+
+LOG = logging.getLogger(__name__)
+
+# events are dropped for subscribers that are not reading them (bytes buffered)
+MAX_SUBSCRIBER_BUFFER = 256 * 1024
+
+
+class DeviceWorker:
+    """
+    Sends commands to a single device one at a time, in the order submitted.
+    """
+
+    def __init__(self, name: str, client: DeviceClient):
+        self.name = name
+        self.client = client
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name=f"pyavcontrol-{self.name}")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, coro_fn, *args):
+        """
+        Queue a call to the client and wait for its result.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((coro_fn, args, future))
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            coro_fn, args, future = await self._queue.get()
+            if future.done():  # requesting client went away
+                continue
+            try:
+                result = await coro_fn(*args)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+
+class Session:
+    """
+    A single client connected to the daemon.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.subscriptions = set()
+        self.tasks = set()
+        self.peer = writer.get_extra_info("peername") or "local"
+
+    def send(self, message: dict) -> None:
+        if not self.writer.is_closing():
+            self.writer.write(encode_message(message))
+
+    def send_event(self, data: bytes) -> None:
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+            LOG.warning(f"Dropping event for slow subscriber {self.peer}")
+            return
+        self.writer.write(data)
+
+
+class DeviceServer:
+    """
+    Serves the devices to clients over a unix:// or tcp:// url.
+    """
+
+    def __init__(self, devices: dict[str, DeviceClient]):
+        """
+        :param devices: dictionary of device name to asynchronous DeviceClient
+        """
+        self._devices = devices
+        self._workers = {
+            name: DeviceWorker(name, client) for name, client in devices.items()
+        }
+        self._subscribers = defaultdict(set)
+        self._device_subscriptions = {}
+        self._subscription_lock = asyncio.Lock()
+        self._sessions = set()
+        self._tasks = set()
+        self._server = None
+        self._unix_path = None
+
+    async def start(self, url: str) -> None:
+        """
+        Connect to all devices and start accepting clients.
+        """
+        for name, worker in self._workers.items():
+            client = worker.client
+            worker.start()
+            try:
+                await client.connect()
+            except Exception as e:
+                # the connection is retried on the first command to the device
+                LOG.error(f"Failed connecting to {name}: {error_text(e)}")
+
+        kind, address = parse_daemon_url(url)
+        if kind == "unix":
+            if os.path.exists(address):
+                os.unlink(address)  # stale socket from a previous run
+            os.makedirs(os.path.dirname(address) or ".", exist_ok=True)
+            self._unix_path = address
+            self._server = await asyncio.start_unix_server(
+                self._handle_session, path=address, limit=MAX_LINE_LENGTH
+            )
+        else:
+            host, port = address
+            self._server = await asyncio.start_server(
+                self._handle_session, host, port, limit=MAX_LINE_LENGTH
+            )
+        LOG.info(f"Serving {', '.join(self._devices)} on {url}")
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for session in list(self._sessions):
+            session.writer.close()
+        for worker in self._workers.values():
+            await worker.stop()
+        if self._unix_path and os.path.exists(self._unix_path):
+            os.unlink(self._unix_path)
+
+    def _device_message(self, name: str, line: str) -> None:
+        """
+        Fan out a message received from a device to all subscribers.
+        """
+        sessions = self._subscribers.get(name)
+        if not sessions:
+            return
+
+        event = {"event": EVENT_MESSAGE, "device": name, "line": line}
+        if decoded := self._devices[name].decode_message(line):
+            event["group"], event["action"], event["values"] = decoded
+
+        data = encode_message(event)
+        for session in sessions:
+            session.send_event(data)
+
+    async def _update_subscription(self, name: str) -> None:
+        """
+        Subscribe to a device's messages while any session is subscribed to it,
+        so the device only sends unsolicited messages when they are consumed.
+        """
+        async with self._subscription_lock:
+            client = self._devices[name]
+            subscription = self._device_subscriptions.get(name)
+            if self._subscribers.get(name) and not subscription:
+                self._device_subscriptions[name] = await client.subscribe(
+                    functools.partial(self._device_message, name)
+                )
+            elif subscription and not self._subscribers.get(name):
+                del self._device_subscriptions[name]
+                await client.unsubscribe(subscription)
+
+    async def _handle_session(self, reader, writer) -> None:
+        session = Session(writer)
+        self._sessions.add(session)
+        LOG.debug(f"Client connected: {session.peer}")
+        try:
+            while line := await reader.readline():
+                try:
+                    request = decode_message(line)
+                except ValueError as e:
+                    session.send({"error": error_text(e)})
+                    continue
+
+                # requests run concurrently so a slow device does not block others
+                task = asyncio.create_task(self._handle_request(session, request))
+                session.tasks.add(task)
+                task.add_done_callback(session.tasks.discard)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            LOG.warning(f"Closing client {session.peer}: {error_text(e)}")
+        finally:
+            self._sessions.discard(session)
+            for name in session.subscriptions:
+                self._subscribers[name].discard(session)
+                task = asyncio.create_task(self._update_subscription(name))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            for task in list(session.tasks):
+                task.cancel()
+            writer.close()
+            LOG.debug(f"Client disconnected: {session.peer}")
+
+    async def _handle_request(self, session: Session, request: dict) -> None:
+        response = {"id": request.get("id")}
+        try:
+            response["result"] = await self._dispatch(session, request)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOG.debug(f"Request {request} failed: {error_text(e)}")
+            response["error"] = error_text(e)
+        session.send(response)
+
+    def _worker(self, request: dict) -> DeviceWorker:
+        name = request.get("device")
+        if not (worker := self._workers.get(name)):
+            raise KeyError(f"Unknown device '{name}'")
+        return worker
+
+    def _device_names(self, request: dict) -> list[str]:
+        """
+        :return: devices named in the request (all devices if none specified)
+        """
+        if request.get("device") is None:
+            return list(self._devices)
+        return [self._worker(request).name]
+
+    async def _dispatch(self, session: Session, request: dict):
+        op = request.get("op")
+
+        if op == OP_CALL:
+            worker = self._worker(request)
+            call = functools.partial(
+                worker.client.send_command,
+                request["group"],
+                request["action"],
+                **(request.get("args") or {}),
+            )
+            return await worker.submit(call)
+
+        elif op == OP_CALL_MANY:
+            worker = self._worker(request)
+            commands = [tuple(command) for command in request["commands"]]
+            return await worker.submit(worker.client.send_many, commands)
+
+        elif op == OP_DEVICES:
+            return {
+                name: {
+                    "model": client.model_id,
+                    "api": {group: list(a) for group, a in client.api.items()},
+                }
+                for name, client in self._devices.items()
+            }
+
+        elif op == OP_SUBSCRIBE:
+            for name in self._device_names(request):
+                self._subscribers[name].add(session)
+                session.subscriptions.add(name)
+                await self._update_subscription(name)
+            return True
+
+        elif op == OP_UNSUBSCRIBE:
+            for name in self._device_names(request):
+                self._subscribers[name].discard(session)
+                session.subscriptions.discard(name)
+                await self._update_subscription(name)
+            return True
+
+        raise ValueError(f"Unknown op '{op}'")
@@ -0,0 +1,220 @@
+"""
+Manage many devices at once: connect them concurrently (with bounded concurrency),
+initialize each with its model's settings.connection_init, retry devices that
+failed to connect and fan out commands to all devices in parallel:
+
+    fleet = DeviceFleet.create(
+        [("xantech_mx88_audio", "/dev/ttyUSB0"), ("mcintosh_mx160", "socket://mx160:84")],
+        event_loop,
+    )
+    failed = await fleet.connect()
+    results = await fleet.all.power_system.off()  # {device name: result or exception}
+"""
+from __future__ import annotations
+
+import logging
+import asyncio
+
+from .client import DeviceClient
+from .client.api import action_group
+from .const import (
+    DEFAULT_FLEET_CONCURRENCY,
+    DEFAULT_FLEET_CONNECT_TIMEOUT,
+    DEFAULT_FLEET_RETRY_DELAY,
+    HEALTH_DEGRADED,
+    HEALTH_DISCONNECTED,
+    MAX_FLEET_RETRY_DELAY,
+)
+from .library import DeviceModelLibrary
+
+LOG = logging.getLogger(__name__)
+
+
+class FleetView:
+    """
+    The group.action api across several devices in a fleet. Each command is sent
+    to every device whose model supports it, in parallel.
+    """
+
+    def __init__(self, fleet: DeviceFleet, names: list[str]):
+        self._fleet = fleet
+        self._names = list(names)
+
+        # union of the api of every device in the view
+        api = {}
+        for name in self._names:
+            for group, actions in fleet[name].api.items():
+                api.setdefault(group, {}).update(dict.fromkeys(actions))
+        self._api = {group: tuple(actions) for group, actions in api.items()}
+
+    def __getattr__(self, name: str):
+        if api := self.__dict__.get("_api"):
+            return action_group(self.send_command, api, name)
+        raise AttributeError(name)
+
+    def __repr__(self) -> str:
+        return f"FleetView({', '.join(self._names)})"
+
+    async def send_command(self, group: str, action: str, **kwargs) -> dict:
+        """
+        :return: dictionary of device name to its result (or the exception raised)
+        """
+        names = [n for n in self._names if action in self._fleet[n].api.get(group, ())]
+        results = await asyncio.gather(
+            *(self._fleet[n].send_command(group, action, **kwargs) for n in names),
+            return_exceptions=True,
+        )
+        return dict(zip(names, results))
+
+
+class DeviceFleet:
+    """
+    A set of asynchronous DeviceClients managed together.
+    """
+
+    def __init__(
+        self,
+        clients: dict[str, DeviceClient],
+        max_concurrency: int = DEFAULT_FLEET_CONCURRENCY,
+        connect_timeout: float = DEFAULT_FLEET_CONNECT_TIMEOUT,
+        retry_delay: float = DEFAULT_FLEET_RETRY_DELAY,
+    ):
+        """
+        :param clients: dictionary of device name to asynchronous DeviceClient
+        :param max_concurrency: maximum number of devices connecting at the same time
+        :param connect_timeout: seconds to wait for each device to connect
+        :param retry_delay: initial seconds between retrying failed connections (doubles each retry)
+        """
+        self._clients = dict(clients)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._connect_timeout = connect_timeout
+        self._retry_delay = retry_delay
+        self._failed = {}
+        self._supervisor = None
+
+    @classmethod
+    def create(
+        cls, devices: list | dict, event_loop, library=None, **kwargs
+    ) -> DeviceFleet:
+        """
+        :param devices: list of (model_id, url[, connection_config_overrides]) tuples
+            (named by url), or a dictionary of device name to such a tuple
+        :param event_loop: event loop for the asynchronous clients
+        :param library: DeviceModelLibrary to load models from (default=pyavcontrol's library)
+        :param kwargs: additional DeviceFleet options (e.g. max_concurrency)
+        """
+        if not isinstance(devices, dict):
+            devices = {device[1]: device for device in devices}
+        library = library or DeviceModelLibrary.create()
+
+        clients = {}
+        for name, (model_id, url, *overrides) in devices.items():
+            model_def = library.load_model(library.find_model(model_id) or model_id)
+            if not model_def:
+                raise ValueError(f"Unknown model '{model_id}' for device {name}")
+            clients[name] = DeviceClient.create(
+                model_def,
+                url,
+                overrides[0] if overrides else None,
+                event_loop=event_loop,
+            )
+        return cls(clients, **kwargs)
+
+    def __getitem__(self, name: str) -> DeviceClient:
+        return self._clients[name]
+
+    def __iter__(self):
+        return iter(self._clients)
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    @property
+    def all(self) -> FleetView:
+        """
+        :return: view that sends commands to all devices in the fleet
+        """
+        return FleetView(self, self._clients)
+
+    def select(self, names: list[str]) -> FleetView:
+        """
+        :return: view that sends commands to the named devices
+        """
+        return FleetView(self, names)
+
+    @property
+    def healthy(self) -> FleetView:
+        """
+        :return: view that sends commands to the devices whose link is not known to be
+          down, so commands are not held up waiting for dead devices to time out
+        """
+        unhealthy = (HEALTH_DEGRADED, HEALTH_DISCONNECTED)
+        names = [n for n, c in self._clients.items() if c.health not in unhealthy]
+        return FleetView(self, names)
+
+    def health(self) -> dict[str, str]:
+        """
+        :return: dictionary of device name to the state of its link (see client.health)
+        """
+        return {name: client.health for name, client in self._clients.items()}
+
+    @property
+    def failed(self) -> dict[str, Exception]:
+        """
+        :return: devices which are not connected and the error from the last attempt
+        """
+        return dict(self._failed)
+
+    async def connect(self, supervise: bool = True) -> dict[str, Exception]:
+        """
+        Connect all devices concurrently, so startup time is bounded by the
+        slowest device rather than the sum of all devices.
+
+        :param supervise: keep retrying devices that failed to connect (with backoff)
+        :return: devices that failed to connect and their errors
+        """
+        await asyncio.gather(*(self._connect(name) for name in self._clients))
+
+        if supervise and self._failed and not self._supervisor:
+            self._supervisor = asyncio.create_task(self._supervise())
+        return self.failed
+
+    async def _connect(self, name: str) -> None:
+        async with self._semaphore:
+            try:
+                await asyncio.wait_for(
+                    self._clients[name].connect(), self._connect_timeout
+                )
+            except asyncio.TimeoutError as e:
+                LOG.warning(f"Timeout connecting to {name}")
+                self._failed[name] = e
+            except Exception as e:
+                LOG.warning(f"Failed connecting to {name}: {e}")
+                self._failed[name] = e
+            else:
+                if self._failed.pop(name, None):
+                    LOG.info(f"Connected to {name}")
+
+    async def _supervise(self) -> None:
+        """
+        Retry connecting failed devices until all are connected.
+        """
+        delay = self._retry_delay
+        try:
+            while self._failed:
+                await asyncio.sleep(delay)
+                await asyncio.gather(*(self._connect(name) for name in self._failed))
+                delay = min(delay * 2, MAX_FLEET_RETRY_DELAY)
+        finally:
+            self._supervisor = None
+
+    async def close(self) -> None:
+        """
+        Stop retrying failed connections.
+        """
+        if supervisor := self._supervisor:
+            supervisor.cancel()
+            try:
+                await supervisor
+            except asyncio.CancelledError:
+                pass
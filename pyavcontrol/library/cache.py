@@ -0,0 +1,69 @@
+"""
+Cache of parsed model definitions, so loading a model does not need to import and
+run the YAML parser (most of the startup time of short-lived processes such as
+the CLI sending a single command).
+
+Definitions are stored with marshal, which is built into the interpreter (reading
+the cache imports nothing) and much faster than parsing YAML. Each entry records
+the mtime/size of its YAML file, so changed files are parsed again.
+"""
+import logging
+import marshal
+import os
+import sys
+import threading
+
+from ..const import DEFAULT_MODEL_CACHE_DIR
+
+LOG = logging.getLogger(__name__)
+
+# marshal's format is specific to the Python version
+CACHE_VERSION = (1, *sys.version_info[:2])
+
+
+class ModelCache:
+    """
+    Parsed model definitions keyed by the path of their YAML file.
+    """
+
+    def __init__(self, directory: str = DEFAULT_MODEL_CACHE_DIR):
+        self._dir = directory
+
+    def _cache_path(self, model_path: str) -> str:
+        # keyed by the full path, as library directories may share model ids
+        name = os.path.abspath(model_path).strip(os.sep).replace(os.sep, "%")
+        return os.path.join(self._dir, f"{name}.marshal")
+
+    def get(self, model_path: str) -> dict | None:
+        """
+        :return: the cached definition of the model file (None if not cached or the
+          file changed since it was cached)
+        """
+        try:
+            stat = os.stat(model_path)
+            with open(self._cache_path(model_path), "rb") as f:
+                version, mtime, size, model_def = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        if (version, mtime, size) != (CACHE_VERSION, stat.st_mtime_ns, stat.st_size):
+            return None
+        return model_def
+
+    def put(self, model_path: str, model_def: dict) -> None:
+        """
+        Cache the definition parsed from the model file.
+        """
+        cache_path = self._cache_path(model_path)
+        try:
+            stat = os.stat(model_path)
+            os.makedirs(self._dir, exist_ok=True)
+            # unique per thread, as clients may load the same model concurrently
+            tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                entry = (CACHE_VERSION, stat.st_mtime_ns, stat.st_size, model_def)
+                marshal.dump(entry, f)
+            os.replace(tmp_path, cache_path)
+        except (OSError, ValueError) as e:
+            # ValueError for values marshal does not support (e.g. YAML dates)
+            LOG.debug(f"Could not cache model {model_path}: {e}")
@@ -0,0 +1,225 @@
+"""
+Persistent index of the models in the library, so that finding a model by
+manufacturer model name (e.g. "MX88ai" or "SDP-75") or listing the supported
+models does not require loading every YAML file.
+
+The index is stored as JSON and is incrementally refreshed: only model files
+whose mtime/size changed since the index was last saved are parsed again.
+"""
+import logging
+import json
+import os
+import re
+import threading
+
+from ..const import CONF_IP_CONFIG, CONF_SERIAL_CONFIG, DEFAULT_MODEL_INDEX_PATH
+
+LOG = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+
+# keys of the connection section that are transports (others are e.g. baudrates, rtt)
+CONNECTION_TRANSPORTS = (CONF_SERIAL_CONFIG, CONF_IP_CONFIG)
+
+
+def yaml_loader():
+    """
+    :return: the much faster libyaml loader when available (yaml is imported on
+      first use, so it is not loaded unless a model file must be parsed)
+    """
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def normalize_alias(name: str) -> str:
+    """
+    :return: alias normalized for lookups (e.g. "SDP-75" and "sdp75" are equal)
+    """
+    return re.sub(r"[^0-9a-z]", "", str(name).lower())
+
+
+def _index_entry(model_id: str, path: str, stat, model_def: dict) -> dict:
+    """
+    :return: the index entry describing a model definition file
+    """
+    manufacturer = model_def.get("manufacturer") or {}
+
+    models = list(manufacturer.get("models") or [])
+    for key in ("model", "model2"):
+        if model := manufacturer.get(key):
+            models.append(model)
+
+    manufacturers = [m for m in (manufacturer.get("name"), manufacturer.get("name2")) if m]
+
+    return {
+        "id": model_def.get("id", model_id),
+        "path": path,
+        "mtime": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "manufacturer": manufacturer.get("name"),
+        "manufacturers": manufacturers,
+        "models": [str(m) for m in models],
+        "type": (model_def.get("hardware") or {}).get("type"),
+        "tested": bool(model_def.get("tested", False)),
+        "connections": sorted(
+            key
+            for key in model_def.get("connection") or {}
+            if key in CONNECTION_TRANSPORTS
+        ),
+    }
+
+
+class ModelIndex:
+    """
+    Index of all models in a set of library directories.
+    """
+
+    def __init__(self, library_dirs: list[str], path: str = DEFAULT_MODEL_INDEX_PATH):
+        """
+        :param library_dirs: paths of the model libraries (earlier paths take precedence)
+        :param path: file the index is persisted to (None to keep in memory only)
+        """
+        self._dirs = list(library_dirs)
+        self._path = path
+        self._entries = {}
+        self._aliases = {}
+        self._loaded = False
+
+        # serializes refreshes (lookups read the dicts last published by a refresh)
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        """
+        :return: previously saved entries keyed by file path
+        """
+        if not self._path or not os.path.isfile(self._path):
+            return {}
+        try:
+            with open(self._path, "r") as f:
+                saved = json.load(f)
+            if saved.get("version") == INDEX_VERSION and saved.get("dirs") == self._dirs:
+                return {entry["path"]: entry for entry in saved["models"]}
+        except (OSError, ValueError, KeyError) as e:
+            LOG.warning(f"Ignoring invalid model index {self._path}: {e}")
+        return {}
+
+    def _save(self, entries: list[dict]) -> None:
+        if not self._path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp_path = f"{self._path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": INDEX_VERSION, "dirs": self._dirs, "models": entries}, f)
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            LOG.debug(f"Could not save model index {self._path}: {e}")
+
+    def refresh(self) -> None:
+        """
+        Update the index with any model files added, changed or removed since
+        the index was last saved.
+        """
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        previous = self._load()
+
+        changed = False
+        by_path = {}
+        for library_dir in self._dirs:
+            for root, dirs, filenames in os.walk(library_dir):
+                for fn in sorted(filenames):
+                    if not fn.endswith(".yaml"):
+                        continue
+
+                    path = os.path.join(root, fn)
+                    stat = os.stat(path)
+
+                    entry = previous.get(path)
+                    if (
+                        not entry
+                        or entry["mtime"] != stat.st_mtime_ns
+                        or entry["size"] != stat.st_size
+                    ):
+                        entry = self._parse(path, stat)
+                        changed = True
+                    if entry:
+                        by_path[path] = entry
+
+        if changed or by_path.keys() != previous.keys():
+            self._save(list(by_path.values()))
+
+        # first library directory wins for duplicate model ids and aliases
+        entries = {}
+        aliases = {}
+        for entry in by_path.values():
+            model_id = entry["id"]
+            if model_id in entries:
+                continue
+            entries[model_id] = entry
+
+            names = [model_id, *entry["models"]]
+            for manufacturer in entry["manufacturers"]:
+                names += [f"{manufacturer} {model}" for model in entry["models"]]
+            for name in names:
+                aliases.setdefault(normalize_alias(name), model_id)
+
+        # published complete, so concurrent lookups never see a partial index
+        self._entries = entries
+        self._aliases = aliases
+        self._loaded = True
+
+    @staticmethod
+    def _parse(path: str, stat) -> dict | None:
+        import yaml
+
+        model_id = os.path.splitext(os.path.basename(path))[0]
+        try:
+            with open(path, "r") as stream:
+                model_def = yaml.load(stream, Loader=yaml_loader())
+        except (OSError, yaml.YAMLError) as e:
+            LOG.error(f"Failed reading YAML {path}: {e}")
+            return None
+
+        if not isinstance(model_def, dict):
+            return None
+        return _index_entry(model_id, path, stat, model_def)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._lock:
+                # another thread may have loaded the index while waiting for the lock
+                if not self._loaded:
+                    self._refresh()
+
+    def model_ids(self) -> frozenset[str]:
+        """
+        :return: ids of all models in the library
+        """
+        self._ensure_loaded()
+        return frozenset(self._entries)
+
+    def get(self, model_id: str) -> dict | None:
+        """
+        :return: index entry for the model id (or None if not in the library)
+        """
+        self._ensure_loaded()
+        return self._entries.get(model_id)
+
+    def find(self, name: str) -> str | None:
+        """
+        :param name: model id, manufacturer model name or alias (e.g. "MX88ai")
+        :return: id of the matching model (or None if not found)
+        """
+        self._ensure_loaded()
+        return self._aliases.get(normalize_alias(name))
+
+    def entries(self) -> list[dict]:
+        """
+        :return: index entries for all models in the library
+        """
+        self._ensure_loaded()
+        return list(self._entries.values())
@@ -3,23 +3,31 @@ Configuration and data structures around device models
 """
 import logging
 import os
-import pathlib
 from abc import ABC, abstractmethod
 from typing import List, Set
 
-import yaml
-
-from ..const import DEFAULT_MODEL_LIBRARIES
+from ..client.model import register_model_source
+from ..const import (
+    DEFAULT_MODEL_CACHE_DIR,
+    DEFAULT_MODEL_INDEX_PATH,
+    DEFAULT_MODEL_LIBRARIES,
+)
+from .cache import ModelCache
+from .index import ModelIndex, yaml_loader
 from .validate import DeviceModel
 
 LOG = logging.getLogger(__name__)
 
 
 def _load_yaml_file(path: str) -> dict:
+    if not os.path.isfile(path):
+        return None
+
+    import yaml  # only imported when a model is not already cached
+
     try:
-        if os.path.isfile(path):
-            with open(path, "r") as stream:
-                return yaml.safe_load(stream)
+        with open(path, "r") as stream:
+            return yaml.load(stream, Loader=yaml_loader())
     except yaml.YAMLError as exc:
         LOG.error(f"Failed reading YAML {path}: {exc}")
         return {}
@@ -40,6 +48,14 @@ class DeviceModelLibrary(ABC):
         """
         raise NotImplementedError("Subclasses must implement!")
 
+    @abstractmethod
+    def find_model(self, name: str) -> str | None:
+        """
+        :param name: model id or manufacturer's model name/alias (e.g. "MX88ai" or "SDP-75")
+        :return: the id of the matching model in the library (or None if not found)
+        """
+        raise NotImplementedError("Subclasses must implement!")
+
     #        # FIXME: read all yaml files
     #        supported_models = {}
     #        supported_models["mcintosh_mx160"] = {
@@ -50,7 +66,12 @@ class DeviceModelLibrary(ABC):
     #        return supported_models
 
     @staticmethod
-    def create(library_dirs=DEFAULT_MODEL_LIBRARIES, event_loop=None):
+    def create(
+        library_dirs=DEFAULT_MODEL_LIBRARIES,
+        event_loop=None,
+        index_path=DEFAULT_MODEL_INDEX_PATH,
+        cache_dir=DEFAULT_MODEL_CACHE_DIR,
+    ):
         """
         Create an DeviceModelLibrary object representing all the complete
         library for resolving models and includes.
@@ -61,13 +82,17 @@ class DeviceModelLibrary(ABC):
 
         :param library_dirs: paths used to resolve model names and includes (default=pyavcontrol's library)
         :param event_loop: to get an interface that can be used asynchronously, pass in an event loop
+        :param index_path: file the model index is cached in (None to disable caching)
+        :param cache_dir: directory parsed models are cached in (None to disable caching)
 
         :return an instance of DeviceLibraryModel
         """
         if event_loop:
-            return DeviceModelLibraryAsync(library_dirs, event_loop)
+            return DeviceModelLibraryAsync(
+                library_dirs, event_loop, index_path, cache_dir
+            )
         else:
-            return DeviceModelLibrarySync(library_dirs)
+            return DeviceModelLibrarySync(library_dirs, index_path, cache_dir)
 
 
 class DeviceModelLibrarySync(DeviceModelLibrary, ABC):
@@ -75,9 +100,24 @@ class DeviceModelLibrarySync(DeviceModelLibrary, ABC):
     Synchronous implementation of DeviceModelLibrary
     """
 
-    def __init__(self, library_dirs: List[str]):
+    def __init__(
+        self,
+        library_dirs: List[str],
+        index_path=DEFAULT_MODEL_INDEX_PATH,
+        cache_dir=DEFAULT_MODEL_CACHE_DIR,
+    ):
         self._dirs = library_dirs
-        self._supported_models = frozenset()
+        self._index = ModelIndex(library_dirs, index_path)
+        self._cache = ModelCache(cache_dir) if cache_dir else None
+
+    def _load_model_file(self, path: str) -> dict | None:
+        if self._cache and (model := self._cache.get(path)) is not None:
+            return model
+
+        model = _load_yaml_file(path)
+        if model and self._cache:
+            self._cache.put(path, model)
+        return model
 
     def load_model(self, model_id: str) -> dict | None:
         if "/" in model_id:
@@ -86,7 +126,7 @@ class DeviceModelLibrarySync(DeviceModelLibrary, ABC):
         model = None
         for path in self._dirs:
             model_file = f"{path}/{model_id}.yaml"
-            model = _load_yaml_file(model_file)
+            model = self._load_model_file(model_file)
             if model:
                 break
 
@@ -97,25 +137,21 @@ class DeviceModelLibrarySync(DeviceModelLibrary, ABC):
         if not DeviceModel.validate_model_definition(model):
             LOG.warning(f"Error in model {model_id} definition, returning anyway")
 
+        register_model_source(model, model_file)
         return model
 
     def supported_models(self) -> frozenset[str]:
-        if self._supported_models:
-            return self._supported_models
+        return self._index.model_ids()
 
-        # build and cache the list of supported models based all the
-        # yaml device definition files that are included in the library
-        supported_models = {}
-        for path in self._dirs:
-            for root, dirs, filenames in os.walk(path):
-                for fn in filenames:
-                    if fn.endswith(".yaml"):
-                        model_file = os.path.join(root, fn)
-                        name = pathlib.Path(model_file).stem
-                        supported_models[name] = model_file
+    def find_model(self, name: str) -> str | None:
+        return self._index.find(name)
 
-        self._supported_models = frozenset(supported_models.keys())  # immutable
-        return self._supported_models
+    @property
+    def index(self) -> ModelIndex:
+        """
+        :return: index of all models in this library (e.g. manufacturer, type, tested)
+        """
+        return self._index
 
 
 class DeviceModelLibraryAsync(DeviceModelLibrary, ABC):
@@ -127,22 +163,27 @@ class DeviceModelLibraryAsync(DeviceModelLibrary, ABC):
     since loading all the model files should be a rare occurrence).
     """
 
-    def __init__(self, library_dirs: List[str], event_loop):
+    def __init__(
+        self,
+        library_dirs: List[str],
+        event_loop,
+        index_path=DEFAULT_MODEL_INDEX_PATH,
+        cache_dir=DEFAULT_MODEL_CACHE_DIR,
+    ):
         self._loop = event_loop
         self._dirs = library_dirs
-        self._supported_models = set()
 
         # FUTURE: consider implementing async method
-        self._sync = DeviceModelLibrarySync(library_dirs)
+        self._sync = DeviceModelLibrarySync(library_dirs, index_path, cache_dir)
 
     async def load_model(self, name: str) -> dict:
-        result = await self._loop.run_in_executor(
-            None, self._sync.load_model, self, name
-        )
+        result = await self._loop.run_in_executor(None, self._sync.load_model, name)
         return result
 
     async def supported_models(self) -> Set[str]:
-        result = await self._loop.run_in_executor(
-            None, self._sync.supported_models, self
-        )
+        result = await self._loop.run_in_executor(None, self._sync.supported_models)
+        return result
+
+    async def find_model(self, name: str) -> str | None:
+        result = await self._loop.run_in_executor(None, self._sync.find_model, name)
         return result
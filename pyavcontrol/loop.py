@@ -0,0 +1,116 @@
+"""
+Event loop selection for the asynchronous clients. Each command creates several
+short-lived tasks and futures, so with many devices the loop implementation
+matters (see tools/bench-event-loop):
+
+    from pyavcontrol.loop import run
+
+    run(main(), loop_type="auto", eager_tasks=True)
+
+    # or when managing the loop directly
+    loop = new_event_loop("uvloop", eager_tasks=True)
+    client = DeviceClient.create(model_def, url, event_loop=loop)
+
+uvloop is optional (pip install uvloop); 'auto' uses it when installed. Eager tasks
+(Python 3.12+) run each new task until its first await without a trip through the
+loop's ready queue, which avoids the scheduling overhead for tasks that complete
+without blocking.
+"""
+import logging
+import asyncio
+import sys
+from collections.abc import Coroutine
+
+from .const import (
+    DEFAULT_EVENT_LOOP,
+    EVENT_LOOP_ASYNCIO,
+    EVENT_LOOP_AUTO,
+    EVENT_LOOP_UVLOOP,
+    EVENT_LOOPS,
+)
+
+LOG = logging.getLogger(__name__)
+
+
+def uvloop_available() -> bool:
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def eager_tasks_available() -> bool:
+    return hasattr(asyncio, "eager_task_factory")  # Python 3.12+
+
+
+def set_eager_tasks(loop: asyncio.AbstractEventLoop) -> bool:
+    """
+    Start tasks created on the loop eagerly (Python 3.12+).
+
+    :return: True if eager tasks were enabled
+    """
+    if not eager_tasks_available():
+        LOG.warning(
+            f"Eager tasks require Python 3.12+ (running {sys.version.split()[0]})"
+        )
+        return False
+    loop.set_task_factory(asyncio.eager_task_factory)
+    return True
+
+
+def new_event_loop(
+    loop_type: str = DEFAULT_EVENT_LOOP, eager_tasks: bool = False
+) -> asyncio.AbstractEventLoop:
+    """
+    :param loop_type: asyncio, uvloop or auto (uvloop if installed, otherwise asyncio)
+    :param eager_tasks: start tasks eagerly (ignored before Python 3.12)
+    :return: a new event loop
+    """
+    if loop_type not in EVENT_LOOPS:
+        raise ValueError(
+            f"Unknown event loop {loop_type} (expected one of {EVENT_LOOPS})"
+        )
+
+    if loop_type == EVENT_LOOP_AUTO:
+        loop_type = EVENT_LOOP_UVLOOP if uvloop_available() else EVENT_LOOP_ASYNCIO
+
+    if loop_type == EVENT_LOOP_UVLOOP:
+        try:
+            import uvloop
+        except ImportError:
+            raise ValueError("uvloop event loop requested, but uvloop is not installed")
+        loop = uvloop.new_event_loop()
+    else:
+        loop = asyncio.new_event_loop()
+
+    if eager_tasks:
+        set_eager_tasks(loop)
+    LOG.debug(f"Created {loop_type} event loop {loop} (eager tasks={eager_tasks})")
+    return loop
+
+
+def run(
+    main: Coroutine, loop_type: str = DEFAULT_EVENT_LOOP, eager_tasks: bool = False
+):
+    """
+    Equivalent of asyncio.run() using the selected event loop.
+
+    :return: the result of the coroutine
+    """
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(
+            loop_factory=lambda: new_event_loop(loop_type, eager_tasks)
+        ) as runner:
+            return runner.run(main)
+
+    loop = new_event_loop(loop_type, eager_tasks)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
@@ -0,0 +1,271 @@
+"""
+Scenes (macros) that run actions across several devices. Steps that do not
+depend on each other run concurrently, so a scene takes as long as its slowest
+chain of dependent steps rather than the sum of all steps:
+
+    movie:
+      processor_on:
+        do: processor.power_system.on
+      processor_ready:
+        do: processor.power_system.get
+        until: {power: 1}      # repeat until the reply matches (e.g. warmup)
+        timeout: 30
+        after: [processor_on]
+      matrix_input:
+        do: matrix.source.set
+        args: {zone: 1, source: 3}
+      processor_input:
+        do: processor.source.set
+        args: {source: 2}
+        after: [processor_ready]
+        delay: 1.0             # seconds to wait after dependencies complete
+
+    scenes = load_scenes("scenes.yaml")
+    results = await scenes["movie"].run(fleet)  # {step name: result or exception}
+
+Each step's 'do' is device.group.action, where device is the name of an
+asynchronous client in the fleet (or dictionary of clients) the scene runs on.
+Steps on the same device are serialized by the client's lock, in the order they
+become ready.
+"""
+from __future__ import annotations
+
+import logging
+import asyncio
+from collections.abc import Mapping
+
+import yaml
+
+from .client import DeviceClient
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_UNTIL_TIMEOUT = 30.0
+DEFAULT_UNTIL_INTERVAL = 1.0
+
+
+class StepSkipped(Exception):
+    """
+    A step was not run because a step it depends on failed.
+    """
+
+
+class SceneStep:
+    """
+    A single action within a scene.
+    """
+
+    __slots__ = (
+        "name",
+        "device",
+        "group",
+        "action",
+        "args",
+        "after",
+        "delay",
+        "until",
+        "timeout",
+        "interval",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        do: str,
+        args: dict | None = None,
+        after: list[str] | None = None,
+        delay: float = 0.0,
+        until: dict | None = None,
+        timeout: float = DEFAULT_UNTIL_TIMEOUT,
+        interval: float = DEFAULT_UNTIL_INTERVAL,
+    ):
+        """
+        :param do: device.group.action to send
+        :param args: arguments for the action
+        :param after: names of steps that must complete before this step
+        :param delay: seconds to wait after the dependencies complete
+        :param until: repeat the action until its reply contains these values
+          (reply timeouts and connection errors are retried until the timeout)
+        :param timeout: seconds allowed for the until condition to be met
+        :param interval: seconds between repeating the action for the until condition
+        """
+        device, group, action = _split_do(name, do)
+        self.name = name
+        self.device = device
+        self.group = group
+        self.action = action
+        self.args = dict(args or {})
+        self.after = list(after or [])
+        self.delay = delay
+        self.until = until
+        self.timeout = timeout
+        self.interval = interval
+
+    def __repr__(self) -> str:
+        return f"SceneStep({self.name}: {self.device}.{self.group}.{self.action})"
+
+
+def _split_do(name: str, do: str) -> tuple[str, str, str]:
+    device, sep, rest = str(do).rpartition(".")
+    device, sep2, group = device.rpartition(".")
+    if not (sep and sep2 and device and group and rest):
+        raise ValueError(f"Step {name} 'do' must be device.group.action: {do}")
+    return device, group, rest
+
+
+def _matches(client: DeviceClient, result, expected: dict) -> bool:
+    """
+    :return: True if the reply contains the expected values (or their labels)
+    """
+    if not isinstance(result, dict):
+        return False
+    for key, value in expected.items():
+        actual = result.get(key)
+        if actual != value and client.label(key, actual) != value:
+            return False
+    return True
+
+
+class Scene:
+    """
+    A set of steps and their dependencies, run on asynchronous DeviceClients.
+    """
+
+    def __init__(self, name: str, steps: list[SceneStep]):
+        self.name = name
+        self.steps = {step.name: step for step in steps}
+        if len(self.steps) != len(steps):
+            raise ValueError(f"Scene {name} has duplicate step names")
+        self._order = self._topological_order()
+
+    @classmethod
+    def from_dict(cls, name: str, definition: dict) -> Scene:
+        """
+        :param definition: dictionary of step name to its SceneStep arguments
+        """
+        try:
+            steps = [SceneStep(step, **args) for step, args in definition.items()]
+        except TypeError as e:
+            raise ValueError(f"Invalid step in scene {name}: {e}") from None
+        return cls(name, steps)
+
+    def __repr__(self) -> str:
+        return f"Scene({self.name}: {len(self.steps)} steps)"
+
+    def _topological_order(self) -> list[str]:
+        """
+        :return: step names ordered so each step follows its dependencies
+        """
+        for step in self.steps.values():
+            for dependency in step.after:
+                if dependency not in self.steps:
+                    raise ValueError(
+                        f"Step {step.name} in scene {self.name} depends on unknown step {dependency}"
+                    )
+
+        order = []
+        state = {}  # 1=visiting, 2=done
+
+        def visit(name: str, path: list[str]) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                cycle = " -> ".join(path[path.index(name) :] + [name])
+                raise ValueError(f"Scene {self.name} has a dependency cycle: {cycle}")
+            state[name] = 1
+            for dependency in self.steps[name].after:
+                visit(dependency, path + [name])
+            state[name] = 2
+            order.append(name)
+
+        for name in self.steps:
+            visit(name, [])
+        return order
+
+    def validate(self, clients: Mapping[str, DeviceClient]) -> None:
+        """
+        Check that every step's device and action exists (raises ValueError).
+        """
+        for step in self.steps.values():
+            try:
+                client = clients[step.device]
+            except KeyError:
+                raise ValueError(
+                    f"Step {step.name} in scene {self.name} uses unknown device {step.device}"
+                ) from None
+            if step.action not in client.api.get(step.group, ()):
+                raise ValueError(
+                    f"Step {step.name} in scene {self.name}: {client.model_id} has no "
+                    f"action {step.group}.{step.action}"
+                )
+
+    async def run(self, clients: Mapping[str, DeviceClient]) -> dict:
+        """
+        Run the scene, starting each step as soon as its dependencies complete.
+        Steps that depend on a failed step are skipped (StepSkipped).
+
+        :param clients: DeviceFleet or dictionary of device name to asynchronous DeviceClient
+        :return: dictionary of step name to its result (or the exception raised)
+        """
+        self.validate(clients)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        tasks = {}
+
+        async def run_step(step: SceneStep):
+            for dependency in step.after:
+                try:
+                    await tasks[dependency]
+                except Exception:
+                    raise StepSkipped(f"{dependency} failed") from None
+
+            if step.delay:
+                await asyncio.sleep(step.delay)
+
+            client = clients[step.device]
+            deadline = loop.time() + step.timeout
+            error = None
+            while True:
+                try:
+                    result = await client.send_command(
+                        step.group, step.action, **step.args
+                    )
+                except (asyncio.TimeoutError, OSError) as e:
+                    # until steps keep polling a device that does not answer yet
+                    # (e.g. while warming up); serial errors are OSErrors
+                    if not step.until:
+                        raise
+                    LOG.debug(f"Retrying {step.name}: {str(e) or type(e).__name__}")
+                    error = e
+                else:
+                    if not step.until or _matches(client, result, step.until):
+                        return result
+                if loop.time() + step.interval > deadline:
+                    raise asyncio.TimeoutError(
+                        f"{step.name} did not reach {step.until} within {step.timeout}s"
+                    ) from error
+                await asyncio.sleep(step.interval)
+
+        # created in dependency order, so every dependency's task already exists
+        for name in self._order:
+            tasks[name] = asyncio.create_task(run_step(self.steps[name]))
+
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        results = dict(zip(tasks, results))
+
+        failed = [n for n, r in results.items() if isinstance(r, BaseException)]
+        LOG.info(
+            f"Scene {self.name} completed in {loop.time() - start:.2f}s"
+            + (f" ({len(failed)} steps failed: {', '.join(failed)})" if failed else "")
+        )
+        return {name: results[name] for name in self.steps}
+
+
+def load_scenes(path: str) -> dict[str, Scene]:
+    """
+    :return: dictionary of scene name to Scene for each scene in a YAML file
+    """
+    with open(path, "r") as f:
+        definitions = yaml.safe_load(f) or {}
+    return {name: Scene.from_dict(name, steps) for name, steps in definitions.items()}
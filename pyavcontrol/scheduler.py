@@ -0,0 +1,276 @@
+"""
+Central scheduler for polling devices. A single task serves any number of poll
+jobs from a heap ordered by due time, instead of a sleep loop per job:
+
+    scheduler = PollScheduler()
+    scheduler.add(client, "volume", "get", interval=30, callback=on_volume, zone=1)
+    scheduler.start()
+
+Jobs with the same interval are staggered across the interval (and jittered on
+each run) so polls do not fire in sync, polls for a device are spaced by the
+model's min_time_between_commands, and a poll is skipped when a message for the
+same group was already received within the interval (see message_received) or the
+device is not answering its keepalive probes (see client.health).
+"""
+from __future__ import annotations
+
+import logging
+import asyncio
+import heapq
+import itertools
+import random
+from collections import defaultdict
+from collections.abc import Callable
+
+from .client import DeviceClient
+from .const import CONF_THROTTLE_RATE, DEFAULT_THROTTLE_RATE, HEALTH_DEGRADED
+
+LOG = logging.getLogger(__name__)
+
+# fraction of the interval that each poll is randomly shifted by
+DEFAULT_POLL_JITTER = 0.1
+
+# low discrepancy sequence for spreading jobs with the same interval
+GOLDEN_RATIO_FRACTION = 0.6180339887498949
+
+
+class PollJob:
+    """
+    A group/action polled on a device at a fixed interval.
+    """
+
+    __slots__ = (
+        "client",
+        "group",
+        "action",
+        "kwargs",
+        "interval",
+        "callback",
+        "due",
+        "last_update",
+        "in_flight",
+        "active",
+    )
+
+    def __init__(
+        self,
+        client: DeviceClient,
+        group: str,
+        action: str,
+        kwargs: dict,
+        interval: float,
+        callback: Callable | None,
+    ):
+        self.client = client
+        self.group = group
+        self.action = action
+        self.kwargs = kwargs
+        self.interval = interval
+        self.callback = callback
+        self.due = 0.0
+        self.last_update = None
+        self.in_flight = False
+        self.active = True
+
+    def __repr__(self) -> str:
+        return f"PollJob({self.client.model_id} {self.group}.{self.action} every {self.interval}s)"
+
+    def matches(self, values: dict) -> bool:
+        """
+        :return: True if decoded message values are for this job's arguments (e.g. zone)
+        """
+        return all(values.get(k) == v for k, v in self.kwargs.items())
+
+
+class PollScheduler:
+    """
+    Runs poll jobs for asynchronous DeviceClients from a single task.
+    """
+
+    def __init__(self, jitter: float = DEFAULT_POLL_JITTER):
+        """
+        :param jitter: fraction of each job's interval to randomly shift each poll by
+        """
+        self._jitter = jitter
+        self._heap = []
+        self._seq = itertools.count()
+        self._jobs_by_group = defaultdict(list)
+        self._stagger = defaultdict(itertools.count)
+        self._next_send = {}
+        self._throttle = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._polls = set()
+
+        self._runs = 0
+        self._skipped = 0
+        self._unhealthy = 0
+        self._errors = 0
+        self._lag_max = 0.0
+        self._lag_avg = 0.0
+
+    def add(
+        self,
+        client: DeviceClient,
+        group: str,
+        action: str,
+        interval: float,
+        callback: Callable | None = None,
+        **kwargs,
+    ) -> PollJob:
+        """
+        Poll a group/action on a device every interval seconds.
+
+        :param callback: called with the decoded result of each poll
+        :param kwargs: arguments for the action (e.g. zone=1)
+        """
+        if interval <= 0:
+            raise ValueError(f"Poll interval must be positive: {interval}")
+
+        job = PollJob(client, group, action, kwargs, interval, callback)
+
+        # spread jobs with the same interval evenly rather than all firing at once
+        phase = (next(self._stagger[interval]) * GOLDEN_RATIO_FRACTION) % 1.0
+        self._push(job, self._now() + phase * interval)
+
+        self._jobs_by_group[(id(client), group)].append(job)
+        if client not in self._throttle:
+            self._throttle[client] = client.model.settings.get(
+                CONF_THROTTLE_RATE, DEFAULT_THROTTLE_RATE
+            )
+        return job
+
+    def remove(self, job: PollJob) -> None:
+        job.active = False  # lazily dropped from the heap when due
+        jobs = self._jobs_by_group[(id(job.client), job.group)]
+        if job in jobs:
+            jobs.remove(job)
+
+    def message_received(self, client: DeviceClient, line: str) -> None:
+        """
+        Notify the scheduler of a message received from a device (e.g. from the
+        client's registered callback), so polls for state that was just pushed
+        by the device are skipped.
+        """
+        if not (decoded := client.decode_message(line)):
+            return
+        group, _, values = decoded
+        if not isinstance(values, dict):
+            values = {}
+
+        now = self._now()
+        for job in self._jobs_by_group.get((id(client), group), ()):
+            # replies to the job's own poll do not count as pushed updates
+            if not job.in_flight and job.matches(values):
+                job.last_update = now
+
+    def stats(self) -> dict:
+        """
+        :return: counts of polls run/skipped/failed (and skipped as the device was
+          degraded) and schedule lag (seconds late)
+        """
+        return {
+            "jobs": sum(len(jobs) for jobs in self._jobs_by_group.values()),
+            "runs": self._runs,
+            "skipped": self._skipped,
+            "unhealthy": self._unhealthy,
+            "errors": self._errors,
+            "lag_avg": self._lag_avg,
+            "lag_max": self._lag_max,
+        }
+
+    def start(self) -> None:
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = [t for t in (self._task, *self._polls) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_running_loop().time()
+
+    def _push(self, job: PollJob, due: float) -> None:
+        job.due = due
+        heapq.heappush(self._heap, (due, next(self._seq), job))
+        if self._heap[0][2] is job:
+            self._wakeup.set()  # new earliest job
+
+    def _reschedule(self, job: PollJob, now: float) -> None:
+        jitter = random.uniform(-self._jitter, self._jitter) * job.interval
+        self._push(job, max(now, job.due + job.interval + jitter))
+
+    async def _run(self) -> None:
+        heap = self._heap
+        while True:
+            self._wakeup.clear()
+            if not heap:
+                await self._wakeup.wait()
+                continue
+
+            now = self._now()
+            due = heap[0][0]
+            if due > now:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, job = heapq.heappop(heap)
+            if job.active:
+                self._dispatch(job, now)
+
+    def _dispatch(self, job: PollJob, now: float) -> None:
+        client = job.client
+
+        # polls for a device are spaced by the device's throttle
+        next_send = self._next_send.get(client, 0.0)
+        if next_send > now:
+            # deferred without changing job.due, so the delay is reported as lag
+            heapq.heappush(self._heap, (next_send, next(self._seq), job))
+            return
+        self._next_send[client] = now + self._throttle[client]
+
+        lag = now - job.due
+        self._lag_max = max(self._lag_max, lag)
+        self._lag_avg += (lag - self._lag_avg) * 0.1
+        if lag > job.interval:
+            LOG.warning(f"Poll {job} is {lag:.2f}s behind schedule")
+
+        if job.last_update is not None and now - job.last_update < job.interval:
+            self._skipped += 1  # already up to date from a pushed message
+            self._next_send[client] = next_send
+        elif client.health == HEALTH_DEGRADED:
+            self._unhealthy += 1  # would only wait for the reply timeout
+            self._next_send[client] = next_send
+        else:
+            task = asyncio.create_task(self._poll(job))
+            self._polls.add(task)
+            task.add_done_callback(self._polls.discard)
+
+        self._reschedule(job, now)
+
+    async def _poll(self, job: PollJob) -> None:
+        self._runs += 1
+        job.in_flight = True
+        try:
+            result = await job.client.send_command(job.group, job.action, **job.kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._errors += 1
+            LOG.warning(f"Poll {job} failed: {e}")
+            return
+        finally:
+            job.in_flight = False
+
+        if job.callback:
+            try:
+                job.callback(result)
+            except Exception:
+                LOG.exception(f"Callback for {job} failed")
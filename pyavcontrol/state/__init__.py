@@ -0,0 +1,3 @@
+from .delta import Change, ChangeTracker
+from .history import HistoryReader, HistoryRecorder
+from .shared import SharedStatePublisher, SharedStateReader
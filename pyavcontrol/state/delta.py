@@ -0,0 +1,159 @@
+"""
+Change detection between decoding and callbacks. Status replies typically repeat
+every field (e.g. Xantech '#1ZS PR1 SS1 VO0 MU1 TR7 BS7 BA32 LS0 PS0+' on each
+poll), so only the fields whose value actually changed are passed on:
+
+    tracker = ChangeTracker()
+    client.register_callback(tracker.watch(client, "matrix"))
+    tracker.subscribe(on_volume, fields=["volume"])
+
+    def on_volume(change: Change):
+        print(change.device, change.zone, change.old, "->", change.new)
+"""
+import logging
+import time
+from collections import defaultdict, namedtuple
+from collections.abc import Callable
+
+from ..client import DeviceClient
+from .records import message_records
+
+LOG = logging.getLogger(__name__)
+
+Change = namedtuple("Change", ["device", "zone", "field", "old", "new", "timestamp"])
+
+
+class ChangeSubscription:
+    """
+    Callback for the changes of a set of fields (see ChangeTracker.subscribe).
+    """
+
+    __slots__ = ("callback", "fields", "device", "zone")
+
+    def __init__(self, callback: Callable, fields, device, zone):
+        self.callback = callback
+        self.fields = fields
+        self.device = device
+        self.zone = zone
+
+    def wants(self, change: Change) -> bool:
+        return (self.device is None or change.device == self.device) and (
+            self.zone is None or change.zone == self.zone
+        )
+
+
+class ChangeTracker:
+    """
+    Last known values for each device and zone, emitting a Change for each field
+    that differs from its last known value.
+    """
+
+    def __init__(self, emit_initial: bool = True):
+        """
+        :param emit_initial: emit changes (with old=None) the first time a field is seen
+        """
+        self._emit_initial = emit_initial
+        self._state = {}  # (device, zone) -> {field: value}
+        self._by_field = defaultdict(list)
+        self._all_fields = []
+
+    def subscribe(
+        self,
+        callback: Callable[[Change], None],
+        fields: list[str] | None = None,
+        device: str | None = None,
+        zone=None,
+    ) -> ChangeSubscription:
+        """
+        Call the callback with each Change of the fields (all fields if None),
+        optionally only for a single device and/or zone.
+        """
+        if not callable(callback):
+            raise ValueError("Callback is not Callable")
+        subscription = ChangeSubscription(
+            callback, frozenset(fields) if fields else None, device, zone
+        )
+        if subscription.fields is None:
+            self._all_fields.append(subscription)
+        else:
+            for field in subscription.fields:
+                self._by_field[field].append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ChangeSubscription) -> None:
+        if subscription.fields is None:
+            if subscription in self._all_fields:
+                self._all_fields.remove(subscription)
+            return
+        for field in subscription.fields:
+            if subscription in (subscriptions := self._by_field.get(field, ())):
+                subscriptions.remove(subscription)
+                if not subscriptions:
+                    del self._by_field[field]
+
+    def watch(self, client: DeviceClient, device: str) -> Callable[[str], None]:
+        """
+        :return: callback for lines received from the client (e.g. for the client's
+          register_callback or subscribe) that updates the device's state
+        """
+
+        def message_received(line: str) -> None:
+            for values in message_records(client, line):
+                self.update(device, values)
+
+        return message_received
+
+    def state(self, device: str, zone=None) -> dict:
+        """
+        :return: the last known values for the device and zone
+        """
+        return dict(self._state.get((device, zone), {}))
+
+    def update(
+        self, device: str, values: dict, timestamp: float = None
+    ) -> list[Change]:
+        """
+        Compare decoded values with the last known values for the device/zone (from
+        the zone in values, if any), notifying subscribers of each field that changed.
+
+        :return: the changes
+        """
+        zone = values.get("zone")
+        key = (device, zone)
+        if (current := self._state.get(key)) is None:
+            # zone is kept in the state, so the fast path below matches zoned replies
+            current = self._state[key] = {} if zone is None else {"zone": zone}
+            if not self._emit_initial:
+                current.update(values)
+                return []
+
+        # fast path for repeated status replies where nothing changed
+        try:
+            if current.items() >= values.items():
+                return []
+        except TypeError:
+            pass  # unhashable values are compared individually
+
+        timestamp = timestamp or time.time()
+        changes = []
+        for field, new in values.items():
+            if field == "zone":
+                continue
+            old = current.get(field)
+            if old != new or field not in current:
+                current[field] = new
+                changes.append(Change(device, zone, field, old, new, timestamp))
+
+        if changes:
+            self._notify(changes)
+        return changes
+
+    def _notify(self, changes: list[Change]) -> None:
+        by_field = self._by_field
+        for change in changes:
+            for subscription in (*by_field.get(change.field, ()), *self._all_fields):
+                if subscription.wants(change):
+                    try:
+                        subscription.callback(change)
+                    except Exception:
+                        LOG.exception(f"Change callback for {change.field} failed")
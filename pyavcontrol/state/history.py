@@ -0,0 +1,374 @@
+"""
+Compact history of device state changes, for questions such as "when did zone 3's
+volume change last night" without an external time series database:
+
+    recorder = HistoryRecorder("/var/lib/pyavcontrol/history", client, "matrix")
+    tracker.subscribe(recorder.record, device="matrix")
+
+    recorder.query("volume", start=yesterday, end=today, zone=3)
+    # [(timestamp, zone, value), ...]
+
+    # in any other process (only flushed samples)
+    HistoryReader("/var/lib/pyavcontrol/history", "matrix").query("volume", zone=3)
+
+Each field (typed from the model's message fields and vars) is stored as columns of
+timestamps, zones and values in arrays (24 bytes per sample, strings are stored once
+per segment and referenced by index). The columns are flushed periodically to
+segment files:
+
+    magic, header length, JSON header (fields with their sample count, time range,
+    column offset and strings), then the timestamp, zone and value columns of each
+    field (8 byte aligned)
+
+Queries memory-map segments and binary search the timestamp column of the field, so
+only the samples in range are read, and segments outside the range are skipped from
+their header alone.
+"""
+import logging
+import bisect
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from ..client import DeviceClient
+from .delta import Change
+
+LOG = logging.getLogger(__name__)
+
+HISTORY_MAGIC = b"PYAVHIS\x01"
+
+# magic, json header length
+SEGMENT_HEADER = struct.Struct("<8sI")
+SEGMENT_SUFFIX = ".seg"
+
+# zone column value for device wide (zone None) samples
+NO_ZONE = -1
+
+DEFAULT_FLUSH_INTERVAL = 300.0
+DEFAULT_FLUSH_SAMPLES = 65536
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class _Column:
+    """
+    In-memory samples of a single field.
+    """
+
+    __slots__ = ("type", "timestamps", "zones", "values", "strings", "string_index")
+
+    def __init__(self, field_type: str):
+        self.type = field_type
+        self.timestamps = array("d")
+        self.zones = array("q")
+        self.values = array("q")
+        self.strings = []
+        self.string_index = {}
+
+    def append(self, timestamp: float, zone: int, value) -> None:
+        if self.type == "string":
+            value = str(value)
+            if (index := self.string_index.get(value)) is None:
+                index = self.string_index[value] = len(self.strings)
+                self.strings.append(value)
+            value = index
+
+        # keep timestamps sorted for binary search (e.g. if the clock steps back)
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            timestamp = self.timestamps[-1]
+        self.values.append(value)
+        self.zones.append(zone)
+        self.timestamps.append(timestamp)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+def _samples(timestamps, zones, values, strings, start, end, zone) -> list[tuple]:
+    """
+    :return: (timestamp, zone, value) for samples within [start, end] of the zone
+    """
+    lo = 0 if start is None else bisect.bisect_left(timestamps, start)
+    hi = len(timestamps) if end is None else bisect.bisect_right(timestamps, end)
+    samples = []
+    for i in range(lo, hi):
+        sample_zone = zones[i]
+        if zone is not None and sample_zone != zone:
+            continue
+        value = values[i]
+        samples.append(
+            (
+                timestamps[i],
+                None if sample_zone == NO_ZONE else sample_zone,
+                strings[value] if strings is not None else value,
+            )
+        )
+    return samples
+
+
+class _Segment:
+    """
+    A memory-mapped segment file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mmap)
+
+        magic, header_size = SEGMENT_HEADER.unpack_from(self._buf, 0)
+        if magic != HISTORY_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a pyavcontrol history segment")
+        start = SEGMENT_HEADER.size
+        header = json.loads(bytes(self._buf[start : start + header_size]))
+        self.fields = header["fields"]
+        self.t_min = header["t_min"]
+        self.t_max = header["t_max"]
+
+    def query(self, field: str, start, end, zone) -> list[tuple]:
+        if not (info := self.fields.get(field)):
+            return []
+        if (start is not None and info["t_max"] < start) or (
+            end is not None and info["t_min"] > end
+        ):
+            return []
+
+        count = info["count"]
+        offset = info["offset"]
+        size = count * 8
+        buf = self._buf
+        return _samples(
+            buf[offset : offset + size].cast("d"),
+            buf[offset + size : offset + 2 * size].cast("q"),
+            buf[offset + 2 * size : offset + 3 * size].cast("q"),
+            info.get("strings"),
+            start,
+            end,
+            zone,
+        )
+
+    def close(self) -> None:
+        self._buf.release()
+        self._mmap.close()
+
+
+def _write_segment(path: str, columns: dict[str, _Column]) -> None:
+    fields = {}
+    for name, column in columns.items():
+        info = {
+            "type": column.type,
+            "count": len(column),
+            "t_min": column.timestamps[0],
+            "t_max": column.timestamps[-1],
+            "offset": 0,
+        }
+        if column.type == "string":
+            info["strings"] = column.strings
+        fields[name] = info
+
+    header = {
+        "t_min": min(info["t_min"] for info in fields.values()),
+        "t_max": max(info["t_max"] for info in fields.values()),
+        "fields": fields,
+    }
+
+    # offsets depend on the header size, which depends on the offsets' digits
+    size = 0
+    while True:
+        offset = _align(SEGMENT_HEADER.size + size)
+        for name, column in columns.items():
+            fields[name]["offset"] = offset
+            offset += 3 * len(column) * 8
+        data = json.dumps(header, separators=(",", ":")).encode()
+        if len(data) <= size:
+            break
+        size = len(data)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SEGMENT_HEADER.pack(HISTORY_MAGIC, len(data)))
+        f.write(data)
+        for name, column in columns.items():
+            f.write(b"\0" * (fields[name]["offset"] - f.tell()))
+            f.write(column.timestamps.tobytes())
+            f.write(column.zones.tobytes())
+            f.write(column.values.tobytes())
+    os.replace(tmp_path, path)
+
+
+class HistoryReader:
+    """
+    Range queries over the flushed history of a device.
+    """
+
+    def __init__(self, directory: str, device: str):
+        """
+        :param directory: directory the HistoryRecorder writes to
+        :param device: name of the device recorded
+        """
+        self.device = device
+        self._path = os.path.join(directory, device)
+        self._segments = {}
+
+    def _refresh(self) -> list[_Segment]:
+        try:
+            names = sorted(
+                name for name in os.listdir(self._path) if name.endswith(SEGMENT_SUFFIX)
+            )
+        except FileNotFoundError:
+            return []
+
+        for name in names:
+            if name not in self._segments:
+                try:
+                    self._segments[name] = _Segment(os.path.join(self._path, name))
+                except (OSError, ValueError) as e:
+                    LOG.warning(f"Ignoring invalid history segment {name}: {e}")
+        return [self._segments[name] for name in names if name in self._segments]
+
+    def query(
+        self, field: str, start: float = None, end: float = None, zone=None
+    ) -> list[tuple]:
+        """
+        :param start: earliest timestamp (seconds since the epoch) to return
+        :param end: latest timestamp to return
+        :param zone: only samples of the zone (None for all samples)
+        :return: list of (timestamp, zone, value) in time order
+        """
+        samples = []
+        for segment in self._refresh():
+            if (start is None or segment.t_max >= start) and (
+                end is None or segment.t_min <= end
+            ):
+                samples.extend(segment.query(field, start, end, zone))
+        return samples
+
+    def close(self) -> None:
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+
+class HistoryRecorder:
+    """
+    Records state changes of a device to columns, flushed periodically to segments.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        client: DeviceClient,
+        device: str,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        flush_samples: int = DEFAULT_FLUSH_SAMPLES,
+    ):
+        """
+        :param directory: directory segments are written to (in a subdirectory per device)
+        :param client: the client of the device (for typing the fields recorded)
+        :param device: name of the device
+        :param flush_interval: seconds after which recorded samples are flushed
+        :param flush_samples: number of samples after which recorded samples are flushed
+        """
+        self.device = device
+        self._path = os.path.join(directory, device)
+        os.makedirs(self._path, exist_ok=True)
+
+        self._types = client.model.codec.fields()
+        self._flush_interval = flush_interval
+        self._flush_samples = flush_samples
+        self._columns = {}
+        self._count = 0
+        self._last_flush = time.monotonic()
+        self._reader = HistoryReader(directory, device)
+
+    def record(self, change: Change) -> None:
+        """
+        Record a change (e.g. pass to ChangeTracker.subscribe)
+        """
+        self.append(change.field, change.new, change.zone, change.timestamp)
+
+    def append(self, field: str, value, zone=None, timestamp: float = None) -> None:
+        """
+        Record the value of a field (ignored if not a field of the model).
+        """
+        if value is None or not (field_type := self._types.get(field)):
+            return
+        if zone is None:
+            zone = NO_ZONE
+        elif not isinstance(zone, int):
+            LOG.debug(
+                f"Ignoring {field} for non-integer zone {zone!r} in {self.device}"
+            )
+            return
+        if field_type == "int" and not isinstance(value, int):
+            LOG.debug(f"Ignoring non-integer {field}={value!r} for {self.device}")
+            return
+
+        if (column := self._columns.get(field)) is None:
+            column = self._columns[field] = _Column(field_type)
+        column.append(timestamp or time.time(), zone, value)
+        self._count += 1
+
+        if (
+            self._count >= self._flush_samples
+            or time.monotonic() - self._last_flush >= self._flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the samples recorded since the last flush to a new segment.
+        """
+        self._last_flush = time.monotonic()
+        if not self._count:
+            return
+
+        columns = self._columns
+        t_min = min(column.timestamps[0] for column in columns.values())
+        name = f"{int(t_min * 1000000):020d}{SEGMENT_SUFFIX}"
+        path = os.path.join(self._path, name)
+        while os.path.exists(path):  # samples within the same microsecond
+            name = f"{name[:20]}-{time.monotonic_ns()}{SEGMENT_SUFFIX}"
+            path = os.path.join(self._path, name)
+
+        try:
+            _write_segment(path, columns)
+        except OSError as e:
+            LOG.warning(f"Could not write history segment {path}: {e}")
+            return
+        LOG.debug(f"Flushed {self._count} samples for {self.device} to {name}")
+        self._columns = {}
+        self._count = 0
+
+    def query(
+        self, field: str, start: float = None, end: float = None, zone=None
+    ) -> list[tuple]:
+        """
+        :return: list of (timestamp, zone, value) in time order, including samples
+          not yet flushed (see HistoryReader.query)
+        """
+        samples = self._reader.query(field, start, end, zone)
+        if column := self._columns.get(field):
+            samples.extend(
+                _samples(
+                    column.timestamps,
+                    column.zones,
+                    column.values,
+                    column.strings if column.type == "string" else None,
+                    start,
+                    end,
+                    zone,
+                )
+            )
+        return samples
+
+    def close(self) -> None:
+        self.flush()
+        self._reader.close()
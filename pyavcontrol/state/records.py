@@ -0,0 +1,18 @@
+"""
+Decoded values of the messages received from a device, as used by the state
+publishers and trackers.
+"""
+from ..client import DeviceClient
+
+
+def message_records(client: DeviceClient, line: str) -> list[dict]:
+    """
+    :return: the decoded values of a message (a dict for each zone of fixed-width
+      block responses), or an empty list if the message is not defined by the model
+    """
+    if not (decoded := client.decode_message(line)):
+        return []
+    values = decoded[2]
+    if isinstance(values, dict):
+        return [values]
+    return [record._asdict() for record in values]
@@ -0,0 +1,375 @@
+"""
+Device state published to shared memory, so other local processes (e.g. web
+workers) can read it many times per second without any IPC round trips:
+
+    publisher = SharedStatePublisher(client, "living_room")
+    client.register_callback(publisher.message_received)
+
+    # in any other process
+    state = SharedStateReader("living_room")
+    state.get("volume", zone=11)
+    state.snapshot()  # {zone: {field: value}} (zone None for device wide values)
+
+The table is laid out from the fields of the model's messages and vars: a row
+per zone (row 0 for values without a zone), each holding a fixed slot per field
+(int64 or fixed length string) and a bitmask of fields received. The layout is
+stored as JSON in the header, so readers need nothing but the name.
+
+Each row is guarded by a seqlock: the single writer makes the row's sequence odd
+while updating it and even when done, and readers retry if the sequence was odd
+or changed while reading. Readers therefore never block the writer (or each
+other) and take no locks.
+"""
+import logging
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from ..client import DeviceClient
+from .records import message_records
+
+if os.name == "posix":
+    import _posixshmem
+
+LOG = logging.getLogger(__name__)
+
+SHARED_STATE_MAGIC = b"PYAVSHM\x01"
+
+# magic, json layout length, rows in use
+TABLE_HEADER = struct.Struct("<8sII")
+
+# sequence, zone
+ROW_HEADER = struct.Struct("<Qq")
+
+DEFAULT_MAX_ZONES = 64
+DEFAULT_STRING_SIZE = 32
+
+SEQUENCE = struct.Struct("<Q")
+ROW_COUNT = struct.Struct("<I")
+ROW_COUNT_OFFSET = 12
+
+# seconds a reader retries a row that is being written before giving up
+READ_TIMEOUT = 1.0
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class _Layout:
+    """
+    Byte offsets of each field within a row (shared by publishers and readers).
+    """
+
+    def __init__(self, layout: dict):
+        self.model_id = layout["model"]
+        self.max_rows = layout["max_rows"]
+        self.row_size = layout["row_size"]
+        self.rows_offset = layout["rows_offset"]
+        self.mask_words = layout["mask_words"]
+
+        # name -> (index, offset within row, struct)
+        self.fields = {}
+        for index, (name, field_type, offset, size) in enumerate(layout["fields"]):
+            fmt = struct.Struct("<q" if field_type == "int" else f"<{size}s")
+            self.fields[name] = (index, offset, fmt)
+        self.mask = struct.Struct(f"<{self.mask_words}Q")
+
+    @classmethod
+    def for_fields(
+        cls, model_id: str, fields: dict[str, str], max_rows: int, string_size: int
+    ) -> dict:
+        """
+        :return: the JSON layout for a table of the fields (name -> int or string)
+        """
+        names = [name for name in fields if name != "zone"]
+        mask_words = max(1, (len(names) + 63) // 64)
+
+        offset = ROW_HEADER.size + mask_words * 8
+        layout_fields = []
+        for name in names:
+            field_type = "int" if fields[name] == "int" else "string"
+            size = 8 if field_type == "int" else _align(string_size)
+            layout_fields.append((name, field_type, offset, size))
+            offset += size
+
+        header = {
+            "model": model_id,
+            "max_rows": max_rows,
+            "row_size": _align(offset),
+            "mask_words": mask_words,
+            "fields": layout_fields,
+        }
+        # rows start after the header (with room for the rows_offset value itself)
+        json_size = len(_encode_layout(dict(header, rows_offset=0)))
+        header["rows_offset"] = _align(TABLE_HEADER.size + json_size + 16)
+        return header
+
+    def row_offset(self, row: int) -> int:
+        return self.rows_offset + row * self.row_size
+
+
+def _encode_layout(layout: dict) -> bytes:
+    return json.dumps(layout, separators=(",", ":")).encode()
+
+
+class SharedStatePublisher:
+    """
+    Writes the decoded state of a device into a named shared memory table.
+    """
+
+    def __init__(
+        self,
+        client: DeviceClient,
+        name: str,
+        max_zones: int = DEFAULT_MAX_ZONES,
+        string_size: int = DEFAULT_STRING_SIZE,
+    ):
+        """
+        :param client: the client whose messages are published (sync or async)
+        :param name: shared memory name readers attach to (e.g. the device name)
+        :param max_zones: maximum number of distinct zones stored
+        :param string_size: bytes stored for string values (longer values are truncated)
+        """
+        self._client = client
+        self.name = name
+
+        fields = client.model.codec.fields()
+        layout = _Layout.for_fields(client.model_id, fields, max_zones + 1, string_size)
+        self._layout = _Layout(layout)
+        size = self._layout.row_offset(self._layout.max_rows)
+
+        try:
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            # left behind by a publisher that did not exit cleanly
+            LOG.info(f"Replacing existing shared state {name}")
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+
+        data = _encode_layout(layout)
+        buf = self._shm.buf
+        TABLE_HEADER.pack_into(buf, 0, SHARED_STATE_MAGIC, len(data), 1)
+        buf[TABLE_HEADER.size : TABLE_HEADER.size + len(data)] = data
+
+        # row 0 holds values without a zone
+        self._rows = {None: 0}
+        ROW_HEADER.pack_into(buf, self._layout.row_offset(0), 0, 0)
+        self._lock = threading.Lock()
+
+    def message_received(self, line: str) -> None:
+        """
+        Publish the values of a message received from the device (e.g. pass to
+        the client's register_callback or subscribe).
+        """
+        for values in message_records(self._client, line):
+            self.update(values)
+
+    def update(self, values: dict) -> None:
+        """
+        Write decoded values (for the zone in values, if any) to the table.
+        """
+        layout = self._layout
+        zone = values.get("zone")
+        with self._lock:
+            if (row := self._row(zone)) is None:
+                return
+
+            buf = self._shm.buf
+            offset = layout.row_offset(row)
+            mask_offset = offset + ROW_HEADER.size
+            mask = list(layout.mask.unpack_from(buf, mask_offset))
+
+            # encode everything first, so the row is only being written (odd) briefly
+            writes = []
+            for name, value in values.items():
+                if not (field := layout.fields.get(name)) or value is None:
+                    continue
+                index, field_offset, fmt = field
+                try:
+                    if fmt.format != "<q":
+                        value = str(value).encode()
+                    writes.append((offset + field_offset, fmt.pack(value)))
+                except struct.error:
+                    LOG.debug(f"Cannot publish {name}={value!r} for {self.name}")
+                    continue
+                mask[index // 64] |= 1 << (index % 64)
+            writes.append((mask_offset, layout.mask.pack(*mask)))
+
+            seq = SEQUENCE.unpack_from(buf, offset)[0]
+            SEQUENCE.pack_into(buf, offset, seq + 1)
+            for pos, data in writes:
+                buf[pos : pos + len(data)] = data
+            SEQUENCE.pack_into(buf, offset, seq + 2)
+
+    def _row(self, zone) -> int | None:
+        """
+        :return: the row for the zone, allocating a new row if not yet seen
+        """
+        if (row := self._rows.get(zone)) is not None:
+            return row
+        if not isinstance(zone, int):
+            LOG.debug(f"Ignoring values for non-integer zone {zone!r} in {self.name}")
+            return None
+
+        row = len(self._rows)
+        if row >= self._layout.max_rows:
+            LOG.warning(f"Shared state {self.name} is full, ignoring zone {zone}")
+            return None
+
+        buf = self._shm.buf
+        ROW_HEADER.pack_into(buf, self._layout.row_offset(row), 0, zone)
+        self._rows[zone] = row
+        ROW_COUNT.pack_into(buf, ROW_COUNT_OFFSET, row + 1)  # publish the new row
+        return row
+
+    def close(self, unlink: bool = True) -> None:
+        """
+        :param unlink: remove the shared memory (readers attached keep their mapping)
+        """
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+
+class SharedStateReader:
+    """
+    Lock-free reads of the state published by a SharedStatePublisher in any
+    local process.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._shm = None
+        self._mmap = None
+
+        if os.name == "posix":
+            # map read-only, and without registering with the resource tracker (which
+            # would unlink the publisher's table when this process exits)
+            fd = _posixshmem.shm_open(f"/{name}", os.O_RDONLY, mode=0o600)
+            try:
+                self._mmap = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+            self._buf = memoryview(self._mmap)
+        else:
+            self._shm = shared_memory.SharedMemory(name)
+            self._buf = self._shm.buf
+
+        buf = self._buf
+        magic, layout_size, _ = TABLE_HEADER.unpack_from(buf, 0)
+        if magic != SHARED_STATE_MAGIC:
+            self.close()
+            raise ValueError(f"{name} is not a pyavcontrol shared state table")
+        start = TABLE_HEADER.size
+        self._layout = _Layout(json.loads(bytes(buf[start : start + layout_size])))
+        self._rows = {}
+        self._row_count = 0
+
+    @property
+    def model_id(self) -> str:
+        return self._layout.model_id
+
+    @property
+    def fields(self) -> list[str]:
+        return list(self._layout.fields)
+
+    def zones(self) -> list:
+        """
+        :return: zones with published state (None for device wide values)
+        """
+        self._refresh_rows()
+        return list(self._rows)
+
+    def _refresh_rows(self) -> None:
+        buf = self._buf
+        row_count = ROW_COUNT.unpack_from(buf, ROW_COUNT_OFFSET)[0]
+        for row in range(self._row_count, row_count):
+            zone = ROW_HEADER.unpack_from(buf, self._layout.row_offset(row))[1]
+            self._rows[zone if row else None] = row
+        self._row_count = row_count
+
+    def _read(self, row: int, read):
+        """
+        :return: result of read(buf, row offset) from a consistent version of the row
+        """
+        buf = self._buf
+        offset = self._layout.row_offset(row)
+        deadline = None
+        while True:
+            seq = SEQUENCE.unpack_from(buf, offset)[0]
+            if not seq & 1:  # odd while a write is in progress
+                result = read(buf, offset)
+                if SEQUENCE.unpack_from(buf, offset)[0] == seq:
+                    return result
+
+            # let the writer finish (only a publisher that died mid-write blocks reads)
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + READ_TIMEOUT
+            elif now > deadline:
+                raise TimeoutError(f"Could not read a consistent row from {self.name}")
+            time.sleep(0)
+
+    def get(self, field: str, zone: int = None, default=None):
+        """
+        :return: the latest value of a field (default if not yet received)
+        """
+        if zone not in self._rows:
+            self._refresh_rows()
+            if zone not in self._rows:
+                return default
+
+        layout = self._layout
+        index, field_offset, fmt = layout.fields[field]
+
+        def read(buf, offset):
+            mask = layout.mask.unpack_from(buf, offset + ROW_HEADER.size)
+            if not mask[index // 64] & (1 << (index % 64)):
+                return default
+            return fmt.unpack_from(buf, offset + field_offset)[0]
+
+        value = self._read(self._rows[zone], read)
+        if isinstance(value, bytes):
+            return value.rstrip(b"\0").decode(errors="ignore")
+        return value
+
+    def snapshot(self) -> dict:
+        """
+        :return: dictionary of zone (None for device wide values) to its field values
+        """
+        self._refresh_rows()
+        layout = self._layout
+        row_size = layout.row_size
+
+        state = {}
+        for zone, row in self._rows.items():
+            # copy the whole row at once, then decode it outside the seqlock
+            data = self._read(
+                row, lambda buf, offset: bytes(buf[offset : offset + row_size])
+            )
+            mask = layout.mask.unpack_from(data, ROW_HEADER.size)
+
+            values = {}
+            for name, (index, field_offset, fmt) in layout.fields.items():
+                if mask[index // 64] & (1 << (index % 64)):
+                    value = fmt.unpack_from(data, field_offset)[0]
+                    if isinstance(value, bytes):
+                        value = value.rstrip(b"\0").decode(errors="ignore")
+                    values[name] = value
+            if values:
+                state[zone] = values
+        return state
+
+    def close(self) -> None:
+        self._buf.release()
+        if self._mmap:
+            self._mmap.close()
+        if self._shm:
+            self._shm.close()